@@ -12,37 +12,41 @@
 \echo '=== SECTION 1: CONTEXT PATTERN ANALYSIS ==='
 \echo ''
 \echo '1.1 Context Diversity by Company'
+-- 期間・連結・次元は core.context_signature に移動（sql/07_context_signature.sql）。signature_id で結合する
 SELECT 
-    doc_id,
-    COUNT(DISTINCT context_ref) as unique_contexts,
-    COUNT(DISTINCT period_end) as unique_periods,
-    COUNT(DISTINCT is_consolidated) as consolidation_types,
+    c.doc_id,
+    COUNT(DISTINCT c.context_ref) as unique_contexts,
+    COUNT(DISTINCT s.period_end) as unique_periods,
+    COUNT(DISTINCT s.is_consolidated) as consolidation_types,
     COUNT(*) as total_contexts
-FROM staging.context
-GROUP BY doc_id
-ORDER BY doc_id;
+FROM staging.context c
+LEFT JOIN core.context_signature s ON s.signature_id = c.signature_id
+GROUP BY c.doc_id
+ORDER BY c.doc_id;
 
 \echo ''
 \echo '1.2 Consolidation Type Distribution'
 SELECT 
-    COALESCE(is_consolidated::text, 'NULL') as consolidation_type,
-    COUNT(DISTINCT doc_id) as company_count,
-    COUNT(DISTINCT context_ref) as unique_contexts,
+    COALESCE(s.is_consolidated::text, 'NULL') as consolidation_type,
+    COUNT(DISTINCT c.doc_id) as company_count,
+    COUNT(DISTINCT c.context_ref) as unique_contexts,
     COUNT(*) as total_records
-FROM staging.context
-GROUP BY is_consolidated
-ORDER BY is_consolidated DESC;
+FROM staging.context c
+LEFT JOIN core.context_signature s ON s.signature_id = c.signature_id
+GROUP BY s.is_consolidated
+ORDER BY s.is_consolidated DESC;
 
 \echo ''
 \echo '1.3 Period Type Distribution'
 SELECT 
-    period_type,
-    COUNT(DISTINCT doc_id) as companies,
-    COUNT(DISTINCT context_ref) as unique_contexts,
+    s.period_type,
+    COUNT(DISTINCT c.doc_id) as companies,
+    COUNT(DISTINCT c.context_ref) as unique_contexts,
     COUNT(*) as count
-FROM staging.context
-WHERE period_type IS NOT NULL
-GROUP BY period_type
+FROM staging.context c
+JOIN core.context_signature s ON s.signature_id = c.signature_id
+WHERE s.period_type IS NOT NULL
+GROUP BY s.period_type
 ORDER BY count DESC;
 
 \echo ''
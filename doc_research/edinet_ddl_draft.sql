@@ -46,6 +46,7 @@ CREATE TABLE IF NOT EXISTS raw.edinet_document (
     api_version       VARCHAR(10) DEFAULT 'v2',
     doclist_json_path TEXT,
     zip_path          TEXT,
+    zip_claimed_at    TIMESTAMPTZ,
     extracted_path    TEXT,
     fetch_status      VARCHAR(20) DEFAULT 'fetched',
     fetched_at        TIMESTAMPTZ DEFAULT NOW(),
@@ -78,34 +79,44 @@ CREATE INDEX IF NOT EXISTS idx_raw_edinet_file_doc_id
 -- STAGING SCHEMA
 -- =========================
 
-CREATE TABLE IF NOT EXISTS staging.context (
-    id              BIGSERIAL PRIMARY KEY,
-    doc_id          VARCHAR(20) NOT NULL REFERENCES raw.edinet_document(doc_id) ON UPDATE CASCADE ON DELETE RESTRICT,
-    context_ref     TEXT NOT NULL,
+-- 書類をまたいで共有する context 属性（context_hash で重複排除）
+-- staging.context / core.context の両方から参照するため staging より先に作成する
+CREATE TABLE IF NOT EXISTS core.context_signature (
+    signature_id    BIGSERIAL PRIMARY KEY,
+    context_hash    BYTEA NOT NULL UNIQUE,
     period_type     VARCHAR(20), -- instant/duration
     period_start    DATE,
     period_end      DATE,
     instant_date    DATE,
-    entity_identifier TEXT,
     is_consolidated BOOLEAN,
-    dimensions      JSONB,
-    context_hash    CHAR(64),
+    dimensions      JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_period_end
+    ON core.context_signature (period_end);
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_dimensions_gin
+    ON core.context_signature USING GIN (dimensions);
+
+CREATE TABLE IF NOT EXISTS staging.context (
+    id              BIGSERIAL PRIMARY KEY,
+    doc_id          VARCHAR(20) NOT NULL REFERENCES raw.edinet_document(doc_id) ON UPDATE CASCADE ON DELETE RESTRICT,
+    context_ref     TEXT NOT NULL,
+    context_hash    BYTEA,
+    signature_id    BIGINT REFERENCES core.context_signature(signature_id) ON UPDATE CASCADE ON DELETE RESTRICT,
     UNIQUE (doc_id, context_ref)
 );
 
 CREATE INDEX IF NOT EXISTS idx_staging_context_doc_id
     ON staging.context (doc_id);
-CREATE INDEX IF NOT EXISTS idx_staging_context_period_end
-    ON staging.context (period_end);
-CREATE INDEX IF NOT EXISTS idx_staging_context_dimensions_gin
-    ON staging.context USING GIN (dimensions);
+CREATE INDEX IF NOT EXISTS idx_staging_context_signature_id
+    ON staging.context (signature_id);
 
 CREATE TABLE IF NOT EXISTS staging.unit (
     id          BIGSERIAL PRIMARY KEY,
     doc_id      VARCHAR(20) NOT NULL REFERENCES raw.edinet_document(doc_id) ON UPDATE CASCADE ON DELETE RESTRICT,
     unit_ref    TEXT NOT NULL,
     measures    JSONB,
-    unit_hash   CHAR(64),
+    unit_hash   BYTEA,
     UNIQUE (doc_id, unit_ref)
 );
 
@@ -124,7 +135,7 @@ CREATE TABLE IF NOT EXISTS staging.fact (
     value_text      TEXT,
     decimals        SMALLINT,
     is_nil          BOOLEAN DEFAULT FALSE,
-    fact_hash       CHAR(64) NOT NULL,
+    fact_hash       BYTEA NOT NULL,
     created_at      TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE (doc_id, fact_hash)
 );
@@ -229,13 +240,12 @@ CREATE TABLE IF NOT EXISTS core.context (
     context_id      BIGSERIAL PRIMARY KEY,
     document_id     BIGINT NOT NULL REFERENCES core.document(document_id) ON UPDATE CASCADE ON DELETE RESTRICT,
     context_key     TEXT NOT NULL,
+    signature_id    BIGINT REFERENCES core.context_signature(signature_id) ON UPDATE CASCADE ON DELETE RESTRICT,
     period_type     VARCHAR(20),
     period_start    DATE,
     period_end      DATE,
     instant_date    DATE,
-    entity_identifier TEXT,
     is_consolidated BOOLEAN,
-    dimensions      JSONB,
     UNIQUE (document_id, context_key)
 );
 
@@ -243,8 +253,8 @@ CREATE INDEX IF NOT EXISTS idx_core_context_document_id
     ON core.context (document_id);
 CREATE INDEX IF NOT EXISTS idx_core_context_period_end
     ON core.context (period_end);
-CREATE INDEX IF NOT EXISTS idx_core_context_dimensions_gin
-    ON core.context USING GIN (dimensions);
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_id
+    ON core.context (signature_id);
 
 CREATE TABLE IF NOT EXISTS core.unit (
     unit_id     BIGSERIAL PRIMARY KEY,
@@ -264,7 +274,7 @@ CREATE TABLE IF NOT EXISTS core.financial_fact (
     value_text      TEXT,
     decimals        SMALLINT,
     is_nil          BOOLEAN DEFAULT FALSE,
-    fact_hash       CHAR(64) NOT NULL,
+    fact_hash       BYTEA NOT NULL,
     period_end      DATE NOT NULL,
     is_consolidated BOOLEAN,
     accounting_standard VARCHAR(10),
@@ -0,0 +1,22 @@
+-- 書類一覧の差分同期（incremental sync）用チェックポイント
+-- Description: 日付ごとの doclist.json の SHA-256・件数・取得日時を記録し、
+--              確定済みの日付や内容に変化のない日付の再処理を省略する
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS raw.edinet_doclist_checkpoint (
+    list_date     DATE PRIMARY KEY,
+    sha256        CHAR(64) NOT NULL,
+    result_count  INT NOT NULL,
+    doclist_path  TEXT,
+    fetched_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    changed_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMIT;
+
+-- 検証クエリ:
+-- SELECT list_date, result_count, fetched_at, changed_at
+-- FROM raw.edinet_doclist_checkpoint
+-- ORDER BY list_date DESC
+-- LIMIT 14;
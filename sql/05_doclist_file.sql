@@ -0,0 +1,33 @@
+-- 書類一覧ファイルの正規化登録
+-- Description: doclist.json は1日1ファイルで、その日の全 docID が同じファイルを参照する。
+--              従来は raw.edinet_file に docID ごとに同じ doclist.json を登録していたため、
+--              ファイル単位で1行だけ登録する raw.edinet_doclist_file を追加する。
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS raw.edinet_doclist_file (
+    id          BIGSERIAL PRIMARY KEY,
+    list_date   DATE NOT NULL,
+    path        TEXT NOT NULL UNIQUE,
+    size_bytes  BIGINT,
+    sha256      CHAR(64),
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_raw_edinet_doclist_file_list_date
+    ON raw.edinet_doclist_file (list_date);
+
+-- docID → doclist ファイルの参照（従来の file_type = 'doclist_json' 相当）
+CREATE OR REPLACE VIEW raw.edinet_document_doclist_file AS
+SELECT
+    d.doc_id,
+    'doclist_json'::VARCHAR(30) AS file_type,
+    f.path,
+    f.size_bytes,
+    f.sha256,
+    f.created_at
+FROM raw.edinet_document d
+JOIN raw.edinet_doclist_file f ON f.path = d.doclist_json_path;
+
+COMMIT;
@@ -0,0 +1,103 @@
+-- fact_hash / context_hash / unit_hash を CHAR(64) の16進文字列からバージョン付き BYTEA に変更
+-- Description: 先頭1バイトがバージョン（src/lib/keyhash.py）。
+--   v1 = 0x01 + SHA-256（32バイト）: 既存の16進値をそのまま変換（context_hash / unit_hash）
+--   v2 = 0x02 + MD5（16バイト）    : 現行。fact_hash は一意キーのため v2 で再計算する
+--   fact_hash の元文字列は従来どおり
+--     staging: doc_id|concept_qname|context_ref|unit_ref
+--     core   : doc_id|concept_qname|context_key|unit_key
+--   各ブロックは列が CHAR のときだけ実行されるため、再実行しても問題ない。
+
+BEGIN;
+
+-- 1. staging.context / staging.unit: 既存値は v1 として変換
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'staging' AND table_name = 'context' AND column_name = 'context_hash') <> 'bytea' THEN
+        ALTER TABLE staging.context
+            ALTER COLUMN context_hash TYPE BYTEA
+            USING CASE WHEN context_hash IS NULL THEN NULL
+                       ELSE '\x01'::bytea || decode(context_hash, 'hex') END;
+    END IF;
+
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'staging' AND table_name = 'unit' AND column_name = 'unit_hash') <> 'bytea' THEN
+        ALTER TABLE staging.unit
+            ALTER COLUMN unit_hash TYPE BYTEA
+            USING CASE WHEN unit_hash IS NULL THEN NULL
+                       ELSE '\x01'::bytea || decode(unit_hash, 'hex') END;
+    END IF;
+END $$;
+
+-- 2. staging.fact.fact_hash: v2 で再計算（再解析時の ON CONFLICT と一致させる）
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'staging' AND table_name = 'fact' AND column_name = 'fact_hash') <> 'bytea' THEN
+        ALTER TABLE staging.fact DROP CONSTRAINT IF EXISTS fact_doc_id_fact_hash_key;
+        ALTER TABLE staging.fact ADD COLUMN fact_hash_v2 BYTEA;
+        UPDATE staging.fact f
+        SET fact_hash_v2 = '\x02'::bytea || decode(md5(
+                f.doc_id || '|' || f.concept_qname || '|'
+                || c.context_ref || '|'
+                || COALESCE((SELECT u.unit_ref FROM staging.unit u WHERE u.id = f.unit_id), '')
+            ), 'hex')
+        FROM staging.context c
+        WHERE c.id = f.context_id;
+        UPDATE staging.fact
+        SET fact_hash_v2 = '\x01'::bytea || decode(fact_hash, 'hex')
+        WHERE fact_hash_v2 IS NULL;
+        ALTER TABLE staging.fact DROP COLUMN fact_hash;
+        ALTER TABLE staging.fact RENAME COLUMN fact_hash_v2 TO fact_hash;
+        ALTER TABLE staging.fact ALTER COLUMN fact_hash SET NOT NULL;
+        ALTER TABLE staging.fact ADD CONSTRAINT fact_doc_id_fact_hash_key UNIQUE (doc_id, fact_hash);
+    END IF;
+END $$;
+
+-- 3. core.financial_fact.fact_hash: v2 で再計算
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'core' AND table_name = 'financial_fact' AND column_name = 'fact_hash') <> 'bytea' THEN
+        ALTER TABLE core.financial_fact DROP CONSTRAINT IF EXISTS financial_fact_document_id_fact_hash_key;
+        ALTER TABLE core.financial_fact ADD COLUMN fact_hash_v2 BYTEA;
+        -- concept_qname（接頭辞付き）は core.concept に無いため staging.fact から引く。
+        -- staging が削除済みで再計算できない行は v1 として残す（load_core の再取込時に書類ごと削除して v2 で入れ直す）
+        UPDATE core.financial_fact f
+        SET fact_hash_v2 = COALESCE(k.fact_hash, '\x01'::bytea || decode(f.fact_hash, 'hex'))
+        FROM (
+            SELECT ff.fact_id,
+                   '\x02'::bytea || decode(md5(
+                       d.doc_id || '|' || q.concept_qname || '|'
+                       || cx.context_key || '|'
+                       || COALESCE(u.unit_key, '')
+                   ), 'hex') AS fact_hash
+            FROM core.financial_fact ff
+            JOIN core.document d ON d.document_id = ff.document_id
+            JOIN core.concept c ON c.concept_id = ff.concept_id
+            JOIN core.context cx ON cx.context_id = ff.context_id
+            LEFT JOIN core.unit u ON u.unit_id = ff.unit_id
+            LEFT JOIN (
+                SELECT DISTINCT doc_id, concept_namespace, concept_name, concept_qname
+                FROM staging.fact
+            ) q ON q.doc_id = d.doc_id
+               AND q.concept_namespace IS NOT DISTINCT FROM c.namespace
+               AND q.concept_name = c.element_name
+        ) k
+        WHERE k.fact_id = f.fact_id;
+        ALTER TABLE core.financial_fact DROP COLUMN fact_hash;
+        ALTER TABLE core.financial_fact RENAME COLUMN fact_hash_v2 TO fact_hash;
+        ALTER TABLE core.financial_fact ALTER COLUMN fact_hash SET NOT NULL;
+        ALTER TABLE core.financial_fact
+            ADD CONSTRAINT financial_fact_document_id_fact_hash_key UNIQUE (document_id, fact_hash);
+    END IF;
+END $$;
+
+COMMIT;
+
+-- 検証クエリ:
+-- SELECT get_byte(fact_hash, 0) AS version, octet_length(fact_hash) AS bytes, COUNT(*)
+-- FROM staging.fact GROUP BY 1, 2;
+-- SELECT d.doc_id, COUNT(*) FROM core.financial_fact f JOIN core.document d USING (document_id)
+-- WHERE get_byte(f.fact_hash, 0) = 1 GROUP BY 1;  -- 再計算できなかった書類
+-- SELECT pg_size_pretty(pg_relation_size('staging.fact_doc_id_fact_hash_key'));
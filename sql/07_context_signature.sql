@@ -0,0 +1,156 @@
+-- context 属性を書類間で共有する core.context_signature を追加
+-- Description: CurrentYearDuration / Prior1YearInstant など同じ構造の context が書類ごとに
+--              staging.context / core.context へ重複登録されていたため、期間・連結・次元を
+--              context_hash（src/edinet/parse_xbrl.py の build_context_hash）をキーに1行だけ保持する。
+--              staging.context / core.context は signature_id で参照する。
+--              entity_identifier は提出者ごとの値（書類・会社の属性）なので署名に含めない
+--              （含めると会社の数だけ署名が分かれ、共有されない）。
+--   - staging.context: period_* / entity_identifier / is_consolidated / dimensions を削除
+--   - core.context   : entity_identifier / dimensions を削除（期間・連結フラグは検索用に残す）
+--   既存行の署名キー:
+--   - staging.context は既存の context_hash をそのまま使う
+--   - staging に無い core.context は属性の JSONB から SQL で計算した v1（0x01 + SHA-256）を使う
+--   移行した署名のキーはパーサーが作る v2 と一致しないため、再ステージング・core 再取込の後は
+--   どこからも参照されなくなる。末尾の削除ステップで消す（再取込後にこのファイルを再実行してよい）。
+--   06_compact_hash_keys.sql の適用後に実行すること。
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS core.context_signature (
+    signature_id    BIGSERIAL PRIMARY KEY,
+    context_hash    BYTEA NOT NULL UNIQUE,
+    period_type     VARCHAR(20),
+    period_start    DATE,
+    period_end      DATE,
+    instant_date    DATE,
+    is_consolidated BOOLEAN,
+    dimensions      JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_period_end
+    ON core.context_signature (period_end);
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_dimensions_gin
+    ON core.context_signature USING GIN (dimensions);
+
+-- entity_identifier を署名に持っていた版の 07 を適用済みの DB から列を外す
+ALTER TABLE core.context_signature DROP COLUMN IF EXISTS entity_identifier;
+
+ALTER TABLE staging.context
+    ADD COLUMN IF NOT EXISTS signature_id BIGINT
+    REFERENCES core.context_signature(signature_id) ON UPDATE CASCADE ON DELETE RESTRICT;
+ALTER TABLE core.context
+    ADD COLUMN IF NOT EXISTS signature_id BIGINT
+    REFERENCES core.context_signature(signature_id) ON UPDATE CASCADE ON DELETE RESTRICT;
+
+DO $$
+BEGIN
+    -- 属性列が残っている場合のみ移行する（再実行時はスキップ）
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'staging' AND table_name = 'context' AND column_name = 'dimensions') THEN
+        INSERT INTO core.context_signature (
+            context_hash, period_type, period_start, period_end, instant_date,
+            is_consolidated, dimensions
+        )
+        SELECT DISTINCT ON (context_hash)
+            context_hash, period_type, period_start, period_end, instant_date,
+            is_consolidated, dimensions
+        FROM staging.context
+        WHERE context_hash IS NOT NULL
+        ORDER BY context_hash, id
+        ON CONFLICT (context_hash) DO NOTHING;
+
+        UPDATE staging.context c
+        SET signature_id = s.signature_id
+        FROM core.context_signature s
+        WHERE s.context_hash = c.context_hash
+          AND c.signature_id IS NULL;
+
+        -- core.context: staging に同じ (doc_id, context_ref) があればその署名を使う
+        UPDATE core.context cx
+        SET signature_id = sc.signature_id
+        FROM core.document d, staging.context sc
+        WHERE d.document_id = cx.document_id
+          AND sc.doc_id = d.doc_id
+          AND sc.context_ref = cx.context_key
+          AND cx.signature_id IS NULL;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'core' AND table_name = 'context' AND column_name = 'dimensions') THEN
+        -- staging 削除済みの書類は core.context の属性から署名を作る
+        INSERT INTO core.context_signature (
+            context_hash, period_type, period_start, period_end, instant_date,
+            is_consolidated, dimensions
+        )
+        SELECT DISTINCT ON (h)
+            h, period_type, period_start, period_end, instant_date,
+            is_consolidated, dimensions
+        FROM (
+            SELECT cx.*,
+                   '\x01'::bytea || sha256(convert_to(jsonb_build_object(
+                       'period_type', cx.period_type,
+                       'period_start', cx.period_start,
+                       'period_end', cx.period_end,
+                       'instant_date', cx.instant_date,
+                       'is_consolidated', cx.is_consolidated,
+                       'dimensions', COALESCE(cx.dimensions, '{}'::jsonb)
+                   )::text, 'UTF8')) AS h
+            FROM core.context cx
+            WHERE cx.signature_id IS NULL
+        ) t
+        ORDER BY h, context_id
+        ON CONFLICT (context_hash) DO NOTHING;
+
+        UPDATE core.context cx
+        SET signature_id = s.signature_id
+        FROM core.context_signature s
+        WHERE cx.signature_id IS NULL
+          AND s.context_hash = '\x01'::bytea || sha256(convert_to(jsonb_build_object(
+                  'period_type', cx.period_type,
+                  'period_start', cx.period_start,
+                  'period_end', cx.period_end,
+                  'instant_date', cx.instant_date,
+                  'is_consolidated', cx.is_consolidated,
+                  'dimensions', COALESCE(cx.dimensions, '{}'::jsonb)
+              )::text, 'UTF8'));
+    END IF;
+END $$;
+
+-- 属性列の削除（署名側に移したもの）
+DROP INDEX IF EXISTS staging.idx_staging_context_period_end;
+DROP INDEX IF EXISTS staging.idx_staging_context_dimensions_gin;
+DROP INDEX IF EXISTS core.idx_core_context_dimensions_gin;
+
+ALTER TABLE staging.context
+    DROP COLUMN IF EXISTS period_type,
+    DROP COLUMN IF EXISTS period_start,
+    DROP COLUMN IF EXISTS period_end,
+    DROP COLUMN IF EXISTS instant_date,
+    DROP COLUMN IF EXISTS entity_identifier,
+    DROP COLUMN IF EXISTS is_consolidated,
+    DROP COLUMN IF EXISTS dimensions;
+ALTER TABLE core.context
+    DROP COLUMN IF EXISTS entity_identifier,
+    DROP COLUMN IF EXISTS dimensions;
+
+CREATE INDEX IF NOT EXISTS idx_staging_context_signature_id
+    ON staging.context (signature_id);
+CREATE INDEX IF NOT EXISTS idx_core_context_signature_id
+    ON core.context (signature_id);
+
+-- どこからも参照されない署名を削除する（移行した v1 キーの署名は再ステージング後にここで消える）
+-- parse はプロセス内で context_hash → signature_id をメモする。実行中に消した署名をメモが引くと
+-- その書類は外部キー違反でロールバックされ（メモは破棄）、次回の parse で登録し直される。停止中の実行を推奨
+DELETE FROM core.context_signature s
+WHERE NOT EXISTS (SELECT 1 FROM staging.context c WHERE c.signature_id = s.signature_id)
+  AND NOT EXISTS (SELECT 1 FROM core.context cx WHERE cx.signature_id = s.signature_id);
+
+COMMIT;
+
+-- 検証クエリ:
+-- SELECT COUNT(*) AS contexts, COUNT(DISTINCT signature_id) AS signatures FROM core.context;
+-- SELECT COUNT(*) FROM core.context WHERE signature_id IS NULL;  -- 0 であること
+-- 次元での絞り込み例:
+-- SELECT cx.document_id, cx.context_key
+-- FROM core.context_signature s JOIN core.context cx USING (signature_id)
+-- WHERE s.dimensions @> '{"jppfs_cor:ConsolidatedOrNonConsolidatedAxis": "jppfs_cor:NonConsolidatedMember"}';
@@ -0,0 +1,18 @@
+-- ZIP ダウンロードの確保（claim）を行ロックからステータス + 時刻に変更
+-- Description: 従来は FOR UPDATE SKIP LOCKED の行ロックをダウンロード中ずっと保持していたため、
+--              HTTP の待ち時間だけ接続が idle in transaction になっていた。
+--              確保時に fetch_status = 'zip_in_progress' と zip_claimed_at を記録してすぐコミットし、
+--              zip_claimed_at が古い（落ちたワーカーの）確保は fetch_zip が取り直す。
+
+BEGIN;
+
+ALTER TABLE raw.edinet_document
+    ADD COLUMN IF NOT EXISTS zip_claimed_at TIMESTAMPTZ;
+
+COMMIT;
+
+-- 検証クエリ:
+-- SELECT doc_id, fetch_status, zip_claimed_at
+-- FROM raw.edinet_document
+-- WHERE zip_claimed_at IS NOT NULL AND zip_path IS NULL
+-- ORDER BY zip_claimed_at;
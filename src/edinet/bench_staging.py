@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from lib.config import load_config
+from lib.db import STAGING_WRITE_METHODS, StagingTransaction, get_conn, select_doc_ids_by_status
+from lib.logger import log_jsonl
+from edinet.parse_xbrl import build_fact_batch, document_zip, load_or_parse
+
+
+def time_staging(conn, method: str, doc_id: str, parsed: Dict[str, Any]) -> Tuple[float, int]:
+    """1書類を staging に登録し、登録にかかった秒数とファクト件数を返す（解析は含まない）"""
+    start = time.perf_counter()
+    with StagingTransaction(conn, method) as tx:
+        context_map = tx.contexts(parsed["contexts"])
+        unit_map = tx.units(parsed["units"])
+        batch = build_fact_batch(doc_id, parsed["facts"], context_map, unit_map)
+        tx.facts(batch)
+    return time.perf_counter() - start, len(batch)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare staging write methods (execute_values vs COPY) by re-staging parsed documents"
+    )
+    parser.add_argument("--config", default="src/config/config.yaml")
+    parser.add_argument("--doc-id", dest="doc_ids", action="append", help="repeatable")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="without --doc-id: re-stage up to N documents with fetch_status=parsed")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--methods", default=",".join(STAGING_WRITE_METHODS))
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    db_cfg = cfg.get("db", {})
+    parse_cfg = cfg.get("parse", {}) or {}
+    log_root = Path(cfg.get("paths", {}).get("log_root", "data/logs/edinet"))
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    args.rounds = max(args.rounds, 1)
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+
+    conn = get_conn(db_cfg)
+    try:
+        doc_ids = args.doc_ids or select_doc_ids_by_status(conn, "parsed", args.limit)
+        if not doc_ids:
+            print("no documents to re-stage")
+            return 0
+        # 解析は計測に含めない（パースキャッシュがあれば使う）
+        docs: List[Tuple[str, Dict[str, Any]]] = []
+        for doc_id in doc_ids:
+            zip_path, zip_sha256 = document_zip(conn, doc_id)
+            parsed, _, _ = load_or_parse(zip_path, zip_sha256, doc_id, parse_cfg, run_log)
+            docs.append((doc_id, parsed))
+        conn.rollback()
+
+        # 同じ書類を方式ごとに交互に再登録する（どちらも冪等な upsert）。1周目はウォームアップ
+        timings: Dict[str, List[float]] = {m: [] for m in methods}
+        facts = 0
+        for rnd in range(args.rounds + 1):
+            for method in methods:
+                total = 0.0
+                facts = 0
+                for doc_id, parsed in docs:
+                    sec, n = time_staging(conn, method, doc_id, parsed)
+                    total += sec
+                    facts += n
+                if rnd:
+                    timings[method].append(total)
+    finally:
+        conn.close()
+
+    print(f"{len(docs)} docs, {facts} facts, {args.rounds} rounds")
+    print(f"{'method':<8} {'median(s)':>10} {'min(s)':>8} {'facts/s':>10}")
+    for method in methods:
+        median = statistics.median(timings[method])
+        print(f"{method:<8} {median:>10.3f} {min(timings[method]):>8.3f} {facts / median if median else 0:>10.0f}")
+        log_jsonl(run_log, {
+            "ts": datetime.now().isoformat(),
+            "level": "INFO",
+            "event": "bench_staging",
+            "run_id": run_id,
+            "method": method,
+            "documents": len(docs),
+            "facts": facts,
+            "rounds": args.rounds,
+            "median_sec": round(median, 3),
+            "min_sec": round(min(timings[method]), 3),
+        })
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
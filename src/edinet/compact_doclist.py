@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from lib.config import load_config
+from lib.db import get_conn, relocate_doclist_file
+from lib.doclist_store import (
+    DOCLIST_FORMATS,
+    check_format,
+    decode_doclist,
+    format_of,
+    render_doclist,
+    write_doclist,
+)
+from lib.logger import log_jsonl
+
+
+def find_doclist_files(raw_root: Path, target_format: str) -> List[Path]:
+    """raw_root 配下の target_format 以外の doclist ファイルを日付順に列挙"""
+    files = []
+    for fmt, name in DOCLIST_FORMATS.items():
+        if fmt == target_format:
+            continue
+        files.extend(raw_root.glob(f"*/*/*/{name}"))
+    return sorted(files)
+
+
+def compact_one(conn, src: Path, target_format: str, keep_original: bool) -> Dict[str, int]:
+    """
+    1ファイルを target_format に変換し、DB のパス・サイズ・ハッシュを更新する
+
+    順序: 新ファイルを書き込み → DB 更新を commit → 元ファイルを削除。
+    途中で落ちても元ファイルは残るので、再実行すれば続きから変換できる。
+    """
+    raw = src.read_bytes()
+    doclist = decode_doclist(raw, format_of(src))
+    data = render_doclist(doclist, target_format)
+    dest = src.with_name(DOCLIST_FORMATS[target_format])
+    write_doclist(dest, data)
+
+    moved = relocate_doclist_file(conn, str(src), str(dest), len(data), hashlib.sha256(data).hexdigest())
+    if not keep_original:
+        src.unlink()
+    return {"bytes_before": len(raw), "bytes_after": len(data), "documents": moved}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert stored doclist snapshots to a compact format")
+    parser.add_argument("--config", default="src/config/config.yaml")
+    parser.add_argument("--format", dest="target_format",
+                        help="target format (default: paths.doclist_format, or json.gz)")
+    parser.add_argument("--keep-original", dest="keep_original", action="store_true")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="only list files to convert")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    db_cfg = cfg.get("db", {})
+    paths_cfg = cfg.get("paths", {})
+    raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
+    log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
+    configured = paths_cfg.get("doclist_format")
+    target_format = check_format(args.target_format or (configured if configured != "json" else None) or "json.gz")
+
+    files = find_doclist_files(raw_root, target_format)
+    if args.dry_run:
+        total = sum(f.stat().st_size for f in files)
+        print(f"{len(files)} files ({total} bytes) would be converted to {target_format}")
+        return 0
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+    log_jsonl(run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_start",
+        "run_id": run_id,
+        "mode": "compact_doclist",
+        "target_format": target_format,
+        "files": len(files),
+    })
+
+    totals = {"files": 0, "bytes_before": 0, "bytes_after": 0, "documents": 0}
+    conn = get_conn(db_cfg)
+    try:
+        for src in files:
+            try:
+                result = compact_one(conn, src, target_format, args.keep_original)
+            except Exception:
+                conn.rollback()
+                raise
+            totals["files"] += 1
+            for k, v in result.items():
+                totals[k] += v
+    finally:
+        conn.close()
+
+    log_jsonl(run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_end",
+        "run_id": run_id,
+        **totals,
+    })
+    print(
+        f"converted {totals['files']} files: {totals['bytes_before']} -> {totals['bytes_after']} bytes, "
+        f"{totals['documents']} document paths updated"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
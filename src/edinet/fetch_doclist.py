@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import json
-import time
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import sys
 from typing import Any, Dict, Iterable, List
@@ -12,9 +12,17 @@ from typing import Any, Dict, Iterable, List
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from lib.config import load_config
-from lib.db import get_conn, insert_raw_file, upsert_raw_edinet_documents
-from lib.edinet_client import fetch_doclist
+from lib.db import (
+    get_conn,
+    load_doclist_checkpoints,
+    register_doclist_file,
+    upsert_doclist_checkpoint,
+    upsert_raw_edinet_documents,
+)
+from lib.doclist_store import DEFAULT_FORMAT, check_format, doclist_path, render_doclist, write_doclist
+from lib.edinet_client import EdinetClient
 from lib.logger import log_jsonl
+from lib.rate_limiter import TokenBucket
 
 
 def parse_date(date_str: str | None):
@@ -38,6 +46,14 @@ def to_int(val: Any):
         return None
 
 
+def positive_int(val: str) -> int:
+    """argparse の type: 1 以上の整数（--days-back 0 だと日付が1つもできない）"""
+    n = int(val)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1: {val}")
+    return n
+
+
 def build_date_list(start: str, end: str) -> List[str]:
     s = datetime.strptime(start, "%Y-%m-%d").date()
     e = datetime.strptime(end, "%Y-%m-%d").date()
@@ -49,6 +65,23 @@ def build_date_list(start: str, end: str) -> List[str]:
     return dates
 
 
+def settled_dates(
+    dates: List[str],
+    checkpoints: Dict[str, Dict[str, Any]],
+    settle_days: int,
+    today: date | None = None,
+) -> List[str]:
+    """
+    チェックポイント済みかつ settle_days より古い（もう変化しないとみなす）日付を返す
+    """
+    today = today or date.today()
+    cutoff = today - timedelta(days=settle_days)
+    return [
+        d for d in dates
+        if d in checkpoints and datetime.strptime(d, "%Y-%m-%d").date() < cutoff
+    ]
+
+
 def qc_eval(r: Dict[str, Any]) -> List[str]:
     reasons: List[str] = []
     if (r.get("docTypeCode") or "").strip() != "120":
@@ -115,14 +148,24 @@ def map_result_to_row(
     }
 
 
-def save_doclist_json(doclist: Dict[str, Any], raw_root: Path, date_str: str) -> Path:
-    date = datetime.strptime(date_str, "%Y-%m-%d")
-    out_dir = raw_root / f"{date:%Y/%m/%d}"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / "doclist.json"
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(doclist, f, ensure_ascii=False, indent=2)
-    return out_path
+def doclist_json_path(raw_root: Path, date_str: str, fmt: str = DEFAULT_FORMAT) -> Path:
+    return doclist_path(raw_root, date_str, fmt)
+
+
+def render_doclist_json(doclist: Dict[str, Any], fmt: str = DEFAULT_FORMAT) -> bytes:
+    """save_doclist_json が書き込む内容（sha256_file と同じハッシュになる）"""
+    return render_doclist(doclist, fmt)
+
+
+def save_doclist_json(
+    doclist: Dict[str, Any],
+    raw_root: Path,
+    date_str: str,
+    data: bytes | None = None,
+    fmt: str = DEFAULT_FORMAT,
+) -> Path:
+    out_path = doclist_json_path(raw_root, date_str, fmt)
+    return write_doclist(out_path, data if data is not None else render_doclist_json(doclist, fmt))
 
 
 def sha256_file(path: Path) -> str:
@@ -136,12 +179,182 @@ def sha256_file(path: Path) -> str:
     return h.hexdigest()
 
 
+def process_date(
+    d: str,
+    conn,
+    client: EdinetClient,
+    raw_root: Path,
+    run_id: str,
+    doc_log: Path,
+    qc_log: Path,
+    checkpoint: Dict[str, Any] | None = None,
+    incremental: bool = False,
+    doclist_format: str = DEFAULT_FORMAT,
+) -> int:
+    """1日分の書類一覧を処理し、登録件数を返す（process_date_rows 参照）"""
+    return len(process_date_rows(
+        d, conn, client, raw_root, run_id, doc_log, qc_log, checkpoint, incremental, doclist_format
+    ))
+
+
+def process_date_rows(
+    d: str,
+    conn,
+    client: EdinetClient,
+    raw_root: Path,
+    run_id: str,
+    doc_log: Path,
+    qc_log: Path,
+    checkpoint: Dict[str, Any] | None = None,
+    incremental: bool = False,
+    doclist_format: str = DEFAULT_FORMAT,
+) -> List[Dict[str, Any]]:
+    """
+    1日分の書類一覧を取得・保存し、raw.edinet_document に登録した行を返す
+
+    incremental の場合、取得した一覧のハッシュが前回のチェックポイントと同じなら
+    doclist.json の書き換えと DB 登録を省略し、チェックポイントの fetched_at のみ更新する。
+    """
+    doclist = client.fetch_doclist(d, doc_type=2)
+    data = render_doclist_json(doclist, doclist_format)
+    doclist_sha = hashlib.sha256(data).hexdigest()
+    results = doclist.get("results", []) or []
+
+    if incremental:
+        out_path = doclist_json_path(raw_root, d, doclist_format)
+        if checkpoint and checkpoint.get("sha256") == doclist_sha and out_path.exists():
+            upsert_doclist_checkpoint(conn, d, doclist_sha, len(results), str(out_path))
+            return []
+
+    saved_path = save_doclist_json(doclist, raw_root, d, data, doclist_format)
+    doclist_size = len(data)
+
+    rows = []
+    for r in results:
+        reasons = qc_eval(r)
+        fetch_status = "listed" if not reasons else "excluded"
+        rows.append(map_result_to_row(r, str(saved_path), fetch_status, d))
+
+        if reasons:
+            log_jsonl(qc_log, {
+                "ts": datetime.now().isoformat(),
+                "level": "WARN",
+                "event": "qc_fail",
+                "run_id": run_id,
+                "doc_id": (r.get("docID") or "").strip(),
+                "qc_status": "fail",
+                "qc_reason": reasons,
+            })
+    # 書類の upsert と doclist ファイル登録（+ チェックポイント）を1トランザクションで行う
+    upsert_raw_edinet_documents(conn, rows, commit=False)
+    register_doclist_file(conn, d, str(saved_path), doclist_size, doclist_sha, commit=False)
+    if incremental:
+        upsert_doclist_checkpoint(conn, d, doclist_sha, len(results), str(saved_path), commit=False)
+    conn.commit()
+
+    for r in rows:
+        log_jsonl(doc_log, {
+            "ts": datetime.now().isoformat(),
+            "level": "INFO",
+            "event": "doc_listed",
+            "run_id": run_id,
+            "doc_id": r.get("doc_id"),
+            "edinet_code": r.get("edinet_code"),
+            "sec_code": r.get("sec_code"),
+            "status": "listed",
+            "date": d,
+        })
+    return rows
+
+
+def run_dates(
+    dates: List[str],
+    db_cfg: Dict[str, Any],
+    client: EdinetClient,
+    workers: int,
+    raw_root: Path,
+    run_id: str,
+    doc_log: Path,
+    qc_log: Path,
+    checkpoints: Dict[str, Dict[str, Any]] | None = None,
+    doclist_format: str = DEFAULT_FORMAT,
+) -> int:
+    """
+    日付リストを処理する（workers > 1 の場合は複数日付を並行取得）
+
+    checkpoints を渡すと incremental モードで処理する。
+    どちらのモードでも最初に失敗した日付の例外を送出し、未着手の日付は処理しない。
+    """
+    incremental = checkpoints is not None
+    checkpoints = checkpoints or {}
+    total = 0
+    if workers <= 1:
+        conn = get_conn(db_cfg)
+        try:
+            for d in dates:
+                total += process_date(
+                    d, conn, client, raw_root, run_id, doc_log, qc_log,
+                    checkpoints.get(d), incremental, doclist_format,
+                )
+        finally:
+            conn.close()
+        return total
+
+    # ワーカーごとに DB 接続を持つ（psycopg2 の接続はスレッド間で共有しない）
+    local = threading.local()
+    conns = []
+    conns_lock = threading.Lock()
+
+    def worker_conn():
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = get_conn(db_cfg)
+            local.conn = conn
+            with conns_lock:
+                conns.append(conn)
+        return conn
+
+    def run_date(d: str) -> int:
+        conn = worker_conn()
+        try:
+            return process_date(
+                d, conn, client, raw_root, run_id, doc_log, qc_log,
+                checkpoints.get(d), incremental, doclist_format,
+            )
+        except Exception:
+            # 接続はスレッドで使い回すので、中断したトランザクションを残さない
+            if not conn.closed:
+                conn.rollback()
+            raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doclist") as pool:
+            futures = [pool.submit(run_date, d) for d in dates]
+            try:
+                for fut in as_completed(futures):
+                    total += fut.result()
+            except BaseException:
+                # 逐次実行と同じく最初の失敗で止める。未着手の日付は取り消し、取得中の日付は終わらせる
+                # （checkpoint の無い日付は次回の実行で取得される）
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    finally:
+        for conn in conns:
+            conn.close()
+    return total
+
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", default="src/config/config.yaml")
     parser.add_argument("--date", help="single date (YYYY-MM-DD)")
     parser.add_argument("--date-from", dest="date_from", help="start date (YYYY-MM-DD)")
     parser.add_argument("--date-to", dest="date_to", help="end date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help="number of dates fetched concurrently")
+    parser.add_argument("--days-back", dest="days_back", type=positive_int, nargs="?", const=-1,
+                        help="fetch the last N days up to today (default: edinet.weekly_days_back)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip settled dates and unchanged doclists using raw.edinet_doclist_checkpoint")
     args = parser.parse_args()
 
     cfg = load_config(args.config)
@@ -156,6 +369,13 @@ def main() -> int:
 
     if args.date:
         dates = [args.date]
+    elif args.days_back is not None:
+        days_back = args.days_back if args.days_back >= 0 else int(edinet_cfg.get("weekly_days_back", 14))
+        today = date.today()
+        dates = build_date_list(
+            (today - timedelta(days=days_back - 1)).strftime("%Y-%m-%d"),
+            today.strftime("%Y-%m-%d"),
+        )
     else:
         dr = edinet_cfg.get("date_range", {})
         start = args.date_from or dr.get("from")
@@ -163,10 +383,16 @@ def main() -> int:
         if not start or not end:
             raise SystemExit("date range is required")
         dates = build_date_list(start, end)
+    if not dates:
+        # edinet.weekly_days_back: 0 や from > to の範囲
+        raise SystemExit("no dates to fetch (check --days-back / edinet.weekly_days_back / date range)")
 
     raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
+    doclist_format = check_format(paths_cfg.get("doclist_format", DEFAULT_FORMAT))
     log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
     rate_limit_sec = float(edinet_cfg.get("rate_limit_sec", 2))
+    burst = float(edinet_cfg.get("rate_limit_burst", 1))
+    workers = args.workers or int(edinet_cfg.get("workers", 1))
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
     doc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"doc_{datetime.now():%Y%m%d}.jsonl"
@@ -179,66 +405,35 @@ def main() -> int:
         "run_id": run_id,
         "mode": "doclist",
         "date_range": {"from": dates[0], "to": dates[-1]},
+        "workers": workers,
     })
 
-    conn = get_conn(db_cfg)
-    total = 0
-    try:
-        last_call = 0.0
-        for d in dates:
-            now = time.time()
-            wait = rate_limit_sec - (now - last_call)
-            if wait > 0:
-                time.sleep(wait)
-            doclist = fetch_doclist(base_url, api_key, d, doc_type=2)
-            last_call = time.time()
-            doclist_path = save_doclist_json(doclist, raw_root, d)
-            doclist_size = doclist_path.stat().st_size
-            doclist_sha = sha256_file(doclist_path)
-            results = doclist.get("results", []) or []
-
-            rows = []
-            for r in results:
-                reasons = qc_eval(r)
-                fetch_status = "listed" if not reasons else "excluded"
-                rows.append(map_result_to_row(r, str(doclist_path), fetch_status, d))
-
-                if reasons:
-                    log_jsonl(qc_log, {
-                        "ts": datetime.now().isoformat(),
-                        "level": "WARN",
-                        "event": "qc_fail",
-                        "run_id": run_id,
-                        "doc_id": (r.get("docID") or "").strip(),
-                        "qc_status": "fail",
-                        "qc_reason": reasons,
-                    })
-            total += upsert_raw_edinet_documents(conn, rows)
-
-            for r in rows:
-                insert_raw_file(
-                    conn,
-                    r.get("doc_id"),
-                    "doclist_json",
-                    str(doclist_path),
-                    doclist_size,
-                    doclist_sha,
-                )
-
-            for r in rows:
-                log_jsonl(doc_log, {
-                    "ts": datetime.now().isoformat(),
-                    "level": "INFO",
-                    "event": "doc_listed",
-                    "run_id": run_id,
-                    "doc_id": r.get("doc_id"),
-                    "edinet_code": r.get("edinet_code"),
-                    "sec_code": r.get("sec_code"),
-                    "status": "listed",
-                    "date": d,
-                })
-    finally:
-        conn.close()
+    checkpoints = None
+    if args.incremental:
+        settle_days = int(edinet_cfg.get("settle_days", 30))
+        conn = get_conn(db_cfg)
+        try:
+            checkpoints = load_doclist_checkpoints(conn, dates)
+        finally:
+            conn.close()
+        skipped = set(settled_dates(dates, checkpoints, settle_days))
+        dates = [d for d in dates if d not in skipped]
+        log_jsonl(run_log, {
+            "ts": datetime.now().isoformat(),
+            "level": "INFO",
+            "event": "incremental_plan",
+            "run_id": run_id,
+            "settle_days": settle_days,
+            "dates_skipped": len(skipped),
+            "dates_to_fetch": len(dates),
+        })
+
+    limiter = TokenBucket.from_interval(rate_limit_sec, burst=burst)
+    with EdinetClient.from_config(edinet_cfg, limiter=limiter, pool_size=workers) as client:
+        total = run_dates(
+            dates, db_cfg, client, workers, raw_root, run_id, doc_log, qc_log, checkpoints, doclist_format
+        )
+        http_summary = client.latency_summary()
 
     log_jsonl(run_log, {
         "ts": datetime.now().isoformat(),
@@ -246,6 +441,7 @@ def main() -> int:
         "event": "run_end",
         "run_id": run_id,
         "documents": total,
+        "http": http_summary,
     })
     return 0
 
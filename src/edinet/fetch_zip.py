@@ -5,17 +5,20 @@ import hashlib
 import os
 import re
 import sys
-import time
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from lib.config import load_config
 from lib.db import get_conn, insert_raw_file
-from lib.edinet_client import fetch_document_zip
+from lib.edinet_client import EdinetClient
 from lib.logger import log_jsonl
+from lib.rate_limiter import TokenBucket
 
 
 def slugify(name: str) -> str:
@@ -25,31 +28,124 @@ def slugify(name: str) -> str:
     return name or "unknown"
 
 
-def sha256_bytes(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(1 << 16)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
 
 
-def select_targets(conn, limit: int) -> List[Dict[str, Any]]:
-    sql = """
-        SELECT doc_id, sec_code, company_name, submission_date
-        FROM raw.edinet_document
-        WHERE zip_path IS NULL
+# 確保中の書類の fetch_status（sql/08_zip_claim.sql）
+ZIP_IN_PROGRESS = "zip_in_progress"
+
+# zip_claimed_at がこれより古い確保は、落ちたワーカーのものとみなして取り直す
+CLAIM_TIMEOUT_SEC = 3600
+
+TARGET_WHERE = """
+        zip_path IS NULL
           AND doc_type_code = '120'
           AND xbrl_flag = 1
           AND withdrawal_status = 0
           AND disclosure_status IN (0, 3)
           AND legal_status IN (1, 2)
           AND doc_info_edit_status <> 1
+"""
+
+# doclist の再取得は fetch_status を上書きするため、確保中かどうかは zip_claimed_at で判定する
+UNCLAIMED_WHERE = """
+          AND (zip_claimed_at IS NULL OR zip_claimed_at < NOW() - make_interval(secs => %s))
+"""
+
+
+def select_targets(conn, limit: int) -> List[Dict[str, Any]]:
+    sql = f"""
+        SELECT doc_id, sec_code, company_name, submission_date
+        FROM raw.edinet_document
+        WHERE {TARGET_WHERE}
+        {UNCLAIMED_WHERE}
         ORDER BY submission_date ASC
         LIMIT %s
     """
     with conn.cursor() as cur:
-        cur.execute(sql, (limit,))
+        cur.execute(sql, (CLAIM_TIMEOUT_SEC, limit))
         cols = [d[0] for d in cur.description]
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
-def update_zip_path(conn, doc_id: str, zip_path: str) -> None:
+def claim_target(
+    conn,
+    skip_doc_ids: Sequence[str] = (),
+    doc_id: Optional[str] = None,
+    claim_timeout_sec: float = CLAIM_TIMEOUT_SEC,
+) -> Optional[Dict[str, Any]]:
+    """
+    未ダウンロードの書類を1件確保する（doc_id 指定時はその書類が対象の場合のみ）
+
+    FOR UPDATE SKIP LOCKED で選んだ行を fetch_status = zip_in_progress / zip_claimed_at = NOW() にして
+    すぐコミットする（ダウンロード中に行ロックとトランザクションを持ち続けない）。
+    他ワーカーは zip_claimed_at が claim_timeout_sec 以内の書類を選ばない。
+    失敗時は release_claim で確保を戻す。プロセスが落ちた場合は claim_timeout_sec 後に再び対象になる。
+    """
+    doc_filter = "AND doc_id = %s" if doc_id else ""
+    sql = f"""
+        SELECT doc_id, sec_code, company_name, submission_date
+        FROM raw.edinet_document
+        WHERE {TARGET_WHERE}
+          {UNCLAIMED_WHERE}
+          AND NOT (doc_id = ANY(%s))
+          {doc_filter}
+        ORDER BY submission_date ASC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    """
+    params: List[Any] = [claim_timeout_sec, list(skip_doc_ids)]
+    if doc_id:
+        params.append(doc_id)
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+        if not row:
+            conn.rollback()
+            return None
+        cols = [d[0] for d in cur.description]
+        target = dict(zip(cols, row))
+        cur.execute(
+            """
+            UPDATE raw.edinet_document
+            SET fetch_status = %s,
+                zip_claimed_at = NOW()
+            WHERE doc_id = %s
+            """,
+            (ZIP_IN_PROGRESS, target["doc_id"]),
+        )
+    conn.commit()
+    return target
+
+
+def release_claim(conn, doc_id: str) -> None:
+    """ダウンロードに失敗した書類の確保を戻す（次回実行で再び対象になる）"""
+    if conn.closed:
+        return
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE raw.edinet_document
+            SET fetch_status = 'listed',
+                zip_claimed_at = NULL
+            WHERE doc_id = %s
+              AND zip_path IS NULL
+            """,
+            (doc_id,),
+        )
+    conn.commit()
+
+
+def update_zip_path(conn, doc_id: str, zip_path: str, commit: bool = True) -> None:
     sql = """
         UPDATE raw.edinet_document
         SET zip_path = %s,
@@ -60,13 +156,125 @@ def update_zip_path(conn, doc_id: str, zip_path: str) -> None:
     with conn.cursor() as cur:
         extract_path = str(Path(zip_path).parent / "extracted")
         cur.execute(sql, (zip_path, extract_path, doc_id))
+    if commit:
+        conn.commit()
+
+
+def target_zip_path(raw_root: Path, target: Dict[str, Any]) -> Path:
+    doc_id = target["doc_id"]
+    sec_code = target.get("sec_code") or ""
+    company_slug = slugify(target.get("company_name") or "")
+    submission_date = target.get("submission_date")
+    if not submission_date:
+        # fallback to today if missing
+        submission_date = datetime.now().date()
+    return raw_root / f"{submission_date:%Y/%m/%d}" / f"{doc_id}_{sec_code}_{company_slug}" / "document.zip"
+
+
+def download_one(
+    conn,
+    target: Dict[str, Any],
+    client: EdinetClient,
+    raw_root: Path,
+    run_id: str,
+    doc_log: Path,
+) -> None:
+    doc_id = target["doc_id"]
+    sec_code = target.get("sec_code") or ""
+    zip_path = target_zip_path(raw_root, target)
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 前回実行で保存済みだが DB 更新前に落ちた場合は再ダウンロードしない
+    # （ダウンロードは .part → rename なので、document.zip が存在すれば完全なファイル）
+    resumed = zip_path.exists() and zipfile.is_zipfile(zip_path)
+    if resumed:
+        size_bytes = zip_path.stat().st_size
+        sha256 = sha256_file(zip_path)
+    else:
+        size_bytes, sha256 = client.download_document_zip(doc_id, zip_path, doc_type=1)
+
+    # zip_path 更新とファイル登録を1コミットにまとめる
+    update_zip_path(conn, doc_id, str(zip_path), commit=False)
+    insert_raw_file(conn, doc_id, "zip", str(zip_path), size_bytes, sha256, commit=False)
     conn.commit()
 
+    log_jsonl(doc_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "zip_downloaded",
+        "run_id": run_id,
+        "doc_id": doc_id,
+        "sec_code": sec_code,
+        "status": "resumed" if resumed else "success",
+        "size_bytes": size_bytes,
+        "sha256": sha256,
+    })
+
+
+class WorkQueue:
+    """DB から書類を確保するワーカー間の共有状態（件数上限と失敗済み doc_id）"""
+
+    def __init__(self, limit: int):
+        self.remaining = limit
+        self.failed: List[str] = []
+        self._lock = threading.Lock()
+
+    def take_slot(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def skip_list(self) -> List[str]:
+        with self._lock:
+            return list(self.failed)
+
+    def mark_failed(self, doc_id: str) -> None:
+        with self._lock:
+            self.failed.append(doc_id)
+
+
+def run_worker(
+    db_cfg: Dict[str, Any],
+    queue: WorkQueue,
+    client: EdinetClient,
+    raw_root: Path,
+    run_id: str,
+    doc_log: Path,
+) -> int:
+    downloaded = 0
+    conn = get_conn(db_cfg)
+    try:
+        while queue.take_slot():
+            target = claim_target(conn, queue.skip_list())
+            if not target:
+                break
+            try:
+                download_one(conn, target, client, raw_root, run_id, doc_log)
+                downloaded += 1
+            except Exception as exc:
+                release_claim(conn, target["doc_id"])
+                queue.mark_failed(target["doc_id"])
+                log_jsonl(doc_log, {
+                    "ts": datetime.now().isoformat(),
+                    "level": "ERROR",
+                    "event": "zip_failed",
+                    "run_id": run_id,
+                    "doc_id": target["doc_id"],
+                    "status": "failed",
+                    "error": str(exc),
+                })
+    finally:
+        conn.close()
+    return downloaded
+
 
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", default="src/config/config.yaml")
     parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="number of concurrent downloads")
     args = parser.parse_args()
 
     cfg = load_config(args.config)
@@ -82,6 +290,8 @@ def main() -> int:
     raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
     log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
     rate_limit_sec = float(edinet_cfg.get("rate_limit_sec", 2))
+    burst = float(edinet_cfg.get("rate_limit_burst", 1))
+    workers = args.workers or int(edinet_cfg.get("workers", 1))
 
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
@@ -93,56 +303,28 @@ def main() -> int:
         "event": "run_start",
         "run_id": run_id,
         "mode": "zip_download",
+        "workers": workers,
     })
 
-    conn = get_conn(db_cfg)
-    try:
-        targets = select_targets(conn, args.limit)
-        last_call = 0.0
-        for t in targets:
-            now = time.time()
-            wait = rate_limit_sec - (now - last_call)
-            if wait > 0:
-                time.sleep(wait)
-
-            doc_id = t["doc_id"]
-            sec_code = t.get("sec_code") or ""
-            company_slug = slugify(t.get("company_name") or "")
-            submission_date = t.get("submission_date")
-            if not submission_date:
-                # fallback to today if missing
-                submission_date = datetime.now().date()
-
-            out_dir = raw_root / f"{submission_date:%Y/%m/%d}" / f"{doc_id}_{sec_code}_{company_slug}"
-            out_dir.mkdir(parents=True, exist_ok=True)
-            zip_path = out_dir / "document.zip"
-
-            data = fetch_document_zip(base_url, api_key, doc_id, doc_type=1)
-            last_call = time.time()
-
-            zip_path.write_bytes(data)
-            update_zip_path(conn, doc_id, str(zip_path))
-            insert_raw_file(conn, doc_id, "zip", str(zip_path), len(data), sha256_bytes(data))
-
-            log_jsonl(doc_log, {
-                "ts": datetime.now().isoformat(),
-                "level": "INFO",
-                "event": "zip_downloaded",
-                "run_id": run_id,
-                "doc_id": doc_id,
-                "sec_code": sec_code,
-                "status": "success",
-                "size_bytes": len(data),
-                "sha256": sha256_bytes(data),
-            })
-    finally:
-        conn.close()
+    limiter = TokenBucket.from_interval(rate_limit_sec, burst=burst)
+    queue = WorkQueue(args.limit)
+    with EdinetClient.from_config(edinet_cfg, limiter=limiter, pool_size=workers) as client:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip") as pool:
+            futures = [
+                pool.submit(run_worker, db_cfg, queue, client, raw_root, run_id, doc_log)
+                for _ in range(workers)
+            ]
+            downloaded = sum(f.result() for f in futures)
+        http_summary = client.latency_summary()
 
     log_jsonl(run_log, {
         "ts": datetime.now().isoformat(),
         "level": "INFO",
         "event": "run_end",
         "run_id": run_id,
+        "documents": downloaded,
+        "failed": len(queue.failed),
+        "http": http_summary,
     })
     return 0
 
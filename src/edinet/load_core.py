@@ -1,254 +1,336 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
+import asyncio
 from datetime import datetime
 from pathlib import Path
 import sys
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from lib.config import load_config
-from lib.db import get_conn
+from lib.db import execute_prepared, get_conn, prepared_statement, status_statement, update_document_status
+from lib.db_async import check_backend, get_async_conn
+from lib.keyhash import fact_key_hash
 from lib.logger import log_jsonl
 
 
+# 書類ごと・ファクトごとに繰り返す文は接続ごとに1回だけ PREPARE する（lib.db.execute_prepared）
+# company の upsert は doc_id だけを引数にした3文で行う（前の文の結果を待たずに続けて送れる）
+# 優先順位: JCN → EDINETコード → 証券コード+社名
+UPDATE_COMPANY_BY_JCN = prepared_statement(
+    "core_update_company_by_jcn",
+    """
+    UPDATE core.company c
+    SET edinet_code = r.edinet_code,
+        sec_code = r.sec_code,
+        company_name = r.company_name
+    FROM raw.edinet_document r
+    WHERE r.doc_id = %s
+      AND r.jcn <> ''
+      AND c.jcn = r.jcn
+    """,
+)
+
+# JCN あり: 上の UPDATE で一致しなかったとき / JCN なし: EDINETコードがあるとき
+UPSERT_COMPANY_BY_EDINET_CODE = prepared_statement(
+    "core_upsert_company_by_edinet_code",
+    """
+    INSERT INTO core.company (edinet_code, sec_code, jcn, company_name)
+    SELECT r.edinet_code, r.sec_code, r.jcn, r.company_name
+    FROM raw.edinet_document r
+    WHERE r.doc_id = %s
+      AND CASE
+            WHEN r.jcn <> '' THEN NOT EXISTS (SELECT 1 FROM core.company c WHERE c.jcn = r.jcn)
+            ELSE r.edinet_code <> ''
+          END
+    ON CONFLICT (edinet_code) DO UPDATE
+    SET sec_code = EXCLUDED.sec_code,
+        jcn = EXCLUDED.jcn,
+        company_name = EXCLUDED.company_name
+    """,
+)
+
+INSERT_COMPANY_BY_SEC_CODE = prepared_statement(
+    "core_insert_company_by_sec_code",
+    """
+    INSERT INTO core.company (edinet_code, sec_code, jcn, company_name)
+    SELECT r.edinet_code, r.sec_code, r.jcn, r.company_name
+    FROM raw.edinet_document r
+    WHERE r.doc_id = %s
+      AND COALESCE(r.jcn, '') = ''
+      AND COALESCE(r.edinet_code, '') = ''
+      AND NOT EXISTS (
+          SELECT 1 FROM core.company c
+          WHERE c.sec_code = r.sec_code AND c.company_name = r.company_name
+      )
+    """,
+)
+
+COMPANY_STATEMENTS = (UPDATE_COMPANY_BY_JCN, UPSERT_COMPANY_BY_EDINET_CODE, INSERT_COMPANY_BY_SEC_CODE)
+
+
 def upsert_company(conn, doc_id: str) -> None:
     """
     優先順位: JCN → EDINETコード → 証券コード+社名
     """
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT edinet_code, sec_code, jcn, company_name
-            FROM raw.edinet_document
-            WHERE doc_id = %s
-            """,
-            (doc_id,),
-        )
-        row = cur.fetchone()
-        if not row:
-            return
-        edinet_code, sec_code, jcn, company_name = row
-
-        if jcn:
-            cur.execute(
-                """
-                UPDATE core.company
-                SET edinet_code = %s,
-                    sec_code = %s,
-                    company_name = %s
-                WHERE jcn = %s
-                """,
-                (edinet_code, sec_code, company_name, jcn),
-            )
-            if cur.rowcount == 0:
-                cur.execute(
-                    """
-                    INSERT INTO core.company (edinet_code, sec_code, jcn, company_name)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (edinet_code) DO UPDATE
-                    SET sec_code = EXCLUDED.sec_code,
-                        jcn = EXCLUDED.jcn,
-                        company_name = EXCLUDED.company_name
-                    """,
-                    (edinet_code, sec_code, jcn, company_name),
-                )
-        elif edinet_code:
-            cur.execute(
-                """
-                INSERT INTO core.company (edinet_code, sec_code, jcn, company_name)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (edinet_code) DO UPDATE
-                SET sec_code = EXCLUDED.sec_code,
-                    jcn = EXCLUDED.jcn,
-                    company_name = EXCLUDED.company_name
-                """,
-                (edinet_code, sec_code, jcn, company_name),
-            )
-        else:
-            cur.execute(
-                """
-                SELECT company_id FROM core.company
-                WHERE sec_code = %s AND company_name = %s
-                """,
-                (sec_code, company_name),
-            )
-            if not cur.fetchone():
-                cur.execute(
-                    """
-                    INSERT INTO core.company (edinet_code, sec_code, jcn, company_name)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (edinet_code, sec_code, jcn, company_name),
-                )
+        for stmt in COMPANY_STATEMENTS:
+            execute_prepared(cur, stmt, (doc_id,))
 
 
-def upsert_document(conn, doc_id: str) -> None:
-    sql = """
-        INSERT INTO core.document (
-            doc_id, company_id, doc_type_code, submission_date, period_start, period_end,
-            fiscal_year, accounting_standard, is_consolidated, is_amended, parent_doc_id, source_doc_id
-        )
-        SELECT
-            r.doc_id,
-            c.company_id,
-            r.doc_type_code,
-            r.submission_date,
-            r.period_start,
-            r.period_end,
-            r.fiscal_year,
-            r.accounting_standard,
-            NULL::boolean as is_consolidated,
-            r.is_amended,
-            r.parent_doc_id,
-            r.doc_id as source_doc_id
-        FROM raw.edinet_document r
-        JOIN core.company c
-          ON (c.jcn IS NOT NULL AND c.jcn = r.jcn)
-          OR (c.jcn IS NULL AND c.edinet_code = r.edinet_code)
-        WHERE r.doc_id = %s
-        ON CONFLICT (doc_id) DO UPDATE
-        SET company_id = EXCLUDED.company_id,
-            doc_type_code = EXCLUDED.doc_type_code,
-            submission_date = EXCLUDED.submission_date,
-            period_start = EXCLUDED.period_start,
-            period_end = EXCLUDED.period_end,
-            fiscal_year = EXCLUDED.fiscal_year,
-            accounting_standard = EXCLUDED.accounting_standard,
-            parent_doc_id = EXCLUDED.parent_doc_id
+UPSERT_CORE_DOCUMENT = prepared_statement(
+    "core_upsert_document",
     """
+    INSERT INTO core.document (
+        doc_id, company_id, doc_type_code, submission_date, period_start, period_end,
+        fiscal_year, accounting_standard, is_consolidated, is_amended, parent_doc_id, source_doc_id
+    )
+    SELECT
+        r.doc_id,
+        c.company_id,
+        r.doc_type_code,
+        r.submission_date,
+        r.period_start,
+        r.period_end,
+        r.fiscal_year,
+        r.accounting_standard,
+        NULL::boolean as is_consolidated,
+        r.is_amended,
+        r.parent_doc_id,
+        r.doc_id as source_doc_id
+    FROM raw.edinet_document r
+    JOIN core.company c
+      ON (c.jcn IS NOT NULL AND c.jcn = r.jcn)
+      OR (c.jcn IS NULL AND c.edinet_code = r.edinet_code)
+    WHERE r.doc_id = %s
+    ON CONFLICT (doc_id) DO UPDATE
+    SET company_id = EXCLUDED.company_id,
+        doc_type_code = EXCLUDED.doc_type_code,
+        submission_date = EXCLUDED.submission_date,
+        period_start = EXCLUDED.period_start,
+        period_end = EXCLUDED.period_end,
+        fiscal_year = EXCLUDED.fiscal_year,
+        accounting_standard = EXCLUDED.accounting_standard,
+        parent_doc_id = EXCLUDED.parent_doc_id
+    """,
+)
+
+
+def upsert_document(conn, doc_id: str) -> None:
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id,))
+        execute_prepared(cur, UPSERT_CORE_DOCUMENT, (doc_id,))
 
 
-def upsert_concepts(conn, doc_id: str) -> None:
-    sql = """
-        INSERT INTO core.concept (namespace, element_name, label_ja, label_en, data_type, period_type, balance_type, is_standard)
-        SELECT DISTINCT
-            concept_namespace,
-            concept_name,
-            NULL::text AS label_ja,
-            NULL::text AS label_en,
-            NULL::text AS data_type,
-            NULL::text AS period_type,
-            NULL::text AS balance_type,
-            CASE
-                WHEN concept_namespace IN ('jpdei_cor','jpcrp_cor','jppfs_cor','jpigp_cor','ifrs-full')
-                THEN TRUE
-                ELSE FALSE
-            END AS is_standard
-        FROM staging.fact
-        WHERE doc_id = %s
-        ON CONFLICT (namespace, element_name) DO NOTHING
+UPSERT_CORE_CONCEPTS = prepared_statement(
+    "core_upsert_concepts",
     """
+    INSERT INTO core.concept (namespace, element_name, label_ja, label_en, data_type, period_type, balance_type, is_standard)
+    SELECT DISTINCT
+        concept_namespace,
+        concept_name,
+        NULL::text AS label_ja,
+        NULL::text AS label_en,
+        NULL::text AS data_type,
+        NULL::text AS period_type,
+        NULL::text AS balance_type,
+        CASE
+            WHEN concept_namespace IN ('jpdei_cor','jpcrp_cor','jppfs_cor','jpigp_cor','ifrs-full')
+            THEN TRUE
+            ELSE FALSE
+        END AS is_standard
+    FROM staging.fact
+    WHERE doc_id = %s
+    ON CONFLICT (namespace, element_name) DO NOTHING
+    """,
+)
+
+
+def upsert_concepts(conn, doc_id: str) -> None:
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id,))
+        execute_prepared(cur, UPSERT_CORE_CONCEPTS, (doc_id,))
 
 
-def upsert_contexts(conn, doc_id: str) -> None:
-    sql = """
-        INSERT INTO core.context (
-            document_id, context_key, period_type, period_start, period_end, instant_date,
-            entity_identifier, is_consolidated, dimensions
-        )
-        SELECT
-            d.document_id,
-            c.context_ref,
-            c.period_type,
-            c.period_start,
-            c.period_end,
-            c.instant_date,
-            c.entity_identifier,
-            c.is_consolidated,
-            c.dimensions
-        FROM staging.context c
-        JOIN core.document d ON d.doc_id = c.doc_id
-        WHERE c.doc_id = %s
-        ON CONFLICT (document_id, context_key) DO UPDATE
-        SET period_type = EXCLUDED.period_type,
-            period_start = EXCLUDED.period_start,
-            period_end = EXCLUDED.period_end,
-            instant_date = EXCLUDED.instant_date,
-            entity_identifier = EXCLUDED.entity_identifier,
-            is_consolidated = EXCLUDED.is_consolidated,
-            dimensions = EXCLUDED.dimensions
+UPSERT_CORE_CONTEXTS = prepared_statement(
+    "core_upsert_contexts",
     """
+    INSERT INTO core.context (
+        document_id, context_key, signature_id, period_type, period_start, period_end, instant_date,
+        is_consolidated
+    )
+    SELECT
+        d.document_id,
+        c.context_ref,
+        c.signature_id,
+        s.period_type,
+        s.period_start,
+        s.period_end,
+        s.instant_date,
+        s.is_consolidated
+    FROM staging.context c
+    JOIN core.context_signature s ON s.signature_id = c.signature_id
+    JOIN core.document d ON d.doc_id = c.doc_id
+    WHERE c.doc_id = %s
+    ON CONFLICT (document_id, context_key) DO UPDATE
+    SET signature_id = EXCLUDED.signature_id,
+        period_type = EXCLUDED.period_type,
+        period_start = EXCLUDED.period_start,
+        period_end = EXCLUDED.period_end,
+        instant_date = EXCLUDED.instant_date,
+        is_consolidated = EXCLUDED.is_consolidated
+    """,
+)
+
+
+def upsert_contexts(conn, doc_id: str) -> None:
+    # 次元は core.context_signature 側に持ち、core.context は期間の列だけ冗長に保持する
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id,))
+        execute_prepared(cur, UPSERT_CORE_CONTEXTS, (doc_id,))
 
 
-def upsert_units(conn, doc_id: str) -> None:
-    sql = """
-        INSERT INTO core.unit (unit_key, measures)
-        SELECT DISTINCT
-            CASE
-                WHEN EXISTS (
-                    SELECT 1 FROM jsonb_array_elements_text(u.measures->'numerator') m
-                    WHERE m = 'iso4217:JPY'
-                ) THEN 'JPY'
-                WHEN EXISTS (
-                    SELECT 1 FROM jsonb_array_elements_text(u.measures->'numerator') m
-                    WHERE m LIKE 'iso4217:%%'
-                ) THEN 'CURRENCY_OTHER'
-                WHEN jsonb_array_length(u.measures->'denominator') = 0
-                     AND jsonb_array_length(u.measures->'numerator') = 1
-                THEN (u.measures->'numerator'->>0)
-                ELSE 'OTHER'
-            END AS unit_key,
-            u.measures
-        FROM staging.unit u
-        WHERE u.doc_id = %s
-        ON CONFLICT (unit_key) DO NOTHING
+UPSERT_CORE_UNITS = prepared_statement(
+    "core_upsert_units",
     """
-    with conn.cursor() as cur:
-        cur.execute(sql, (doc_id,))
+    INSERT INTO core.unit (unit_key, measures)
+    SELECT DISTINCT
+        CASE
+            WHEN EXISTS (
+                SELECT 1 FROM jsonb_array_elements_text(u.measures->'numerator') m
+                WHERE m = 'iso4217:JPY'
+            ) THEN 'JPY'
+            WHEN EXISTS (
+                SELECT 1 FROM jsonb_array_elements_text(u.measures->'numerator') m
+                WHERE m LIKE 'iso4217:%%'
+            ) THEN 'CURRENCY_OTHER'
+            WHEN jsonb_array_length(u.measures->'denominator') = 0
+                 AND jsonb_array_length(u.measures->'numerator') = 1
+            THEN (u.measures->'numerator'->>0)
+            ELSE 'OTHER'
+        END AS unit_key,
+        u.measures
+    FROM staging.unit u
+    WHERE u.doc_id = %s
+    ON CONFLICT (unit_key) DO NOTHING
+    """,
+)
 
 
-def load_facts(conn, doc_id: str) -> int:
-    # preload context map
+def upsert_units(conn, doc_id: str) -> None:
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT cx.context_key, cx.context_id, cx.period_end, cx.is_consolidated
-            FROM core.context cx
-            JOIN core.document d ON d.document_id = cx.document_id
-            WHERE d.doc_id = %s
-            """,
-            (doc_id,),
-        )
-        context_map = {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+        execute_prepared(cur, UPSERT_CORE_UNITS, (doc_id,))
 
-    # preload unit map
-    with conn.cursor() as cur:
-        cur.execute("SELECT unit_key, unit_id FROM core.unit")
-        unit_map = {r[0]: r[1] for r in cur.fetchall()}
-
-    sql = """
-        SELECT
-            f.concept_qname,
-            f.concept_namespace,
-            f.concept_name,
-            f.value_numeric,
-            f.value_text,
-            f.decimals,
-            f.is_nil,
-            sc.context_ref,
-            su.measures,
-            d.document_id,
-            d.company_id,
-            d.accounting_standard
-        FROM staging.fact f
-        JOIN staging.context sc ON sc.id = f.context_id
-        LEFT JOIN staging.unit su ON su.id = f.unit_id
-        JOIN core.document d ON d.doc_id = f.doc_id
-        WHERE f.doc_id = %s
+
+# sql/06 で再計算できなかった fact（v1 キー）は ON CONFLICT (document_id, fact_hash) に一致せず、
+# 再取込で v2 の行と二重になる。取り込む前に書類の v1 の行を消す（移行済みの DB では 0 件）
+DELETE_LEGACY_FACTS = prepared_statement(
+    "core_delete_legacy_facts",
     """
-    rows = []
+    DELETE FROM core.financial_fact f
+    USING core.document d
+    WHERE d.doc_id = %s
+      AND f.document_id = d.document_id
+      AND get_byte(f.fact_hash, 0) = 1
+    """,
+)
+
+
+def delete_legacy_facts(conn, doc_id: str) -> int:
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id,))
-        rows = cur.fetchall()
+        execute_prepared(cur, DELETE_LEGACY_FACTS, (doc_id,))
+        return cur.rowcount
+
+
+SELECT_CORE_CONTEXTS = prepared_statement(
+    "core_select_contexts",
+    """
+    SELECT cx.context_key, cx.context_id, cx.period_end, cx.is_consolidated
+    FROM core.context cx
+    JOIN core.document d ON d.document_id = cx.document_id
+    WHERE d.doc_id = %s
+    """,
+)
+
+SELECT_STAGING_FACTS = prepared_statement(
+    "core_select_staging_facts",
+    """
+    SELECT
+        f.concept_qname,
+        f.concept_namespace,
+        f.concept_name,
+        f.value_numeric,
+        f.value_text,
+        f.decimals,
+        f.is_nil,
+        sc.context_ref,
+        su.measures,
+        d.document_id,
+        d.company_id,
+        d.accounting_standard
+    FROM staging.fact f
+    JOIN staging.context sc ON sc.id = f.context_id
+    LEFT JOIN staging.unit su ON su.id = f.unit_id
+    JOIN core.document d ON d.doc_id = f.doc_id
+    WHERE f.doc_id = %s
+    """,
+)
+
+# SELECT 句のパラメータは型を推論できないので明示する（%s の出現順）
+UPSERT_FINANCIAL_FACT = prepared_statement(
+    "core_upsert_financial_fact",
+    """
+    INSERT INTO core.financial_fact (
+        document_id, company_id, concept_id, context_id, unit_id,
+        value_numeric, value_text, decimals, is_nil, fact_hash,
+        period_end, is_consolidated, accounting_standard
+    )
+    SELECT
+        %s, %s, c.concept_id, %s, %s,
+        %s, %s, %s, %s, %s,
+        %s, %s, %s
+    FROM core.concept c
+    WHERE c.namespace = %s AND c.element_name = %s
+    ON CONFLICT (document_id, fact_hash) DO UPDATE
+    SET value_numeric = EXCLUDED.value_numeric,
+        value_text = EXCLUDED.value_text,
+        decimals = EXCLUDED.decimals,
+        is_nil = EXCLUDED.is_nil
+    """,
+    (
+        "bigint", "bigint", "bigint", "bigint",
+        "numeric", "text", "smallint", "boolean", "bytea",
+        "date", "boolean", "varchar", "varchar", "varchar",
+    ),
+)
+
+
+SELECT_UNITS = "SELECT unit_key, unit_id FROM core.unit"
+
+# UPSERT_FINANCIAL_FACT の引数の順（fact_rows が返すタプルの並び）
+FACT_ROW_COLUMNS: Tuple[str, ...] = (
+    "document_id", "company_id", "context_id", "unit_id",
+    "value_numeric", "value_text", "decimals", "is_nil", "fact_hash",
+    "period_end", "is_consolidated", "accounting_standard",
+    "namespace", "element_name",
+)
+
+
+def fact_rows(
+    doc_id: str,
+    context_rows: Iterable[Sequence[Any]],
+    unit_rows: Iterable[Sequence[Any]],
+    staging_rows: Iterable[Sequence[Any]],
+) -> List[Tuple[Any, ...]]:
+    """
+    staging.fact の行を core.financial_fact の upsert 引数（FACT_ROW_COLUMNS の順）に変換する
+
+    Args:
+        context_rows: SELECT_CORE_CONTEXTS の結果
+        unit_rows: SELECT_UNITS の結果
+        staging_rows: SELECT_STAGING_FACTS の結果
+    """
+    context_map = {r[0]: (r[1], r[2], r[3]) for r in context_rows}
+    unit_map = {r[0]: r[1] for r in unit_rows}
 
     insert_rows = []
     for (
@@ -264,7 +346,7 @@ def load_facts(conn, doc_id: str) -> int:
         document_id,
         company_id,
         accounting_standard,
-    ) in rows:
+    ) in staging_rows:
         ctx = context_map.get(context_ref)
         if not ctx:
             continue
@@ -288,16 +370,12 @@ def load_facts(conn, doc_id: str) -> int:
             continue
 
         unit_id = unit_map.get(unit_key) if unit_key else None
-        fact_hash = hashlib.sha256(
-            f"{doc_id}|{concept_qname}|{context_ref}|{unit_key}".encode("utf-8")
-        ).hexdigest()
+        fact_hash = fact_key_hash(doc_id, concept_qname, context_ref, unit_key)
 
         insert_rows.append(
             (
                 document_id,
                 company_id,
-                concept_namespace,
-                concept_name,
                 context_id,
                 unit_id,
                 value_numeric,
@@ -308,70 +386,126 @@ def load_facts(conn, doc_id: str) -> int:
                 period_end,
                 is_consolidated,
                 accounting_standard,
+                concept_namespace,
+                concept_name,
             )
         )
+    return insert_rows
+
 
+def load_facts(conn, doc_id: str) -> int:
+    # preload context / unit map
+    with conn.cursor() as cur:
+        execute_prepared(cur, SELECT_CORE_CONTEXTS, (doc_id,))
+        context_rows = cur.fetchall()
+        cur.execute(SELECT_UNITS)
+        unit_rows = cur.fetchall()
+        execute_prepared(cur, SELECT_STAGING_FACTS, (doc_id,))
+        staging_rows = cur.fetchall()
+
+    insert_rows = fact_rows(doc_id, context_rows, unit_rows, staging_rows)
     if not insert_rows:
         return 0
 
-    insert_sql = """
-        INSERT INTO core.financial_fact (
-            document_id, company_id, concept_id, context_id, unit_id,
-            value_numeric, value_text, decimals, is_nil, fact_hash,
-            period_end, is_consolidated, accounting_standard
-        )
-        SELECT
-            %s, %s, c.concept_id, %s, %s,
-            %s, %s, %s, %s, %s,
-            %s, %s, %s
-        FROM core.concept c
-        WHERE c.namespace = %s AND c.element_name = %s
-        ON CONFLICT (document_id, fact_hash) DO UPDATE
-        SET value_numeric = EXCLUDED.value_numeric,
-            value_text = EXCLUDED.value_text,
-            decimals = EXCLUDED.decimals,
-            is_nil = EXCLUDED.is_nil
-    """
     with conn.cursor() as cur:
         for r in insert_rows:
-            (
-                document_id,
-                company_id,
-                concept_namespace,
-                concept_name,
-                context_id,
-                unit_id,
-                value_numeric,
-                value_text,
-                decimals,
-                is_nil,
-                fact_hash,
-                period_end,
-                is_consolidated,
-                accounting_standard,
-            ) = r
-            cur.execute(
-                insert_sql,
-                (
-                    document_id,
-                    company_id,
-                    context_id,
-                    unit_id,
-                    value_numeric,
-                    value_text,
-                    decimals,
-                    is_nil,
-                    fact_hash,
-                    period_end,
-                    is_consolidated,
-                    accounting_standard,
-                    concept_namespace,
-                    concept_name,
-                ),
-            )
+            execute_prepared(cur, UPSERT_FINANCIAL_FACT, r)
+    return len(insert_rows)
+
+
+def load_document(conn, doc_id: str) -> int:
+    """staging の1書類を core に取り込み、commit する（取込 fact 件数を返す）"""
+    upsert_company(conn, doc_id)
+    upsert_document(conn, doc_id)
+    upsert_concepts(conn, doc_id)
+    upsert_contexts(conn, doc_id)
+    upsert_units(conn, doc_id)
+    delete_legacy_facts(conn, doc_id)
+    count = load_facts(conn, doc_id)
+    update_document_status(conn, doc_id, "loaded", commit=False)
+    conn.commit()
+    return count
+
+
+# 互いの結果を待たずに続けて送れる書類単位の文（引数はすべて doc_id）
+DOCUMENT_STATEMENTS = (
+    *COMPANY_STATEMENTS,
+    UPSERT_CORE_DOCUMENT,
+    UPSERT_CORE_CONCEPTS,
+    UPSERT_CORE_CONTEXTS,
+    UPSERT_CORE_UNITS,
+    DELETE_LEGACY_FACTS,
+)
+
+FACT_COPY_TABLE = "_copy_core_financial_fact"
+
+MERGE_COPIED_FACTS = f"""
+    INSERT INTO core.financial_fact (
+        document_id, company_id, concept_id, context_id, unit_id,
+        value_numeric, value_text, decimals, is_nil, fact_hash,
+        period_end, is_consolidated, accounting_standard
+    )
+    SELECT
+        t.document_id, t.company_id, c.concept_id, t.context_id, t.unit_id,
+        t.value_numeric, t.value_text, t.decimals, t.is_nil, t.fact_hash,
+        t.period_end, t.is_consolidated, t.accounting_standard
+    FROM {FACT_COPY_TABLE} t
+    JOIN core.concept c ON c.namespace = t.namespace AND c.element_name = t.element_name
+    ON CONFLICT (document_id, fact_hash) DO UPDATE
+    SET value_numeric = EXCLUDED.value_numeric,
+        value_text = EXCLUDED.value_text,
+        decimals = EXCLUDED.decimals,
+        is_nil = EXCLUDED.is_nil
+"""
+
+
+async def load_document_async(conn, doc_id: str) -> int:
+    """
+    load_document の psycopg 3 版（db.backend: psycopg。conn は lib.db_async の接続）
+
+    company〜unit の upsert と fact の材料の読み出しをパイプラインで1回の往復にまとめ、
+    fact は一時テーブルへのバイナリ COPY + 1文の upsert で反映する。取り込む内容は load_document と同じ。
+    """
+    fact_types = list(UPSERT_FINANCIAL_FACT.types)
+    temp_columns = ", ".join(f"{c} {t}" for c, t in zip(FACT_ROW_COLUMNS, fact_types))
+    async with conn.transaction():
+        async with conn.pipeline():
+            for stmt in DOCUMENT_STATEMENTS:
+                await conn.execute(stmt.sql, (doc_id,))
+            contexts = await conn.execute(SELECT_CORE_CONTEXTS.sql, (doc_id,))
+            units = await conn.execute(SELECT_UNITS)
+            staging = await conn.execute(SELECT_STAGING_FACTS.sql, (doc_id,))
+            # 一時テーブルは書類ごとに作り直すので、それを参照する文は準備しない
+            await conn.execute(f"DROP TABLE IF EXISTS pg_temp.{FACT_COPY_TABLE}", prepare=False)
+            await conn.execute(f"CREATE TEMP TABLE {FACT_COPY_TABLE} ({temp_columns}) ON COMMIT DROP", prepare=False)
+        insert_rows = fact_rows(doc_id, await contexts.fetchall(), await units.fetchall(), await staging.fetchall())
+
+        if insert_rows:
+            # 1文の ON CONFLICT DO UPDATE は同じ行を2回更新できないので、同じ fact_hash は後勝ちにする
+            latest = {r[FACT_ROW_COLUMNS.index("fact_hash")]: r for r in insert_rows}
+            async with conn.cursor() as cur:
+                copy_sql = f"COPY {FACT_COPY_TABLE} ({', '.join(FACT_ROW_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+                async with cur.copy(copy_sql) as copy:
+                    copy.set_types(fact_types)
+                    for r in latest.values():
+                        await copy.write_row(r)
+
+        status = status_statement("loaded")
+        async with conn.pipeline():
+            if insert_rows:
+                await conn.execute(MERGE_COPIED_FACTS, prepare=False)
+            await conn.execute(status.sql, ("loaded", doc_id))
     return len(insert_rows)
 
 
+async def _load_async(db_cfg: Dict[str, Any], doc_id: str) -> int:
+    conn = await get_async_conn(db_cfg)
+    try:
+        return await load_document_async(conn, doc_id)
+    finally:
+        await conn.close()
+
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", default="src/config/config.yaml")
@@ -386,17 +520,15 @@ def main() -> int:
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     doc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"doc_{datetime.now():%Y%m%d}.jsonl"
 
-    conn = get_conn(db_cfg)
-    try:
-        upsert_company(conn, args.doc_id)
-        upsert_document(conn, args.doc_id)
-        upsert_concepts(conn, args.doc_id)
-        upsert_contexts(conn, args.doc_id)
-        upsert_units(conn, args.doc_id)
-        count = load_facts(conn, args.doc_id)
-        conn.commit()
-    finally:
-        conn.close()
+    # db.backend: psycopg は psycopg 3 のパイプラインモードで取り込む（lib.db_async）
+    if check_backend(db_cfg.get("backend", "psycopg2")) == "psycopg":
+        count = asyncio.run(_load_async(db_cfg, args.doc_id))
+    else:
+        conn = get_conn(db_cfg)
+        try:
+            count = load_document(conn, args.doc_id)
+        finally:
+            conn.close()
 
     log_jsonl(doc_log, {
         "ts": datetime.now().isoformat(),
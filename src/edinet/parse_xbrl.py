@@ -1,67 +1,144 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
+import copy
 import json
+import multiprocessing
+import os
+import re
+import shutil
 import sys
+import tempfile
+import time
+import unicodedata
 import zipfile
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
-from pathlib import Path
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from lib.arelle_session import DEFAULT_MAX_DOCUMENTS, ArelleSession, get_session
 from lib.config import load_config
 from lib.concept_mapper import mapper as concept_mapper, FinancialMetric
 from lib.unit_normalizer import normalizer as unit_normalizer
 from lib.concept_hierarchy import ConceptHierarchyExtractor  # Issue #2
+from lib.fact_batch import FactBatch, RawFact
+from lib.keyhash import fact_key_hash, key_hash
+from lib import parse_cache
+from lib.parse_cache import ParseCache
 from lib.db import (
+    PARSE_FAILED,
+    QC_FAILED,
+    StagingTransaction,
+    execute_prepared,
     get_conn,
-    load_context_map,
-    load_unit_map,
-    upsert_staging_concept_hierarchy,
-    upsert_staging_contexts,
-    upsert_staging_facts,
-    upsert_staging_units,
+    get_pool,
+    prepared_statement,
+    select_doc_ids_by_status,
+    update_document_status,
 )
 from lib.logger import log_jsonl
 
 
+PUBLIC_DOC_PREFIX = "XBRL/PublicDoc/"
+# Arelle が読む PublicDoc のファイル（画像・PDF 等は展開しない）
+PUBLIC_DOC_SUFFIXES = (".xbrl", ".xsd", ".xml", ".htm", ".html", ".xhtml")
+
+
 def extract_zip(zip_path: Path, extract_dir: Path) -> None:
     extract_dir.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(zip_path, "r") as zf:
         zf.extractall(extract_dir)
 
 
-def find_xbrl_file(extract_dir: Path) -> Optional[Path]:
-    public_dir = extract_dir / "XBRL" / "PublicDoc"
-    if not public_dir.exists():
-        return None
+def pick_xbrl_name(names: Iterable[str]) -> Optional[str]:
+    """PublicDoc 直下のファイル名一覧から解析対象（エントリポイント）を選ぶ"""
+    names = sorted(names)
 
     # Prefer .xbrl instance (most stable for parsing)
-    xbrl_files = sorted(public_dir.glob("*.xbrl"))
+    xbrl_files = [n for n in names if n.endswith(".xbrl")]
     if xbrl_files:
         return xbrl_files[0]
 
     # Fallback: IXBRL manifest if exists
-    manifest = public_dir / "manifest_PublicDoc.xml"
-    if manifest.exists():
-        return manifest
+    if "manifest_PublicDoc.xml" in names:
+        return "manifest_PublicDoc.xml"
 
     # Fallback: iXBRL (.htm) - prefer header file if present
-    htm_files = sorted(public_dir.glob("*.htm"))
+    htm_files = [n for n in names if n.endswith(".htm")]
     if htm_files:
-        for f in htm_files:
-            if "header" in f.name.lower():
-                return f
+        for n in htm_files:
+            if "header" in n.lower():
+                return n
         return htm_files[0]
 
     return None
 
 
-def sha256_text(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+def find_xbrl_file(extract_dir: Path) -> Optional[Path]:
+    public_dir = extract_dir / "XBRL" / "PublicDoc"
+    if not public_dir.exists():
+        return None
+    name = pick_xbrl_name(p.name for p in public_dir.iterdir() if p.is_file())
+    return public_dir / name if name else None
+
+
+def public_doc_members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """ZIP 内の XBRL/PublicDoc 配下で解析に必要なメンバーを列挙"""
+    members = []
+    for info in zf.infolist():
+        if info.is_dir() or not info.filename.startswith(PUBLIC_DOC_PREFIX):
+            continue
+        parts = PurePosixPath(info.filename).parts
+        if ".." in parts or not info.filename.lower().endswith(PUBLIC_DOC_SUFFIXES):
+            continue
+        members.append(info)
+    return members
+
+
+@contextmanager
+def open_xbrl_entry(
+    zip_path: Path,
+    extract_dir: Optional[Path] = None,
+    work_dir: Optional[Path] = None,
+) -> Iterator[Optional[Path]]:
+    """
+    解析対象の XBRL ファイルのパスを返すコンテキストマネージャ
+
+    - extract_dir 指定時: 従来どおり ZIP 全体を extract_dir に展開して残す（未展開の場合のみ）
+    - extract_dir なし : PublicDoc の必要なメンバーだけを一時ディレクトリに書き出し、終了時に削除する
+
+    Arelle はファイルパスで読み込む（スキーマ・リンクベースを相対参照する）ため、
+    メモリ上ではなく PublicDoc と同じ構成の一時ディレクトリを使う。
+    """
+    if extract_dir is not None:
+        if not extract_dir.exists():
+            extract_zip(zip_path, extract_dir)
+        yield find_xbrl_file(extract_dir)
+        return
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        members = public_doc_members(zf)
+        top_level = [m.filename[len(PUBLIC_DOC_PREFIX):] for m in members]
+        name = pick_xbrl_name(n for n in top_level if "/" not in n)
+        if name is None:
+            yield None
+            return
+        if work_dir is not None:
+            work_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="xbrl_", dir=work_dir) as tmp:
+            root = Path(tmp)
+            for info in members:
+                dest = root / info.filename
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as src, dest.open("wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            yield root / PUBLIC_DOC_PREFIX / name
 
 
 def to_decimal(val: Any) -> Optional[Decimal]:
@@ -73,28 +150,83 @@ def to_decimal(val: Any) -> Optional[Decimal]:
         return None
 
 
-def build_context_hash(rec: Dict[str, Any]) -> str:
+# context の属性のうち context_hash（= core.context_signature のキー）に含める列
+# entity_identifier は提出者ごとの値（書類・会社の属性）なので含めない。含めると同じ構造の
+# context が会社の数だけ別の署名になり、書類をまたいだ共有が効かなくなる
+SIGNATURE_FIELDS = (
+    "period_type",
+    "period_start",
+    "period_end",
+    "instant_date",
+    "is_consolidated",
+    "dimensions",
+)
+
+ContextSignature = Tuple[Any, ...]
+
+
+def context_signature(rec: Dict[str, Any]) -> ContextSignature:
+    """context_hash の元になる属性をハッシュ可能なタプルにする（context_ref / doc_id は含めない）"""
+    return (
+        rec.get("period_type"),
+        str(rec.get("period_start") or ""),
+        str(rec.get("period_end") or ""),
+        str(rec.get("instant_date") or ""),
+        rec.get("is_consolidated"),
+        tuple((rec.get("dimensions") or {}).items()),
+    )
+
+
+@lru_cache(maxsize=65536)
+def _signature_hash(signature: ContextSignature) -> bytes:
+    period_type, period_start, period_end, instant_date, is_consolidated, dims = signature
     payload = json.dumps(
         {
-            "period_type": rec.get("period_type"),
-            "period_start": str(rec.get("period_start") or ""),
-            "period_end": str(rec.get("period_end") or ""),
-            "instant_date": str(rec.get("instant_date") or ""),
-            "entity_identifier": rec.get("entity_identifier"),
-            "is_consolidated": rec.get("is_consolidated"),
-            "dimensions": rec.get("dimensions") or {},
+            "period_type": period_type,
+            "period_start": period_start,
+            "period_end": period_end,
+            "instant_date": instant_date,
+            "is_consolidated": is_consolidated,
+            "dimensions": dict(dims),
         },
         ensure_ascii=True,
         sort_keys=True,
     )
-    return sha256_text(payload)
+    return key_hash(payload)
+
+
+def build_context_hash(rec: Dict[str, Any]) -> bytes:
+    """
+    context の正規化ハッシュ（core.context_signature のキー）
+
+    CurrentYearDuration など同じ構造の context は書類をまたいで繰り返し現れるため、
+    同一プロセス内では属性タプルでメモ化し、JSON 化とハッシュ計算を1回にする。
+    """
+    return _signature_hash(context_signature(rec))
+
+
+def dimension_member_text(member: Any) -> str:
+    """
+    ディメンションのメンバーを文字列化する
+
+    Arelle の qnameDims の値は ModelDimensionValue で、str() すると
+    "ModelDimensionValue[番号, ファイル line N)" になるため、明示メンバーは QName、
+    型付きメンバーは値のテキストを使う（文字列はそのまま）。
+    """
+    if getattr(member, "isTyped", False):
+        typed = member.typedMember
+        return typed.stringValue.strip() if typed is not None else ""
+    if getattr(member, "isExplicit", False):
+        qname = member.memberQname
+        return str(qname) if qname is not None else member.stringValue.strip()
+    return str(member)
 
 
 def normalize_dims(dims: Dict[Any, Any]) -> Dict[str, str]:
     normalized: Dict[str, str] = {}
     for axis_qname, member_qname in dims.items():
         axis = str(axis_qname)
-        member = str(member_qname)
+        member = dimension_member_text(member_qname)
         normalized[axis] = member
     return dict(sorted(normalized.items(), key=lambda x: x[0]))
 
@@ -130,15 +262,41 @@ def infer_consolidated(dims: Dict[str, str]) -> Optional[bool]:
     return None
 
 
-def parse_with_arelle(xbrl_path: Path, doc_id: str) -> Dict[str, Any]:
-    try:
-        from arelle import Cntlr  # type: ignore
-    except Exception as exc:
-        raise RuntimeError("Arelle is not installed. Install arelle-release.") from exc
+def parse_with_arelle(xbrl_path: Path, doc_id: str, session: Optional[ArelleSession] = None) -> Dict[str, Any]:
+    """
+    Arelle でインスタンスを読み込み、contexts / units / facts / concept_hierarchy を抽出する
+
+    ModelXbrl は抽出後に閉じるため、facts は Arelle オブジェクトではなく RawFact で返す。
+    session を省略した場合はプロセス共通のセッション（常駐コントローラ）を使う。
+    """
+    session = session or get_session()
+    with session.open(xbrl_path) as model_xbrl:
+        parsed = extract_model(model_xbrl, doc_id)
+        # 読み込み時のエラーコード（タクソノミ未取得など）。load_or_parse はこの結果をキャッシュしない
+        parsed["load_errors"] = [str(e) for e in (getattr(model_xbrl, "errors", None) or []) if e]
+        return parsed
+
+
+def extract_fact(f: Any) -> RawFact:
+    """ModelFact から staging 登録に必要な値だけを取り出す"""
+    is_numeric = f.isNumeric
+    is_nil = f.isNil
+    return RawFact(
+        concept_qname=str(f.qname),
+        concept_namespace=f.qname.prefix,
+        concept_name=f.qname.localName,
+        context_ref=f.contextID,
+        unit_ref=f.unitID or "",
+        is_nil=is_nil,
+        is_numeric=is_numeric,
+        # Bug #4 Fix: xValue from Arelle already includes decimal normalization
+        x_value=f.xValue if is_numeric and not is_nil else None,
+        value=None if is_numeric else f.value,
+        decimals=f.decimals,
+    )
 
-    cntlr = Cntlr.Cntlr(logFileName="logToPrint")
-    model_xbrl = cntlr.modelManager.load(str(xbrl_path))
 
+def extract_model(model_xbrl: Any, doc_id: str) -> Dict[str, Any]:
     contexts = []
     for _, ctx in model_xbrl.contexts.items():
         period_type = None
@@ -170,7 +328,6 @@ def parse_with_arelle(xbrl_path: Path, doc_id: str) -> Dict[str, Any]:
             "period_start": period_start,
             "period_end": period_end,
             "instant_date": instant_date,
-            "entity_identifier": entity_identifier,
             "is_consolidated": is_consolidated,
             "dimensions": dims or None,
         }
@@ -188,7 +345,7 @@ def parse_with_arelle(xbrl_path: Path, doc_id: str) -> Dict[str, Any]:
             "doc_id": doc_id,
             "unit_ref": unit.id,
             "measures": measures,
-            "unit_hash": sha256_text(json.dumps(measures, ensure_ascii=True, sort_keys=True)),
+            "unit_hash": key_hash(json.dumps(measures, ensure_ascii=True, sort_keys=True)),
         }
         units.append(rec)
 
@@ -205,48 +362,676 @@ def parse_with_arelle(xbrl_path: Path, doc_id: str) -> Dict[str, Any]:
         for rel in concept_relations
     ]
 
-    return {"contexts": contexts, "units": units, "facts": model_xbrl.facts, "concept_hierarchy": concept_hierarchy}
+    facts = [extract_fact(f) for f in model_xbrl.facts]
 
+    return {"contexts": contexts, "units": units, "facts": facts, "concept_hierarchy": concept_hierarchy}
 
-def main() -> int:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--config", default="src/config/config.yaml")
-    parser.add_argument("--doc-id", required=True)
-    args = parser.parse_args()
 
-    cfg = load_config(args.config)
-    db_cfg = cfg.get("db", {})
-    paths_cfg = cfg.get("paths", {})
+XBRLI_NS = "http://www.xbrl.org/2003/instance"
+XBRLDI_NS = "http://xbrl.org/2006/xbrldi"
+LINK_NS = "http://www.xbrl.org/2003/linkbase"
+XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
 
-    raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
-    log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
-    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    doc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"doc_{datetime.now():%Y%m%d}.jsonl"
 
-    conn = get_conn(db_cfg)
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(el: Any) -> str:
+    return (el.text or "").strip() if el is not None else ""
+
+
+def _qname_text(el: Any) -> str:
+    """要素の QName を Arelle の str(QName) と同じ "prefix:localName" 形式で返す"""
+    local = _local(el.tag)
+    return f"{el.prefix}:{local}" if el.prefix else local
+
+
+def _period_date(value: str, end_of_day: bool) -> Optional[Any]:
+    """
+    xbrli の日付/日時を date に変換する
+
+    Arelle（instantDatetime / endDatetime）と同じく、日付のみの instant / endDate は
+    翌日 0 時として扱う（end_of_day=True）。
+    """
+    value = value.strip()
+    if not value:
+        return None
+    day = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    if "T" in value:
+        return day + timedelta(days=1) if value[11:13] == "24" else day
+    return day + timedelta(days=1) if end_of_day else day
+
+
+def _stream_context(el: Any, doc_id: str) -> Dict[str, Any]:
+    period_type = None
+    period_start = None
+    period_end = None
+    instant_date = None
+    entity_identifier = None
+    dims: Dict[str, str] = {}
+    for child in el.iter():
+        tag = child.tag
+        if not isinstance(tag, str):
+            continue
+        if tag == f"{{{XBRLI_NS}}}identifier":
+            entity_identifier = f"{child.get('scheme')}|{_text(child)}"
+        elif tag == f"{{{XBRLI_NS}}}instant":
+            period_type = "instant"
+            instant_date = _period_date(child.text or "", end_of_day=True)
+            period_end = instant_date
+        elif tag == f"{{{XBRLI_NS}}}startDate":
+            period_type = "duration"
+            period_start = _period_date(child.text or "", end_of_day=False)
+        elif tag == f"{{{XBRLI_NS}}}endDate":
+            period_type = "duration"
+            period_end = _period_date(child.text or "", end_of_day=True)
+        elif tag == f"{{{XBRLDI_NS}}}explicitMember":
+            dims[child.get("dimension", "").strip()] = _text(child)
+        elif tag == f"{{{XBRLDI_NS}}}typedMember":
+            typed = next((c for c in child if isinstance(c.tag, str)), None)
+            dims[child.get("dimension", "").strip()] = "".join(typed.itertext()).strip() if typed is not None else ""
+
+    dims = normalize_dims(dims)
+    rec = {
+        "doc_id": doc_id,
+        "context_ref": el.get("id"),
+        "period_type": period_type,
+        "period_start": period_start,
+        "period_end": period_end,
+        "instant_date": instant_date,
+        "entity_identifier": entity_identifier,
+        "is_consolidated": infer_consolidated(dims),
+        "dimensions": dims or None,
+    }
+    rec["context_hash"] = build_context_hash(rec)
+    return rec
+
+
+def _stream_unit(el: Any, doc_id: str) -> Dict[str, Any]:
+    numerator = el.find(f"{{{XBRLI_NS}}}divide/{{{XBRLI_NS}}}unitNumerator")
+    denominator = el.find(f"{{{XBRLI_NS}}}divide/{{{XBRLI_NS}}}unitDenominator")
+    if numerator is None:
+        numerator = el
+    # Arelle の ModelUnit.measures と同じく prefix 付き名でソート
+    measures = {
+        "numerator": sorted(_text(m) for m in numerator.iterfind(f"{{{XBRLI_NS}}}measure")),
+        "denominator": sorted(_text(m) for m in denominator.iterfind(f"{{{XBRLI_NS}}}measure"))
+        if denominator is not None else [],
+    }
+    return {
+        "doc_id": doc_id,
+        "unit_ref": el.get("id"),
+        "measures": measures,
+        "unit_hash": key_hash(json.dumps(measures, ensure_ascii=True, sort_keys=True)),
+    }
+
+
+def _stream_fact(el: Any) -> RawFact:
+    """
+    ファクト要素を extract_fact と同じ形式の RawFact にする
+
+    DTS を読まないため、数値かどうかは unitRef の有無で判定する（XBRL 2.1 では数値項目のみ unitRef を持つ）。
+    """
+    unit_ref = (el.get("unitRef") or "").strip()
+    is_numeric = bool(unit_ref)
+    is_nil = el.get(XSI_NIL) in ("true", "1")
+    return RawFact(
+        concept_qname=_qname_text(el),
+        concept_namespace=el.prefix,
+        concept_name=_local(el.tag),
+        context_ref=el.get("contextRef"),
+        unit_ref=unit_ref,
+        is_nil=is_nil,
+        is_numeric=is_numeric,
+        x_value=to_decimal(_text(el)) if is_numeric and not is_nil else None,
+        # Arelle の textValue と同じく子要素のテキストは含めず、直下のテキストノードのみ
+        value=None if is_numeric else (el.text or "") + "".join(c.tail or "" for c in el),
+        decimals=el.get("decimals") or None,
+    )
+
+
+def parse_with_iterparse(xbrl_path: Path, doc_id: str) -> Dict[str, Any]:
+    """
+    .xbrl インスタンスを lxml iterparse でストリーミング解析する（DTS を読まない高速経路）
+
+    parse_with_arelle と同じ形式の contexts / units / facts を返す。
+    ルート直下の要素を1つ処理するごとに破棄するため、メモリ使用量は書類サイズにほぼ依存しない。
+    concept_hierarchy は DTS（リンクベース）が必要なため空で返す。
+    """
     try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT zip_path FROM raw.edinet_document WHERE doc_id = %s",
-                (args.doc_id,),
-            )
-            row = cur.fetchone()
-            if not row or not row[0]:
-                raise SystemExit(f"zip_path not found for doc_id={args.doc_id}")
-            zip_path = Path(row[0])
-    finally:
-        conn.close()
+        from lxml import etree  # type: ignore
+    except Exception as exc:
+        raise RuntimeError("lxml is not installed. Install lxml.") from exc
+
+    contexts = []
+    units = []
+    facts = []
+    depth = 0
+    for event, el in etree.iterparse(str(xbrl_path), events=("start", "end"), remove_comments=True, huge_tree=True):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+
+        tag = el.tag
+        if tag == f"{{{XBRLI_NS}}}context":
+            contexts.append(_stream_context(el, doc_id))
+        elif tag == f"{{{XBRLI_NS}}}unit":
+            units.append(_stream_unit(el, doc_id))
+        elif el.get("contextRef") is not None:
+            facts.append(_stream_fact(el))
+        # 処理済みのルート直下要素を解放する
+        el.clear()
+        parent = el.getparent()
+        while el.getprevious() is not None:
+            del parent[0]
+
+    return {"contexts": contexts, "units": units, "facts": facts, "concept_hierarchy": []}
+
+
+# Inline XBRL（EDINET は 2008 版。2013 版も受け付ける）
+IX_NAMESPACES = ("http://www.xbrl.org/2008/inlineXBRL", "http://www.xbrl.org/2013/inlineXBRL")
+XHTML_NS = "http://www.w3.org/1999/xhtml"
+
+_ERA_START_YEAR = {"令和": 2018, "平成": 1988, "昭和": 1925, "大正": 1911, "明治": 1867}
+_CJK_DATE_RE = re.compile(r"(\d{1,4})年(\d{1,2})月(\d{1,2})日")
+_ERA_DATE_RE = re.compile(r"(令和|平成|昭和|大正|明治)(\d{1,2}|元)年(\d{1,2})月(\d{1,2})日")
+
+
+def inline_member_names(names: Iterable[str], manifest: Optional[bytes] = None) -> List[str]:
+    """
+    PublicDoc 内の iXBRL ファイル名を解析順に返す
+
+    manifest_PublicDoc.xml があればその ixbrl 要素の順、無ければ .htm のファイル名順。
+    """
+    names = sorted(names)
+    if manifest:
+        listed = re.findall(rb"<ixbrl>\s*([^<]+?)\s*</ixbrl>", manifest)
+        ordered = [n.decode("utf-8") for n in listed]
+        ordered = [n for n in ordered if n in names]
+        if ordered:
+            return ordered
+    return [n for n in names if n.endswith((".htm", ".html", ".xhtml"))]
+
+
+def inline_files(public_dir: Path) -> List[Path]:
+    manifest_path = public_dir / "manifest_PublicDoc.xml"
+    manifest = manifest_path.read_bytes() if manifest_path.exists() else None
+    names = [p.name for p in public_dir.iterdir() if p.is_file()]
+    return [public_dir / n for n in inline_member_names(names, manifest)]
+
+
+def ix_transform(fmt: Optional[str], text: str) -> str:
+    """
+    ix の format（inlineXBRL transformation registry）を適用して XBRL の値表記にする
+
+    EDINET で使われる変換のみ対応し、未対応の format は全角→半角のみ行う。
+    """
+    text = unicodedata.normalize("NFKC", text).strip()
+    if not fmt:
+        return text
+    name = fmt.rsplit(":", 1)[-1].replace("-", "")
+    if name in ("numdotdecimal", "numcommadecimal", "numspacedot", "numspacecomma"):
+        if "comma" in name and "dot" not in name:
+            text = text.replace(".", "").replace(" ", "").replace(",", ".")
+        return re.sub(r"[^0-9.]", "", text)
+    if name in ("zerodash", "fixedzero"):
+        return "0"
+    if name == "nocontent":
+        return ""
+    if name == "booleantrue":
+        return "true"
+    if name == "booleanfalse":
+        return "false"
+    if name == "dateyearmonthdaycjk":
+        m = _CJK_DATE_RE.search(text)
+        if m:
+            return f"{int(m.group(1)):04d}-{int(m.group(2)):02d}-{int(m.group(3)):02d}"
+    if name in ("dateerayearmonthdayjp", "dateerayearmonthdayjpn"):
+        m = _ERA_DATE_RE.search(text)
+        if m:
+            year = 1 if m.group(2) == "元" else int(m.group(2))
+            return f"{_ERA_START_YEAR[m.group(1)] + year:04d}-{int(m.group(3)):02d}-{int(m.group(4)):02d}"
+    return text
+
+
+def _ix_text(el: Any, ix_ns: str) -> str:
+    """ix:exclude を除いた子孫のテキスト"""
+    parts = [el.text or ""]
+    for child in el:
+        if isinstance(child.tag, str) and child.tag != f"{{{ix_ns}}}exclude":
+            parts.append(_ix_text(child, ix_ns))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+# タグ内（次の > までに < が無い位置）の '
+_ATTR_APOS_RE = re.compile(r"'(?=[^<>]*>)")
+
+
+def _ix_escaped(el: Any, ix_ns: str) -> str:
+    """
+    escape="true" の nonNumeric（TextBlock）: 内容を XHTML のまま文字列化する
+
+    EDINET の .xbrl インスタンスと同じ表記にするため、入れ子の ix 要素はタグだけ外し（ix:exclude は除去）、
+    属性値中の ' は &apos; にする。要素ごと1回で文字列化し、名前空間宣言を持つ外側のタグを切り落とす。
+    """
+    from lxml import etree  # type: ignore
+
+    el = copy.deepcopy(el)
+    el.tail = None
+    etree.strip_elements(el, f"{{{ix_ns}}}exclude", with_tail=False)
+    etree.strip_tags(el, f"{{{ix_ns}}}*")
+    text = etree.tostring(el, encoding="unicode")
+    if text.endswith("/>"):
+        return ""
+    inner = text[text.index(">") + 1:text.rindex("</")]
+    return _ATTR_APOS_RE.sub("&apos;", inner)
+
+
+def _inline_fact(el: Any, ix_ns: str) -> Tuple[RawFact, Optional[str], bool]:
+    """
+    ix:nonFraction / ix:nonNumeric を RawFact にする
+
+    Returns:
+        (ファクト, continuedAt の続きの id, escape="true" か)
+    """
+    name = (el.get("name") or "").strip()
+    prefix, _, local = name.rpartition(":")
+    is_nil = el.get(XSI_NIL) in ("true", "1")
+    is_numeric = el.tag == f"{{{ix_ns}}}nonFraction"
+    x_value = None
+    value = None
+    escaped = not is_numeric and el.get("escape") in ("true", "1")
+    if is_numeric:
+        if not is_nil:
+            x_value = to_decimal(ix_transform(el.get("format"), _ix_text(el, ix_ns)))
+            if x_value is not None:
+                x_value = x_value.scaleb(int(el.get("scale") or 0))
+                if el.get("sign") == "-":
+                    x_value = -x_value
+    elif is_nil:
+        value = ""
+    else:
+        if escaped:
+            value = _ix_escaped(el, ix_ns)
+        elif el.get("format"):
+            value = ix_transform(el.get("format"), _ix_text(el, ix_ns))
+        else:
+            value = _ix_text(el, ix_ns)
+    fact = RawFact(
+        concept_qname=name,
+        concept_namespace=prefix or None,
+        concept_name=local,
+        context_ref=el.get("contextRef"),
+        unit_ref=(el.get("unitRef") or "").strip(),
+        is_nil=is_nil,
+        is_numeric=is_numeric,
+        x_value=x_value,
+        value=value,
+        decimals=el.get("decimals") or None,
+    )
+    return fact, el.get("continuedAt"), escaped
+
+
+# parse_inline_file で拾う要素（XHTML 側の要素は lxml 側で読み飛ばす）
+_INLINE_TAGS = tuple(
+    f"{{{ns}}}{local}" for ns in IX_NAMESPACES for local in ("nonFraction", "nonNumeric", "continuation")
+) + (f"{{{XBRLI_NS}}}context", f"{{{XBRLI_NS}}}unit")
+
+
+def parse_inline_file(path: Path, doc_id: str) -> Dict[str, Any]:
+    """
+    1つの iXBRL（.htm）から contexts / units / facts を取り出す
+
+    ix:continuation は続きの id → (テキスト, XHTML のままの文字列, 次の id) として返し、結合は
+    parse_with_inline で行う（continuedAt はファイルをまたぐことがあり、先頭のファクトが escape="true" か
+    どうかは結合するまで分からないため両方の形を持つ）。
+    """
+    try:
+        from lxml import etree  # type: ignore
+    except Exception as exc:
+        raise RuntimeError("lxml is not installed. Install lxml.") from exc
+
+    parser = etree.XMLParser(remove_comments=True, huge_tree=True, resolve_entities=False)
+    root = etree.parse(str(path), parser).getroot()
+    contexts = []
+    units = []
+    facts: List[Tuple[RawFact, Optional[str], bool]] = []
+    continuations: Dict[str, Tuple[str, str, Optional[str]]] = {}
+    for el in root.iter(*_INLINE_TAGS):
+        tag = el.tag
+        ns, _, local = tag[1:].partition("}")
+        if ns in IX_NAMESPACES:
+            if local in ("nonFraction", "nonNumeric"):
+                facts.append(_inline_fact(el, ns))
+            elif local == "continuation":
+                continuations[el.get("id")] = (_ix_text(el, ns), _ix_escaped(el, ns), el.get("continuedAt"))
+        elif tag == f"{{{XBRLI_NS}}}context":
+            contexts.append(_stream_context(el, doc_id))
+        elif tag == f"{{{XBRLI_NS}}}unit":
+            units.append(_stream_unit(el, doc_id))
+    return {"contexts": contexts, "units": units, "facts": facts, "continuations": continuations}
+
+
+def parse_with_inline(paths: List[Path], doc_id: str) -> Dict[str, Any]:
+    """
+    複数ファイルの iXBRL を1書類として解析する（DTS を読まない高速経路）
+
+    各 .htm を順に解析し、ファイル順（manifest 順）に結合する。lxml の解析は GIL を持ったままなので
+    書類内のスレッド並列は効かない。並列化はバッチモード / パイプラインのプロセスプールで書類単位に行う。
+    context / unit は id の先勝ちで1つにし、ファクトの重複・食い違いは build_fact_batch で従来どおり数える。
+    concept_hierarchy は DTS が必要なため空で返す。
+    """
+    if not paths:
+        raise ParseError("no inline XBRL files")
+    parts = [parse_inline_file(p, doc_id) for p in paths]
+
+    contexts: Dict[str, Dict[str, Any]] = {}
+    units: Dict[str, Dict[str, Any]] = {}
+    continuations: Dict[str, Tuple[str, str, Optional[str]]] = {}
+    for part in parts:
+        for rec in part["contexts"]:
+            contexts.setdefault(rec["context_ref"], rec)
+        for rec in part["units"]:
+            units.setdefault(rec["unit_ref"], rec)
+        continuations.update(part["continuations"])
+
+    facts = []
+    for part in parts:
+        for fact, continued_at, escaped in part["facts"]:
+            if continued_at and fact.value is not None:
+                value = fact.value
+                seen = set()
+                while continued_at and continued_at in continuations and continued_at not in seen:
+                    seen.add(continued_at)
+                    text, escaped_text, continued_at = continuations[continued_at]
+                    # 続きは先頭のファクトと同じ形（escape="true" なら XHTML のまま）でつなぐ
+                    value += escaped_text if escaped else text
+                fact = fact._replace(value=value)
+            facts.append(fact)
+
+    return {
+        "contexts": list(contexts.values()),
+        "units": list(units.values()),
+        "facts": facts,
+        "concept_hierarchy": [],
+    }
+
+
+PARSE_ENGINES = ("arelle", "stream", "inline")
+
+# 解析結果（contexts / units / facts / concept_hierarchy）の形式・内容が変わる修正をしたら上げる。
+# パースキャッシュのキーに含まれ、古いバージョンのキャッシュは使われなくなる
+PARSER_VERSION = 4
+
+
+def parse_instance(
+    xbrl_path: Path,
+    doc_id: str,
+    engine: str = "arelle",
+    session: Optional[ArelleSession] = None,
+) -> Dict[str, Any]:
+    """
+    engine に応じて解析する
+
+    - "arelle": 常に Arelle（concept_hierarchy を含む）
+    - "stream": .xbrl は parse_with_iterparse、iXBRL（.htm / manifest）は parse_with_inline
+    - "inline": .xbrl があっても PublicDoc の iXBRL を parse_with_inline で解析する（比較・検証用）
+    """
+    if engine not in PARSE_ENGINES:
+        raise ValueError(f"unknown parse engine: {engine} (expected one of {PARSE_ENGINES})")
+    if engine == "stream" and xbrl_path.suffix == ".xbrl":
+        return parse_with_iterparse(xbrl_path, doc_id)
+    if engine in ("stream", "inline"):
+        return parse_with_inline(inline_files(xbrl_path.parent), doc_id)
+    return parse_with_arelle(xbrl_path, doc_id, session)
+
+
+def build_fact_batch(
+    doc_id: str,
+    facts: Iterable[RawFact],
+    context_map: Dict[str, int],
+    unit_map: Dict[str, int],
+) -> FactBatch:
+    """
+    パーサー出力のファクトを staging.fact 用の FactBatch に変換する
 
+    - context が未登録のファクト（タプル等）は除外
+    - (concept, context, unit) の重複は先勝ちで除外し、値の食い違いを数える
+    - Unit 正規化の換算係数は unit_ref ごとに1回だけ引く
+    """
+    batch = FactBatch(doc_id)
+    unit_infos: Dict[str, Any] = {}
+    for f in facts:
+        context_ref = f.context_ref
+        if not context_ref:
+            continue
+        context_id = context_map.get(context_ref)
+        if not context_id:
+            continue
+
+        # Bug #7 Fix: Handle nil values properly
+        # If is_nil=true, set values to None regardless of computed values
+        if f.is_nil:
+            value_numeric = None
+            value_text = None
+        else:
+            value_numeric = to_decimal(f.x_value) if f.is_numeric else None
+            value_text = None if f.is_numeric else (f.value or None)
+
+        unit_ref = f.unit_ref
+        key = (f.concept_qname, context_ref, unit_ref)
+        i = batch.find(key)
+        if i is not None:
+            batch.record_duplicate(i, value_numeric, value_text, f.decimals, f.is_nil)
+            continue
+
+        # Issue #3 Fix: Unit正規化（unit_normalizer.normalize と同じ換算）
+        unit_info = unit_infos.get(unit_ref)
+        if unit_info is None:
+            unit_info = unit_infos[unit_ref] = unit_normalizer.get_unit_info(unit_ref)
+        value_normalized = value_numeric * unit_info.conversion_factor if value_numeric is not None else None
+
+        batch.append(
+            key,
+            f.concept_qname,
+            f.concept_namespace,
+            f.concept_name,
+            context_id,
+            unit_map.get(unit_ref) if unit_ref else None,
+            value_numeric,
+            value_text,
+            unit_info.normalized_unit,
+            value_normalized,
+            f.decimals,
+            f.is_nil,
+            fact_key_hash(doc_id, f.concept_qname, context_ref, unit_ref),
+        )
+    return batch
+
+
+class ParseError(RuntimeError):
+    """書類を staging に取り込めない（zip 未取得・XBRL なし等）"""
+
+
+class QCFailedError(ParseError):
+    """QC チェック（fail）に該当した"""
+
+    def __init__(self, reasons):
+        super().__init__(f"QC failed: {reasons}")
+        self.reasons = reasons
+
+
+def parse_zip(zip_path: Path, doc_id: str, parse_cfg: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """document.zip の XBRL を解析し、(解析結果, ログ用の xbrl_path) を返す"""
+    # 既定は PublicDoc だけを一時展開。parse.keep_extracted で ZIP 全体を extracted/ に残す
     extract_dir = zip_path.parent / "extracted"
-    if not extract_dir.exists():
-        extract_zip(zip_path, extract_dir)
+    if not parse_cfg.get("keep_extracted") and not extract_dir.exists():
+        extract_dir = None
+    work_dir = Path(parse_cfg["work_dir"]) if parse_cfg.get("work_dir") else None
+
+    with open_xbrl_entry(zip_path, extract_dir, work_dir) as xbrl_file:
+        if not xbrl_file:
+            raise ParseError("XBRL/PublicDoc not found")
+        # 一時展開の場合は ZIP 内のメンバー名で記録する
+        xbrl_path = str(xbrl_file) if extract_dir else f"{zip_path}!{PUBLIC_DOC_PREFIX}{xbrl_file.name}"
+
+        # Arelle はプロセス内で常駐するコントローラを使い回す（engine=stream / inline では使わない）
+        engine = parse_cfg.get("engine", "arelle")
+        session = get_session(parse_cfg) if engine == "arelle" else None
+        parsed = parse_instance(xbrl_file, doc_id, engine, session)
+    return parsed, xbrl_path
 
-    xbrl_file = find_xbrl_file(extract_dir)
-    if not xbrl_file:
-        raise SystemExit("XBRL/PublicDoc not found")
 
-    # Parse with Arelle
-    parsed = parse_with_arelle(xbrl_file, args.doc_id)
+def uncacheable_reason(parsed: Dict[str, Any]) -> Optional[str]:
+    """
+    キャッシュしてはいけない解析結果なら理由を返す
+
+    空の結果や Arelle の読み込みエラーはタクソノミ・環境の状態に依存するため、
+    キャッシュすると原因を直しても同じ ZIP が解析し直されない。
+    """
+    if parsed.get("load_errors"):
+        return "load_errors"
+    if not parsed.get("facts"):
+        return "no_facts"
+    if not parsed.get("contexts"):
+        return "no_contexts"
+    return None
+
+
+def load_or_parse(
+    zip_path: Path,
+    zip_sha256: Optional[str],
+    doc_id: str,
+    parse_cfg: Dict[str, Any],
+    log_path: Optional[Path] = None,
+) -> Tuple[Dict[str, Any], str, str]:
+    """
+    パースキャッシュ（parse.cache_dir）にあれば読み出し、無ければ解析して保存する
+
+    QC で弾かれる結果（uncacheable_reason）は保存しない。キャッシュの読み書きに失敗しても
+    解析結果は返し、log_path があれば WARN を記録する。
+
+    Returns:
+        (解析結果, ログ用の xbrl_path, キャッシュ状態 "hit" / "miss" / "refresh" / "off" / "skip")
+    """
+    engine = parse_cfg.get("engine", "arelle")
+    cache = ParseCache.from_config(parse_cfg, PARSER_VERSION)
+    if cache is None:
+        parsed, xbrl_path = parse_zip(zip_path, doc_id, parse_cfg)
+        return parsed, xbrl_path, "off"
+
+    def log_cache_error(event: str, exc: Exception) -> None:
+        if log_path is None:
+            return
+        log_jsonl(log_path, {
+            "ts": datetime.now().isoformat(),
+            "level": "WARN",
+            "event": event,
+            "doc_id": doc_id,
+            "zip_sha256": zip_sha256,
+            "engine": engine,
+            "error": f"{type(exc).__name__}: {exc}",
+        })
+
+    # raw.edinet_file に未登録（手動配置など）の場合はここで計算する
+    zip_sha256 = zip_sha256 or parse_cache.file_sha256(zip_path)
+    refresh = bool(parse_cfg.get("cache_refresh"))
+    data = None if refresh else cache.get(zip_sha256, engine)
+    if data is not None:
+        try:
+            parsed = parse_cache.decode(data, doc_id, RawFact)
+            return parsed, parsed["meta"].get("xbrl_path", str(zip_path)), "hit"
+        except Exception as exc:
+            # 壊れたファイルは解析し直して上書きする
+            log_cache_error("parse_cache_decode_error", exc)
+
+    parsed, xbrl_path = parse_zip(zip_path, doc_id, parse_cfg)
+    if uncacheable_reason(parsed):
+        return parsed, xbrl_path, "skip"
+    try:
+        cache.put(zip_sha256, engine, parse_cache.encode(parsed, RawFact._fields, {"xbrl_path": xbrl_path}))
+    except Exception as exc:
+        # キャッシュに書けなくても解析結果は使う（次回も miss になるだけ）
+        log_cache_error("parse_cache_write_error", exc)
+    return parsed, xbrl_path, "refresh" if refresh else "miss"
+
+
+SELECT_DOCUMENT_ZIP = prepared_statement(
+    "select_document_zip",
+    """
+    SELECT d.zip_path,
+           (SELECT f.sha256 FROM raw.edinet_file f
+            WHERE f.doc_id = d.doc_id AND f.file_type = 'zip' AND f.path = d.zip_path
+            ORDER BY f.id DESC LIMIT 1)
+    FROM raw.edinet_document d
+    WHERE d.doc_id = %s
+    """,
+)
+
+
+def document_zip(conn, doc_id: str) -> Tuple[Path, Optional[str]]:
+    """raw.edinet_document の zip_path と raw.edinet_file の SHA-256（未登録なら None）を返す"""
+    with conn.cursor() as cur:
+        execute_prepared(cur, SELECT_DOCUMENT_ZIP, (doc_id,))
+        row = cur.fetchone()
+    if not row or not row[0]:
+        raise ParseError(f"zip_path not found for doc_id={doc_id}")
+    return Path(row[0]), (row[1].strip() if row[1] else None)
+
+
+def stage_document(
+    cfg: Dict[str, Any],
+    doc_id: str,
+    run_id: Optional[str] = None,
+    conn=None,
+) -> Dict[str, Any]:
+    """
+    1書類の XBRL を解析し staging に登録する
+
+    conn を渡すとその接続を使い（閉じない）、渡さなければ1本開いて最後に閉じる。
+    staging への登録と fetch_status の更新は StagingTransaction の1トランザクションで行う。
+    XBRL が見つからない / QC fail の書類は fetch_status を parse_failed / qc_failed にして、
+    --pending の再実行で同じ書類を選び直さないようにする。
+
+    Returns:
+        処理結果のサマリ（facts 件数・QC 警告など）
+    Raises:
+        ParseError: zip_path が未登録 / XBRL が見つからない
+        QCFailedError: QC fail に該当
+    """
+    run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    own_conn = conn is None
+    if own_conn:
+        conn = get_conn(cfg.get("db", {}))
+    try:
+        return _stage_document(cfg, doc_id, run_id, conn)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _stage_document(cfg: Dict[str, Any], doc_id: str, run_id: str, conn) -> Dict[str, Any]:
+    db_cfg = cfg.get("db", {})
+    paths_cfg = cfg.get("paths", {})
+    log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
+    doc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"doc_{datetime.now():%Y%m%d}.jsonl"
+
+    zip_path, zip_sha256 = document_zip(conn, doc_id)
+    # 解析中に idle in transaction にしない
+    conn.rollback()
+
+    parse_cfg = cfg.get("parse", {})
+    engine = parse_cfg.get("engine", "arelle")
+    try:
+        parsed, xbrl_path, cache_status = load_or_parse(zip_path, zip_sha256, doc_id, parse_cfg, doc_log)
+    except ParseError:
+        update_document_status(conn, doc_id, PARSE_FAILED)
+        raise
 
     # QC checks (warn/fail)
     qc_cfg = cfg.get("qc", {})
@@ -280,11 +1065,12 @@ def main() -> int:
             "level": "WARN",
             "event": "qc_fail",
             "run_id": run_id,
-            "doc_id": args.doc_id,
+            "doc_id": doc_id,
             "qc_status": "fail",
             "qc_reason": qc_reasons,
         })
-        raise SystemExit(f"QC failed: {qc_reasons}")
+        update_document_status(conn, doc_id, QC_FAILED)
+        raise QCFailedError(qc_reasons)
 
     if qc_warn:
         log_jsonl(qc_log, {
@@ -292,116 +1078,233 @@ def main() -> int:
             "level": "WARN",
             "event": "qc_warn",
             "run_id": run_id,
-            "doc_id": args.doc_id,
+            "doc_id": doc_id,
             "qc_status": "warn",
             "qc_reason": sorted(set(qc_warn)),
         })
 
-    # Insert into staging
-    conn = get_conn(db_cfg)
-    try:
-        upsert_staging_contexts(conn, parsed["contexts"])
-        upsert_staging_units(conn, parsed["units"])
+    # Insert into staging（1トランザクション）
+    # db.staging_write: "copy" は一時テーブルへの COPY + 集合演算の upsert（既定は execute_values）
+    with StagingTransaction(conn, db_cfg.get("staging_write", "values")) as tx:
+        context_map = tx.contexts(parsed["contexts"])
+        unit_map = tx.units(parsed["units"])
 
         # Issue #2: Concept階層構造を保存
         if parsed.get("concept_hierarchy"):
-            upsert_staging_concept_hierarchy(conn, parsed["concept_hierarchy"])
-
-        context_map = load_context_map(conn, args.doc_id, [c["context_ref"] for c in parsed["contexts"]])
-        unit_map = load_unit_map(conn, args.doc_id, [u["unit_ref"] for u in parsed["units"]])
-
-        facts_map: Dict[str, Dict[str, Any]] = {}
-        dup_count = 0
-        conflict_count = 0
-        for f in parsed["facts"]:
-            concept_qname = str(f.qname)
-            concept_namespace = f.qname.prefix
-            concept_name = f.qname.localName
-            context_ref = f.contextID
-            unit_ref = f.unitID or ""
-
-            if not context_ref:
-                continue
-
-            context_id = context_map.get(context_ref)
-            unit_id = unit_map.get(unit_ref) if unit_ref else None
-            if not context_id:
-                continue
-
-            # Bug #7 Fix: Handle nil values properly
-            # If is_nil=true, set values to None regardless of computed values
-            if f.isNil:
-                value_numeric = None
-                value_text = None
-            else:
-                # Bug #4 Fix: xValue from Arelle already includes decimal normalization
-                value_numeric = to_decimal(f.xValue) if f.isNumeric else None
-                value_text = None if f.isNumeric else (f.value or None)
-
-            # Issue #3 Fix: Unit正規化
-            unit_ref_normalized, value_normalized = unit_normalizer.normalize(
-                unit_ref, value_numeric
-            )
-
-            fact_hash = sha256_text(f"{args.doc_id}|{concept_qname}|{context_ref}|{unit_ref}")
-
-            row = {
-                "doc_id": args.doc_id,
-                "concept_qname": concept_qname,
-                "concept_namespace": concept_namespace,
-                "concept_name": concept_name,
-                "context_id": context_id,
-                "unit_id": unit_id,
-                "value_numeric": value_numeric,
-                "value_text": value_text,
-                "unit_ref_normalized": unit_ref_normalized,
-                "value_normalized": value_normalized,
-                "decimals": f.decimals,
-                "is_nil": f.isNil,
-                "fact_hash": fact_hash,
-            }
-
-            existing = facts_map.get(fact_hash)
-            if existing:
-                dup_count += 1
-                if (
-                    existing.get("value_numeric") != row.get("value_numeric")
-                    or existing.get("value_text") != row.get("value_text")
-                    or existing.get("decimals") != row.get("decimals")
-                    or existing.get("is_nil") != row.get("is_nil")
-                ):
-                    conflict_count += 1
-                continue
-
-            facts_map[fact_hash] = row
-
-        facts_rows = list(facts_map.values())
+            tx.concept_hierarchy(parsed["concept_hierarchy"])
+
+        batch = build_fact_batch(doc_id, parsed["facts"], context_map, unit_map)
+        dup_count = batch.dup_count
+        conflict_count = batch.conflict_count
         if dup_count:
             log_jsonl(qc_log, {
                 "ts": datetime.now().isoformat(),
                 "level": "WARN",
                 "event": "fact_dedup",
                 "run_id": run_id,
-                "doc_id": args.doc_id,
+                "doc_id": doc_id,
                 "dup_count": dup_count,
                 "conflict_count": conflict_count,
             })
 
-        upsert_staging_facts(conn, facts_rows)
-    finally:
-        conn.close()
+        tx.facts(batch)
+        tx.set_status(doc_id, "parsed")
 
     log_jsonl(doc_log, {
         "ts": datetime.now().isoformat(),
         "level": "INFO",
         "event": "parse_xbrl_staging",
         "run_id": run_id,
-        "doc_id": args.doc_id,
-        "xbrl_path": str(xbrl_file),
+        "doc_id": doc_id,
+        "xbrl_path": xbrl_path,
+        "engine": engine,
+        "parse_cache": cache_status,
         "status": "success",
     })
 
-    return 0
+    return {
+        "doc_id": doc_id,
+        "parse_cache": cache_status,
+        "facts": len(batch),
+        "dup_count": dup_count,
+        "conflict_count": conflict_count,
+        "qc_warn": sorted(set(qc_warn)),
+    }
+
+
+def parse_batch_item(cfg: Dict[str, Any], doc_id: str, run_id: str) -> Dict[str, Any]:
+    """バッチモードのワーカー（プロセスプール）から呼ぶ。例外は結果に変換して返す"""
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"doc_id": doc_id}
+    try:
+        with get_pool(cfg.get("db", {})).connection() as conn:
+            summary = stage_document(cfg, doc_id, run_id, conn)
+        result.update(
+            status="parsed",
+            facts=summary["facts"],
+            qc_warn=summary["qc_warn"],
+            parse_cache=summary.get("parse_cache"),
+        )
+    except QCFailedError as exc:
+        result.update(status="qc_fail", qc_reason=exc.reasons)
+    except ParseError as exc:
+        result.update(status="error", error=str(exc))
+    except Exception as exc:
+        result.update(status="error", error=f"{type(exc).__name__}: {exc}")
+    result["elapsed_sec"] = time.perf_counter() - started
+    return result
+
+
+def read_doc_ids(path: Path) -> List[str]:
+    """1行1 docID のファイルを読む（空行・# 以降は無視）"""
+    doc_ids = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        doc_id = line.split("#", 1)[0].strip()
+        if doc_id:
+            doc_ids.append(doc_id)
+    return doc_ids
+
+
+def run_batch(cfg: Dict[str, Any], doc_ids: List[str], workers: int, run_id: str) -> Dict[str, Any]:
+    """
+    複数書類をプロセスプールで解析し、集計を返す
+
+    各ワーカーはプロセス共通の接続プール（lib.db.get_pool）の接続を書類をまたいで使い回し、
+    書類ごとに1トランザクションで staging に書き込む。
+    ワーカーは Arelle コントローラを常駐させ、parse.worker_max_documents 件ごとに作り直す。
+    """
+    log_root = Path(cfg.get("paths", {}).get("log_root", "data/logs/edinet"))
+    run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+    max_tasks = int((cfg.get("parse", {}) or {}).get("worker_max_documents", DEFAULT_MAX_DOCUMENTS))
+
+    totals: Dict[str, Any] = {"documents": len(doc_ids), "parsed": 0, "qc_fail": 0, "error": 0, "facts": 0}
+    cache: Dict[str, int] = {}
+    qc_warn: Dict[str, int] = {}
+    qc_fail: Dict[str, int] = {}
+    started = time.perf_counter()
+    # fork だとロガーのスレッドを引き継ぐため、パイプラインと同じく spawn を使う
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=max_tasks if max_tasks > 0 else None,
+    ) as pool:
+        futures = [pool.submit(parse_batch_item, cfg, doc_id, run_id) for doc_id in doc_ids]
+        for future in as_completed(futures):
+            result = future.result()
+            totals[result["status"]] += 1
+            totals["facts"] += result.get("facts", 0)
+            if result.get("parse_cache"):
+                cache[result["parse_cache"]] = cache.get(result["parse_cache"], 0) + 1
+            for reason in result.get("qc_warn", []):
+                qc_warn[reason] = qc_warn.get(reason, 0) + 1
+            for reason in result.get("qc_reason", []):
+                qc_fail[reason] = qc_fail.get(reason, 0) + 1
+            if result["status"] == "error":
+                log_jsonl(run_log, {
+                    "ts": datetime.now().isoformat(),
+                    "level": "ERROR",
+                    "event": "parse_failed",
+                    "run_id": run_id,
+                    "doc_id": result["doc_id"],
+                    "error": result["error"],
+                })
+
+    elapsed = time.perf_counter() - started
+    totals.update(
+        workers=workers,
+        elapsed_sec=round(elapsed, 3),
+        docs_per_sec=round(len(doc_ids) / elapsed, 3) if elapsed > 0 else None,
+        qc_warn_reasons=qc_warn,
+        qc_fail_reasons=qc_fail,
+        parse_cache=cache,
+    )
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="src/config/config.yaml")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--doc-id", dest="doc_id")
+    target.add_argument("--doc-ids", dest="doc_ids", nargs="+", help="batch mode: parse these docIDs")
+    target.add_argument("--from-file", dest="from_file", help="batch mode: file with one docID per line")
+    target.add_argument("--pending", action="store_true", help="batch mode: documents in zip_downloaded state")
+    parser.add_argument("--limit", type=int, help="max documents for --pending")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="batch mode: worker processes")
+    parser.add_argument("--keep-extracted", dest="keep_extracted", action="store_true",
+                        help="extract the whole ZIP to <doc dir>/extracted and keep it")
+    cache_opts = parser.add_mutually_exclusive_group()
+    cache_opts.add_argument("--no-cache", dest="no_cache", action="store_true",
+                            help="ignore parse.cache_dir (always parse, do not store)")
+    cache_opts.add_argument("--refresh-cache", dest="refresh_cache", action="store_true",
+                            help="always parse and overwrite the cached result")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    if args.keep_extracted:
+        cfg.setdefault("parse", {})["keep_extracted"] = True
+    if args.no_cache:
+        cfg.setdefault("parse", {})["cache_dir"] = None
+    if args.refresh_cache:
+        cfg.setdefault("parse", {})["cache_refresh"] = True
+
+    if args.doc_id:
+        try:
+            stage_document(cfg, args.doc_id)
+        except ParseError as exc:
+            raise SystemExit(str(exc))
+        return 0
+
+    if args.doc_ids:
+        doc_ids = [d for arg in args.doc_ids for d in arg.split(",") if d]
+    elif args.from_file:
+        doc_ids = read_doc_ids(Path(args.from_file))
+    else:
+        conn = get_conn(cfg.get("db", {}))
+        try:
+            doc_ids = select_doc_ids_by_status(conn, "zip_downloaded", args.limit)
+        finally:
+            conn.close()
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if not doc_ids:
+        print("no documents to parse")
+        return 0
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_root = Path(cfg.get("paths", {}).get("log_root", "data/logs/edinet"))
+    run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+    workers = max(1, min(args.workers, len(doc_ids)))
+    log_jsonl(run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_start",
+        "run_id": run_id,
+        "mode": "parse_batch",
+        "documents": len(doc_ids),
+        "workers": workers,
+    })
+    totals = run_batch(cfg, doc_ids, workers, run_id)
+    log_jsonl(run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_end",
+        "run_id": run_id,
+        **totals,
+    })
+
+    print(
+        f"parsed {totals['parsed']}/{totals['documents']} documents "
+        f"(qc_fail {totals['qc_fail']}, error {totals['error']}) "
+        f"in {totals['elapsed_sec']:.1f}s with {workers} workers: "
+        f"{totals['docs_per_sec']} docs/s, {totals['facts']} facts"
+    )
+    if totals["qc_warn_reasons"]:
+        print(f"qc_warn: {json.dumps(totals['qc_warn_reasons'], sort_keys=True)}")
+    if totals["qc_fail_reasons"]:
+        print(f"qc_fail: {json.dumps(totals['qc_fail_reasons'], sort_keys=True)}")
+    if totals["parse_cache"]:
+        print(f"parse_cache: {json.dumps(totals['parse_cache'], sort_keys=True)}")
+    return 1 if totals["error"] else 0
 
 
 if __name__ == "__main__":
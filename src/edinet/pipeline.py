@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import signal
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from lib.arelle_session import DEFAULT_MAX_DOCUMENTS
+from lib.config import load_config
+from lib.db import ConnectionPool, get_conn, get_pool, load_doclist_checkpoints, select_doc_ids_by_status
+from lib.db_async import AsyncConnectionPool, check_backend
+from lib.doclist_store import DEFAULT_FORMAT, check_format
+from lib.edinet_client import EdinetClient
+from lib.logger import log_jsonl
+from lib.rate_limiter import TokenBucket
+from edinet.fetch_doclist import build_date_list, positive_int, process_date_rows, settled_dates
+from edinet.fetch_zip import claim_target, download_one, release_claim, select_targets
+from edinet.load_core import load_document, load_document_async
+from edinet.parse_xbrl import ParseError, stage_document
+
+
+STAGES = ("doclist", "zip", "parse", "core")
+
+DEFAULT_STAGE_SETTINGS: Dict[str, Dict[str, int]] = {
+    "doclist": {"workers": 1, "queue_size": 16},
+    "zip": {"workers": 2, "queue_size": 64},
+    "parse": {"workers": 2, "queue_size": 8},
+    "core": {"workers": 1, "queue_size": 8},
+}
+
+_DONE = object()
+
+
+@dataclass
+class StageSettings:
+    """ステージごとの並列数と入力キューの上限（バックプレッシャー）"""
+    workers: int
+    queue_size: int
+
+
+def load_stage_settings(cfg: Dict[str, Any], overrides: Dict[str, Optional[int]]) -> Dict[str, StageSettings]:
+    pipeline_cfg = cfg.get("pipeline", {}) or {}
+    settings = {}
+    for name in STAGES:
+        merged = dict(DEFAULT_STAGE_SETTINGS[name])
+        merged.update(pipeline_cfg.get(name, {}) or {})
+        if overrides.get(name):
+            merged["workers"] = overrides[name]
+        settings[name] = StageSettings(
+            workers=max(1, int(merged["workers"])),
+            queue_size=max(1, int(merged["queue_size"])),
+        )
+    return settings
+
+
+def parse_in_process(cfg: Dict[str, Any], doc_id: str, run_id: str) -> Optional[Dict[str, Any]]:
+    """parse ステージ（プロセスプール）から呼ぶエントリポイント"""
+    try:
+        with get_pool(cfg.get("db", {})).connection() as conn:
+            return stage_document(cfg, doc_id, run_id, conn)
+    except ParseError:
+        # QC fail / XBRL なしは stage_document 側でログ済み。後続ステージには流さない
+        return None
+
+
+class Pipeline:
+    """
+    doclist → zip → parse → core のパイプライン実行
+
+    - 各ステージは指定数のワーカーで動き、上限付きキューで次ステージとつながる
+      （下流が詰まると上流の put が待たされる = バックプレッシャー）
+    - I/O 中心の doclist/zip/core はスレッド、CPU 中心の parse はプロセスで実行する
+    - stop() 後は新しい日付の投入を止め、キューに入っている書類を処理しきって終了する
+    """
+
+    def __init__(
+        self,
+        cfg: Dict[str, Any],
+        settings: Dict[str, StageSettings],
+        run_id: str,
+        incremental_checkpoints: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.cfg = cfg
+        self.settings = settings
+        self.run_id = run_id
+        self.checkpoints = incremental_checkpoints
+
+        edinet_cfg = cfg.get("edinet", {})
+        paths_cfg = cfg.get("paths", {})
+        self.raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
+        self.doclist_format = check_format(paths_cfg.get("doclist_format", DEFAULT_FORMAT))
+        log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
+        self.run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+        self.doc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"doc_{datetime.now():%Y%m%d}.jsonl"
+        self.qc_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"qc_{datetime.now():%Y%m%d}.jsonl"
+
+        limiter = TokenBucket.from_interval(
+            float(edinet_cfg.get("rate_limit_sec", 2)),
+            burst=float(edinet_cfg.get("rate_limit_burst", 1)),
+        )
+        pool_size = settings["doclist"].workers + settings["zip"].workers
+        self.client = EdinetClient.from_config(edinet_cfg, limiter=limiter, pool_size=pool_size)
+        # doclist / zip / core のスレッドが1本ずつ借りる（例外時は rollback して返却される）
+        # db.backend: psycopg なら core はイベントループ上のコルーチンで動き、psycopg 3 の接続を使う
+        db_cfg = cfg.get("db", {})
+        self.backend = check_backend(db_cfg.get("backend", "psycopg2"))
+        self.thread_stages = ("doclist", "zip") if self.backend == "psycopg" else ("doclist", "zip", "core")
+        io_workers = sum(settings[n].workers for n in self.thread_stages)
+        self.pool = ConnectionPool.from_config(db_cfg, max_size=io_workers)
+        self.apool = (
+            AsyncConnectionPool(db_cfg, max_size=settings["core"].workers) if self.backend == "psycopg" else None
+        )
+        self.parse_fn: Callable[[str], Optional[Dict[str, Any]]] = functools.partial(
+            parse_in_process, cfg, run_id=run_id
+        )
+        self.counts: Dict[str, Dict[str, int]] = {name: {"ok": 0, "failed": 0} for name in STAGES}
+        self._stopping = False
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def _parse_executor(self) -> Executor:
+        # fork だとスレッド（ロガー・I/O ワーカー）や DB 接続を引き継ぐため spawn を使う
+        # parse ワーカーは Arelle コントローラを常駐させ、worker_max_documents 件ごとに再起動してメモリ増加を抑える
+        # Ctrl-C はプロセスグループ全体に届くため、ワーカーでは SIGINT を無視して親の stop() に任せる
+        # （無視しないと処理中の書類が KeyboardInterrupt で返り、drain せずに終了してしまう）
+        max_tasks = int((self.cfg.get("parse", {}) or {}).get("worker_max_documents", DEFAULT_MAX_DOCUMENTS))
+        return ProcessPoolExecutor(
+            max_workers=self.settings["parse"].workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=max_tasks if max_tasks > 0 else None,
+            initializer=signal.signal,
+            initargs=(signal.SIGINT, signal.SIG_IGN),
+        )
+
+    # --- stage functions (executor 上で実行される同期関数) ---
+
+    def _doclist(self, d: str) -> List[str]:
+        checkpoints = self.checkpoints or {}
+        with self.pool.connection() as conn:
+            rows = process_date_rows(
+                d, conn, self.client, self.raw_root, self.run_id,
+                self.doc_log, self.qc_log, checkpoints.get(d), self.checkpoints is not None,
+                self.doclist_format,
+            )
+        return [r["doc_id"] for r in rows if r.get("fetch_status") == "listed"]
+
+    def _zip(self, doc_id: str) -> List[str]:
+        with self.pool.connection() as conn:
+            target = claim_target(conn, doc_id=doc_id)
+            if not target:
+                # 対象外 or 他プロセスが処理中 / 取得済み
+                return []
+            try:
+                download_one(conn, target, self.client, self.raw_root, self.run_id, self.doc_log)
+            except Exception:
+                release_claim(conn, doc_id)
+                raise
+        return [doc_id]
+
+    def _core(self, doc_id: str) -> List[str]:
+        with self.pool.connection() as conn:
+            load_document(conn, doc_id)
+        return []
+
+    async def _core_async(self, doc_id: str) -> List[str]:
+        """core ステージ（db.backend: psycopg）。executor を使わずイベントループ上で実行する"""
+        async with self.apool.connection() as conn:
+            await load_document_async(conn, doc_id)
+        return []
+
+    # --- async plumbing ---
+
+    async def _worker(
+        self,
+        name: str,
+        inq: asyncio.Queue,
+        outq: Optional[asyncio.Queue],
+        fn: Callable[[Any], Any],
+        executor: Optional[Executor],
+        emit: Callable[[Any, Any], List[Any]],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inq.get()
+            try:
+                if item is _DONE:
+                    return
+                try:
+                    if executor is None:
+                        result = await fn(item)
+                    else:
+                        result = await loop.run_in_executor(executor, fn, item)
+                except Exception as exc:
+                    self.counts[name]["failed"] += 1
+                    log_jsonl(self.doc_log, {
+                        "ts": datetime.now().isoformat(),
+                        "level": "ERROR",
+                        "event": f"pipeline_{name}_failed",
+                        "run_id": self.run_id,
+                        "item": str(item),
+                        "status": "failed",
+                        "error": str(exc),
+                    })
+                    continue
+                self.counts[name]["ok"] += 1
+                if outq is not None:
+                    for out in emit(item, result):
+                        await outq.put(out)
+            finally:
+                inq.task_done()
+
+    async def _run_stage(
+        self,
+        name: str,
+        inq: asyncio.Queue,
+        outq: Optional[asyncio.Queue],
+        fn: Callable[[Any], Any],
+        executor: Optional[Executor],
+        emit: Callable[[Any, Any], List[Any]] = lambda item, result: result or [],
+    ) -> None:
+        workers = [
+            asyncio.create_task(self._worker(name, inq, outq, fn, executor, emit))
+            for _ in range(self.settings[name].workers)
+        ]
+        await asyncio.gather(*workers)
+        # 上流ステージの全ワーカーが終わってから下流へ終了を伝える
+        if outq is not None:
+            for _ in range(self.settings[STAGES[STAGES.index(name) + 1]].workers):
+                await outq.put(_DONE)
+
+    async def _feed(self, queue: asyncio.Queue, items: List[Any], workers: int) -> None:
+        for item in items:
+            if self._stopping:
+                break
+            await queue.put(item)
+        for _ in range(workers):
+            await queue.put(_DONE)
+
+    async def run(self, dates: List[str], pending: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+        """
+        Args:
+            dates: doclist を取得する日付
+            pending: 前回までの未処理分 {"zip": [...], "parse": [...], "core": [...]}
+        """
+        queues = {name: asyncio.Queue(maxsize=self.settings[name].queue_size) for name in STAGES}
+        io_pool = ThreadPoolExecutor(
+            max_workers=sum(self.settings[n].workers for n in self.thread_stages),
+            thread_name_prefix="pipeline",
+        )
+        parse_pool = self._parse_executor()
+
+        stages = [
+            self._run_stage("doclist", queues["doclist"], queues["zip"], self._doclist, io_pool),
+            self._run_stage("zip", queues["zip"], queues["parse"], self._zip, io_pool),
+            self._run_stage(
+                "parse", queues["parse"], queues["core"], self.parse_fn, parse_pool,
+                emit=lambda doc_id, summary: [] if summary is None else [doc_id],
+            ),
+            (
+                self._run_stage("core", queues["core"], None, self._core_async, None)
+                if self.apool is not None
+                else self._run_stage("core", queues["core"], None, self._core, io_pool)
+            ),
+        ]
+
+        async def seed() -> None:
+            # 未処理分は各ステージの先頭に投入してから日付を流す
+            for name in ("core", "parse", "zip"):
+                for doc_id in pending.get(name, []):
+                    if self._stopping:
+                        break
+                    await queues[name].put(doc_id)
+            await self._feed(queues["doclist"], dates, self.settings["doclist"].workers)
+
+        try:
+            await asyncio.gather(seed(), *stages)
+        finally:
+            io_pool.shutdown(wait=True)
+            parse_pool.shutdown(wait=True)
+            self.pool.close()
+            if self.apool is not None:
+                await self.apool.close()
+            self.client.close()
+        return self.counts
+
+
+def load_pending(db_cfg: Dict[str, Any], limit: int) -> Dict[str, List[str]]:
+    conn = get_conn(db_cfg)
+    try:
+        return {
+            "zip": [t["doc_id"] for t in select_targets(conn, limit)],
+            "parse": select_doc_ids_by_status(conn, "zip_downloaded", limit),
+            "core": select_doc_ids_by_status(conn, "parsed", limit),
+        }
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="src/config/config.yaml")
+    parser.add_argument("--date", help="single date (YYYY-MM-DD)")
+    parser.add_argument("--date-from", dest="date_from", help="start date (YYYY-MM-DD)")
+    parser.add_argument("--date-to", dest="date_to", help="end date (YYYY-MM-DD)")
+    parser.add_argument("--days-back", dest="days_back", type=positive_int, help="fetch the last N days up to today")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip settled dates and unchanged doclists using raw.edinet_doclist_checkpoint")
+    parser.add_argument("--include-pending", dest="include_pending", action="store_true",
+                        help="also resume documents left in earlier stages by previous runs")
+    parser.add_argument("--pending-limit", dest="pending_limit", type=int, default=1000)
+    for name in STAGES:
+        parser.add_argument(f"--{name}-workers", dest=f"{name}_workers", type=int)
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    edinet_cfg = cfg.get("edinet", {})
+    db_cfg = cfg.get("db", {})
+    if not edinet_cfg.get("base_url") or not edinet_cfg.get("api_key"):
+        raise SystemExit("Missing edinet.base_url or edinet.api_key in config")
+
+    if args.date:
+        dates = [args.date]
+    elif args.days_back:
+        today = date.today()
+        dates = build_date_list(
+            (today - timedelta(days=args.days_back - 1)).strftime("%Y-%m-%d"),
+            today.strftime("%Y-%m-%d"),
+        )
+    elif args.date_from and args.date_to:
+        dates = build_date_list(args.date_from, args.date_to)
+    else:
+        dates = []
+    if not dates and not args.include_pending:
+        raise SystemExit("date range or --include-pending is required")
+
+    checkpoints = None
+    if args.incremental and dates:
+        conn = get_conn(db_cfg)
+        try:
+            checkpoints = load_doclist_checkpoints(conn, dates)
+        finally:
+            conn.close()
+        skipped = set(settled_dates(dates, checkpoints, int(edinet_cfg.get("settle_days", 30))))
+        dates = [d for d in dates if d not in skipped]
+
+    pending = load_pending(db_cfg, args.pending_limit) if args.include_pending else {}
+    settings = load_stage_settings(cfg, {name: getattr(args, f"{name}_workers") for name in STAGES})
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pipeline = Pipeline(cfg, settings, run_id, checkpoints)
+
+    log_jsonl(pipeline.run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_start",
+        "run_id": run_id,
+        "mode": "pipeline",
+        "dates": len(dates),
+        "pending": {k: len(v) for k, v in pending.items()},
+        "stages": {k: vars(v) for k, v in settings.items()},
+    })
+
+    async def run() -> Dict[str, Dict[str, int]]:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, pipeline.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        return await pipeline.run(dates, pending)
+
+    counts = asyncio.run(run())
+
+    log_jsonl(pipeline.run_log, {
+        "ts": datetime.now().isoformat(),
+        "level": "INFO",
+        "event": "run_end",
+        "run_id": run_id,
+        "stopped": pipeline._stopping,
+        "stages": counts,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from lib.arelle_session import ArelleSession
+from lib.config import load_config
+from lib.logger import log_jsonl
+from edinet.parse_xbrl import open_xbrl_entry, public_doc_members
+
+
+# schemaRef / import / linkbaseRef 等で参照される外部 URL
+_EXTERNAL_REF_RE = re.compile(rb'(?:schemaLocation|xlink:href|href)="(https?://[^"#]+)')
+# .../taxonomy/<name>/<YYYY-MM-DD>/... (EDINET) または .../taxonomy/<YYYY-MM-DD>/... (IFRS)
+_VERSION_RE = re.compile(r"/taxonomy/(?:([^/]+)/)?(\d{4}-\d{2}-\d{2})/")
+
+
+def taxonomy_version(url: str) -> Optional[str]:
+    """参照 URL からタクソノミのバージョンキーを得る（例: jpcrp/2023-12-01, xbrl.ifrs.org/2023-03-23）"""
+    m = _VERSION_RE.search(url)
+    if not m:
+        return None
+    name = m.group(1) or urlparse(url).netloc
+    return f"{name}/{m.group(2)}"
+
+
+def collect_taxonomy_refs(zip_path: Path) -> Set[str]:
+    """document.zip の PublicDoc から外部タクソノミへの参照 URL を集める"""
+    refs: Set[str] = set()
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for info in public_doc_members(zf):
+            if not info.filename.endswith((".xsd", ".xbrl", ".xml")):
+                continue
+            for m in _EXTERNAL_REF_RE.finditer(zf.read(info)):
+                refs.add(m.group(1).decode("ascii", "replace"))
+    return refs
+
+
+def cache_file_path(cache_dir: Path, url: str) -> Path:
+    """Arelle webCache 上のパス（<cacheDir>/<scheme>/<host>/<path>）"""
+    parsed = urlparse(url)
+    return cache_dir / parsed.scheme / parsed.netloc / parsed.path.lstrip("/")
+
+
+def group_by_versions(zip_paths: Iterable[Path]) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+    """
+    参照するタクソノミバージョンの組み合わせごとに書類をまとめる
+
+    Returns:
+        {(version, ...): {"zip_paths": [...], "refs": set(url)}}
+    """
+    groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    for zip_path in zip_paths:
+        try:
+            refs = collect_taxonomy_refs(zip_path)
+        except zipfile.BadZipFile:
+            continue
+        versions = tuple(sorted({v for v in (taxonomy_version(u) for u in refs) if v}))
+        if not versions:
+            continue
+        group = groups.setdefault(versions, {"zip_paths": [], "refs": set()})
+        group["zip_paths"].append(zip_path)
+        group["refs"] |= refs
+    return groups
+
+
+def time_load(session: ArelleSession, zip_path: Path) -> Tuple[float, int]:
+    """1書類を読み込んだ秒数と Arelle のエラー件数"""
+    with open_xbrl_entry(zip_path) as xbrl_file:
+        if xbrl_file is None:
+            raise FileNotFoundError(f"XBRL/PublicDoc not found: {zip_path}")
+        started = time.perf_counter()
+        with session.open(xbrl_file) as model_xbrl:
+            errors = len(getattr(model_xbrl, "errors", None) or [])
+        return time.perf_counter() - started, errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build and check the local taxonomy cache used by parse_xbrl")
+    parser.add_argument("--config", default="src/config/config.yaml")
+    parser.add_argument("--cache-dir", dest="cache_dir", help="default: parse.taxonomy_cache_dir")
+    parser.add_argument("--check", action="store_true",
+                        help="only report taxonomy files missing from the cache (no Arelle, no network)")
+    parser.add_argument("--offline", action="store_true",
+                        help="time loads from the existing cache without fetching (as parse nodes do)")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    paths_cfg = cfg.get("paths", {})
+    parse_cfg = cfg.get("parse", {}) or {}
+    raw_root = Path(paths_cfg.get("raw_root", "data/raw/edinet"))
+    log_root = Path(paths_cfg.get("log_root", "data/logs/edinet"))
+    cache_dir = Path(args.cache_dir or parse_cfg.get("taxonomy_cache_dir") or "data/taxonomy_cache")
+
+    groups = group_by_versions(sorted(raw_root.glob("*/*/*/*/document.zip")))
+    if not groups:
+        print(f"no taxonomy references found under {raw_root}")
+        return 0
+
+    if args.check:
+        missing_total = 0
+        for versions, group in sorted(groups.items()):
+            missing = sorted(u for u in group["refs"] if not cache_file_path(cache_dir, u).exists())
+            missing_total += len(missing)
+            print(f"{', '.join(versions)}: {len(group['zip_paths'])} docs, {len(missing)} missing")
+            for url in missing:
+                print(f"  {url}")
+        return 1 if missing_total else 0
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_log = log_root / datetime.now().strftime("%Y/%m/%d") / f"run_{run_id}.jsonl"
+    failed = 0
+    print(f"{'taxonomy versions':<60} {'docs':>6} {'cold(s)':>8} {'warm(s)':>8} {'errors':>6}")
+    for versions, group in sorted(groups.items()):
+        # バージョンの組み合わせごとに新しいコントローラで cold → 同じコントローラで warm を計測
+        session = ArelleSession(max_documents=0, cache_dir=cache_dir, offline=args.offline)
+        sample = group["zip_paths"][0]
+        try:
+            cold_sec, cold_errors = time_load(session, sample)
+            warm_sec, warm_errors = time_load(session, sample)
+        finally:
+            session.close()
+        missing = sum(1 for u in group["refs"] if not cache_file_path(cache_dir, u).exists())
+        if warm_errors or missing:
+            failed += 1
+        log_jsonl(run_log, {
+            "ts": datetime.now().isoformat(),
+            "level": "WARN" if warm_errors or missing else "INFO",
+            "event": "taxonomy_prewarm",
+            "run_id": run_id,
+            "versions": list(versions),
+            "documents": len(group["zip_paths"]),
+            "sample_zip": str(sample),
+            "cold_sec": round(cold_sec, 3),
+            "warm_sec": round(warm_sec, 3),
+            "cold_errors": cold_errors,
+            "warm_errors": warm_errors,
+            "missing_refs": missing,
+            "offline": args.offline,
+        })
+        print(f"{', '.join(versions)[:60]:<60} {len(group['zip_paths']):>6} "
+              f"{cold_sec:>8.2f} {warm_sec:>8.2f} {warm_errors:>6}")
+
+    print(f"cache: {cache_dir} ({len(groups)} version sets, {failed} incomplete)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
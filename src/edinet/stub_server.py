@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from lib.doclist_store import find_doclist, read_doclist
+from lib.rate_limiter import TokenBucket
+
+
+class StubBehavior:
+    """
+    スタブサーバーの応答特性
+
+    Args:
+        latency_sec: 応答前の固定待ち時間
+        jitter_sec: latency_sec に加算するランダム待ち時間の上限
+        error_rate: 503 を返す確率 (0.0〜1.0)
+        throttle_per_sec: 1秒あたりの許容リクエスト数（超過時は 429 + Retry-After）。None で無制限
+        throttle_burst: スロットリングのバースト上限
+        docs_per_day: 合成 doclist の1日あたり件数
+        zip_size_bytes: 合成 ZIP に含めるダミーデータのサイズ
+        seed: 乱数シード（合成データ・エラー注入の再現用）
+    """
+
+    def __init__(
+        self,
+        latency_sec: float = 0.0,
+        jitter_sec: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_per_sec: Optional[float] = None,
+        throttle_burst: float = 1.0,
+        docs_per_day: int = 20,
+        zip_size_bytes: int = 256 * 1024,
+        seed: int = 0,
+    ):
+        self.latency_sec = latency_sec
+        self.jitter_sec = jitter_sec
+        self.error_rate = error_rate
+        self.docs_per_day = docs_per_day
+        self.zip_size_bytes = zip_size_bytes
+        self.seed = seed
+        self.throttle = (
+            TokenBucket(rate_per_sec=throttle_per_sec, capacity=throttle_burst)
+            if throttle_per_sec else None
+        )
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+
+class FixtureStore:
+    """
+    fixture の読み込みと合成データの生成
+
+    fixture_root は raw_root と同じ構成（YYYY/MM/DD/doclist.json[.gz|.zst], YYYY/MM/DD/<docID>_*/document.zip）。
+    fixture が無い日付・docID は合成データを返す。
+    """
+
+    def __init__(self, behavior: StubBehavior, fixture_root: Optional[Path] = None):
+        self.behavior = behavior
+        self.fixture_root = Path(fixture_root) if fixture_root else None
+        self._zip_index: Dict[str, Path] = {}
+        if self.fixture_root and self.fixture_root.exists():
+            for path in self.fixture_root.glob("*/*/*/*/document.zip"):
+                self._zip_index[path.parent.name.split("_", 1)[0]] = path
+
+    def doclist(self, date_str: str) -> Dict[str, Any]:
+        if self.fixture_root:
+            path = find_doclist(self.fixture_root, date_str)
+            if path is not None:
+                return read_doclist(path)
+        return self.synthetic_doclist(date_str)
+
+    def synthetic_doclist(self, date_str: str) -> Dict[str, Any]:
+        date = datetime.strptime(date_str, "%Y-%m-%d")
+        results = []
+        for i in range(self.behavior.docs_per_day):
+            n = int(hashlib.sha256(f"{self.behavior.seed}|{date_str}|{i}".encode()).hexdigest()[:6], 16)
+            results.append({
+                "seqNumber": i + 1,
+                "docID": f"S1{date:%y%m%d}{i:03d}",
+                "edinetCode": f"E{n % 100000:05d}",
+                "secCode": f"{1000 + n % 9000}0",
+                "JCN": f"{n % 10**13:013d}",
+                "filerName": f"Stub Company {n % 100000:05d}",
+                "fundCode": None,
+                "ordinanceCode": "010",
+                "formCode": "030000",
+                "docTypeCode": "120",
+                "periodStart": f"{date.year - 1}-04-01",
+                "periodEnd": f"{date.year}-03-31",
+                "submitDateTime": f"{date_str} 09:{i % 60:02d}",
+                "docDescription": "有価証券報告書",
+                "issuerEdinetCode": None,
+                "subjectEdinetCode": None,
+                "subsidiaryEdinetCode": None,
+                "currentReportReason": None,
+                "parentDocID": None,
+                "opeDateTime": None,
+                "withdrawalStatus": "0",
+                "docInfoEditStatus": "0",
+                "disclosureStatus": "0",
+                "xbrlFlag": "1",
+                "pdfFlag": "1",
+                "attachDocFlag": "0",
+                "englishDocFlag": "0",
+                "csvFlag": "1",
+                "legalStatus": "1",
+            })
+        return {
+            "metadata": {
+                "title": "提出された書類を把握するためのAPI",
+                "parameter": {"date": date_str, "type": "2"},
+                "resultset": {"count": len(results)},
+                "processDateTime": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "status": "200",
+                "message": "OK",
+            },
+            "results": results,
+        }
+
+    def document_zip(self, doc_id: str) -> bytes:
+        path = self._zip_index.get(doc_id)
+        if path is not None:
+            return path.read_bytes()
+        return self.synthetic_zip(doc_id)
+
+    def synthetic_zip(self, doc_id: str) -> bytes:
+        rng = random.Random(f"{self.behavior.seed}|{doc_id}")
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+            zf.writestr(f"XBRL/PublicDoc/jpcrp030000-asr-001_{doc_id}.xbrl", "<xbrli:xbrl/>")
+            zf.writestr("XBRL/AuditDoc/padding.bin", rng.randbytes(self.behavior.zip_size_bytes))
+        return buf.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: "StubEdinetServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def do_GET(self) -> None:
+        behavior = self.server.behavior
+        self.server.count_request()
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if behavior.throttle is not None:
+            wait = behavior.throttle.try_acquire()
+            if wait > 0:
+                self.server.count_status(429)
+                self._send_json(429, {"statusCode": 429, "message": "Too Many Requests"},
+                                {"Retry-After": f"{max(1, round(wait))}"})
+                return
+
+        delay = behavior.latency_sec + (behavior.random() * behavior.jitter_sec if behavior.jitter_sec else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if behavior.error_rate and behavior.random() < behavior.error_rate:
+            self.server.count_status(503)
+            self._send_json(503, {"statusCode": 503, "message": "Service Unavailable"})
+            return
+
+        if self.server.api_key and params.get("Subscription-Key") != self.server.api_key:
+            self.server.count_status(401)
+            self._send_json(401, {"statusCode": 401, "message": "Access denied due to invalid subscription key."})
+            return
+
+        base = self.server.base_path
+        if url.path == f"{base}/documents.json":
+            date_str = params.get("date")
+            try:
+                datetime.strptime(date_str or "", "%Y-%m-%d")
+            except ValueError:
+                self.server.count_status(400)
+                self._send_json(400, {"statusCode": 400, "message": "date is invalid"})
+                return
+            self.server.count_status(200)
+            self._send_json(200, self.server.store.doclist(date_str))
+            return
+
+        if url.path.startswith(f"{base}/documents/"):
+            doc_id = url.path[len(f"{base}/documents/"):]
+            self.server.count_status(200)
+            self._send(200, self.server.store.document_zip(doc_id), "application/octet-stream")
+            return
+
+        self.server.count_status(404)
+        self._send_json(404, {"statusCode": 404, "message": "Not Found"})
+
+
+class StubEdinetServer(ThreadingHTTPServer):
+    """
+    EDINET API のローカルスタンドイン（スループット計測・CI 用）
+
+    /documents.json と /documents/{docID} を fixture または合成データで応答する。
+    with 文で使うとバックグラウンドスレッドで起動・停止する。
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        behavior: Optional[StubBehavior] = None,
+        fixture_root: Optional[Path] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        base_path: str = "/api/v2",
+        api_key: Optional[str] = None,
+        verbose: bool = False,
+    ):
+        super().__init__((host, port), StubHandler)
+        self.behavior = behavior or StubBehavior()
+        self.store = FixtureStore(self.behavior, fixture_root)
+        self.base_path = base_path.rstrip("/")
+        self.api_key = api_key
+        self.verbose = verbose
+        self.stats: Dict[str, int] = {"requests": 0}
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{self.base_path}"
+
+    def count_request(self) -> None:
+        with self._stats_lock:
+            self.stats["requests"] += 1
+
+    def count_status(self, status: int) -> None:
+        with self._stats_lock:
+            key = f"status_{status}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def start(self) -> "StubEdinetServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, name="edinet-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubEdinetServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local EDINET API stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fixtures", help="raw_root style directory to replay (doclist.json / document.zip)")
+    parser.add_argument("--api-key", dest="api_key", help="require this Subscription-Key")
+    parser.add_argument("--latency", type=float, default=0.0, help="fixed latency per request (sec)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency upper bound (sec)")
+    parser.add_argument("--error-rate", dest="error_rate", type=float, default=0.0, help="probability of 503")
+    parser.add_argument("--throttle", type=float, help="allowed requests per second (429 beyond)")
+    parser.add_argument("--throttle-burst", dest="throttle_burst", type=float, default=1.0)
+    parser.add_argument("--docs-per-day", dest="docs_per_day", type=int, default=20)
+    parser.add_argument("--zip-size", dest="zip_size", type=int, default=256 * 1024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(
+        latency_sec=args.latency,
+        jitter_sec=args.jitter,
+        error_rate=args.error_rate,
+        throttle_per_sec=args.throttle,
+        throttle_burst=args.throttle_burst,
+        docs_per_day=args.docs_per_day,
+        zip_size_bytes=args.zip_size,
+        seed=args.seed,
+    )
+    server = StubEdinetServer(
+        behavior,
+        fixture_root=Path(args.fixtures) if args.fixtures else None,
+        host=args.host,
+        port=args.port,
+        api_key=args.api_key,
+        verbose=args.verbose,
+    )
+    print(f"EDINET stub listening on {server.base_url} (set edinet.base_url to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""
+Arelle Session: 複数書類を連続で解析するための常駐 Arelle コントローラ
+
+parse_xbrl は書類ごとに Cntlr を生成していたため、毎回コントローラの初期化と
+タクソノミ（webCache 上の EDINET / IFRS スキーマ・リンクベース）の読み込み準備が発生していた。
+ArelleSession は1プロセスにつき1つのコントローラを保持し、書類ごとに ModelXbrl だけを開閉する。
+
+- load() で開いた ModelXbrl は必ず close() する（with session.open(path) as model_xbrl: を推奨）
+- max_documents 件解析したらコントローラを作り直し、Arelle 内部のキャッシュ肥大を抑える
+- プロセス全体のメモリ上限はプロセスプール側の max_tasks_per_child で再起動して抑える
+- cache_dir / offline を指定すると、タクソノミは webCache（prewarm_taxonomy.py で作成）からのみ解決する
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+DEFAULT_MAX_DOCUMENTS = 200
+
+
+def _default_controller() -> Any:
+    try:
+        from arelle import Cntlr  # type: ignore
+    except Exception as exc:
+        raise RuntimeError("Arelle is not installed. Install arelle-release.") from exc
+    return Cntlr.Cntlr(logFileName="logToPrint")
+
+
+class ArelleSession:
+    """1プロセス内で使い回す Arelle コントローラ"""
+
+    def __init__(
+        self,
+        max_documents: int = DEFAULT_MAX_DOCUMENTS,
+        controller_factory: Callable[[], Any] = _default_controller,
+        cache_dir: Optional[Path] = None,
+        offline: bool = False,
+    ):
+        """
+        Args:
+            max_documents: この件数を解析したらコントローラを作り直す（0 以下で作り直さない）
+            controller_factory: Cntlr を生成する関数（テスト用に差し替え可能）
+            cache_dir: Arelle webCache のディレクトリ（None なら Arelle の既定）
+            offline: True ならネットワークに出ず cache_dir からのみ解決する
+        """
+        self.max_documents = max_documents
+        self._factory = controller_factory
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.offline = offline
+        self._cntlr: Any = None
+        self.documents = 0
+        self.recycles = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, parse_cfg: Optional[Dict[str, Any]], **kwargs) -> "ArelleSession":
+        """config の parse セクションから生成"""
+        parse_cfg = parse_cfg or {}
+        cache_dir = Path(parse_cfg["taxonomy_cache_dir"]) if parse_cfg.get("taxonomy_cache_dir") else None
+        offline = bool(parse_cfg.get("offline", False))
+        # 空のキャッシュで offline にするとタクソノミが1つも解決できず、全書類が QC fail（no_facts）になる
+        if offline and cache_dir is not None and not (cache_dir.is_dir() and any(cache_dir.iterdir())):
+            raise RuntimeError(
+                f"parse.offline is true but taxonomy_cache_dir {cache_dir} is empty. "
+                "Run src/edinet/prewarm_taxonomy.py first or set parse.offline: false."
+            )
+        return cls(
+            max_documents=int(parse_cfg.get("worker_max_documents", DEFAULT_MAX_DOCUMENTS)),
+            cache_dir=cache_dir,
+            offline=offline,
+            **kwargs,
+        )
+
+    @property
+    def controller(self) -> Any:
+        if self._cntlr is None:
+            cntlr = self._factory()
+            if self.cache_dir is not None or self.offline:
+                web_cache = cntlr.webCache
+                if self.cache_dir is not None:
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    web_cache.cacheDir = str(self.cache_dir)
+                web_cache.workOffline = self.offline
+            self._cntlr = cntlr
+        return self._cntlr
+
+    def _recycle_if_needed(self) -> None:
+        if self.max_documents > 0 and self.documents >= self.max_documents and self._cntlr is not None:
+            self._close_controller()
+            self.documents = 0
+            self.recycles += 1
+
+    def _close_controller(self) -> None:
+        try:
+            self._cntlr.close(saveConfig=False)
+        except Exception:
+            pass
+        self._cntlr = None
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[Any]:
+        """
+        インスタンスを読み込み、with を抜けると ModelXbrl を閉じる
+
+        Arelle の ModelManager はスレッドセーフではないため、同一セッションでの読み込みは直列化する。
+        """
+        with self._lock:
+            self._recycle_if_needed()
+            model_xbrl = self.controller.modelManager.load(str(path))
+            self.documents += 1
+            try:
+                yield model_xbrl
+            finally:
+                model_xbrl.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._cntlr is not None:
+                self._close_controller()
+
+
+_session: Optional[ArelleSession] = None
+
+
+def get_session(parse_cfg: Optional[Dict[str, Any]] = None) -> ArelleSession:
+    """プロセス共通のセッションを返す（初回呼び出し時に config の parse セクションから生成）"""
+    global _session
+    if _session is None:
+        _session = ArelleSession.from_config(parse_cfg)
+    return _session
@@ -0,0 +1,125 @@
+"""
+Bulk Copy: COPY + 集合演算の upsert による staging への一括登録
+
+execute_values（page_size=500）+ ON CONFLICT DO UPDATE は1万ファクトを超える書類で
+文の組み立てとサーバー側の解析が重く、数千書類の再ステージングでは登録が律速になる。
+行を COPY のテキスト形式でストリームして一時テーブルに流し込み、
+1テーブルにつき1回の INSERT ... SELECT ... ON CONFLICT で本テーブルへ反映する。
+
+- 一時テーブルは CREATE TEMP TABLE ... ON COMMIT DROP（WAL を書かない。コミットで消える）
+- 行は COPY テキスト形式へ逐次変換し、書類全体の文字列を一度に作らない
+- 反映の ON CONFLICT 句は lib.db の execute_values 版と共有する（結果は同じになる）
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+NULL = "\\N"
+
+# COPY テキスト形式でエスケープが必要な文字
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text(value: Any) -> str:
+    """Python の値を COPY テキスト形式の1フィールドにする"""
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea の hex 形式（\x...）。COPY 側のエスケープでバックスラッシュを二重にする
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    elif hasattr(value, "adapted"):
+        # psycopg2.extras.Json
+        value = json.dumps(value.adapted, ensure_ascii=False, sort_keys=True)
+    return str(value).translate(_ESCAPES)
+
+
+def copy_lines(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    for row in rows:
+        yield "\t".join(copy_text(v) for v in row) + "\n"
+
+
+class CopyReader(io.TextIOBase):
+    """行イテレータを COPY FROM STDIN 用のファイルとして読ませる（copy_expert に渡す）"""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._lines = copy_lines(rows)
+        self._buf = ""
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            out = self._buf + "".join(self._count(self._lines))
+            self._buf = ""
+            return out
+        parts = [self._buf]
+        n = len(self._buf)
+        for line in self._count(self._lines):
+            parts.append(line)
+            n += len(line)
+            if n >= size:
+                break
+        data = "".join(parts)
+        self._buf = data[size:]
+        return data[:size]
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        if self._buf:
+            line, sep, rest = self._buf.partition("\n")
+            self._buf = rest
+            return line + sep
+        return next(self._count(self._lines), "")
+
+    def _count(self, lines: Iterator[str]) -> Iterator[str]:
+        for line in lines:
+            self.rows += 1
+            yield line
+
+
+def temp_table_name(table: str) -> str:
+    return "_copy_" + table.replace(".", "_")
+
+
+def copy_merge(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    conflict: str,
+) -> List[Tuple[Any, ...]]:
+    """
+    rows を一時テーブルへ COPY し、1文で table へ upsert する
+
+    Args:
+        table: 反映先（例: "staging.fact"）
+        columns: rows の列順
+        conflict: "ON CONFLICT ..." 句（lib.db の execute_values 版と同じもの。RETURNING を含んでよい）
+
+    Returns:
+        conflict 句の RETURNING の行（無ければ空。コミットは呼び出し側）
+    """
+    tmp = temp_table_name(table)
+    cols = ", ".join(columns)
+    reader = CopyReader(rows)
+    with conn.cursor() as cur:
+        # 同じトランザクション内で2回呼ばれても作り直す
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{tmp}")
+        cur.execute(
+            f"CREATE TEMP TABLE {tmp} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"
+        )
+        cur.copy_expert(f"COPY {tmp} ({cols}) FROM STDIN", reader)
+        cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {tmp} {conflict}")
+        return cur.fetchall() if "RETURNING" in conflict else []
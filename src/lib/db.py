@@ -1,10 +1,21 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import atexit
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
 import psycopg2.extras
 
+from lib.bulk_copy import copy_merge
+from lib.fact_batch import FACT_COLUMNS, FactBatch
+
 
 RAW_COLUMNS: List[str] = [
     "doc_id",
@@ -44,17 +55,261 @@ RAW_COLUMNS: List[str] = [
 ]
 
 
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    準備済み文（PREPARE）の名前と最終利用時刻を持つ接続
+
+    get_conn / ConnectionPool の接続はすべてこのクラス。prepared が None なら
+    execute_prepared は通常の SQL を実行する（db.prepare: false）。
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.prepared: Optional[Set[str]] = set()
+        self.last_used = time.monotonic()
+
+
 def get_conn(db_cfg: Dict[str, Any]):
-    return psycopg2.connect(
+    conn = psycopg2.connect(
         host=db_cfg.get("host"),
         port=db_cfg.get("port"),
         dbname=db_cfg.get("name"),
         user=db_cfg.get("user"),
         password=db_cfg.get("password"),
+        connection_factory=PooledConnection,
     )
+    if not db_cfg.get("prepare", True):
+        conn.prepared = None
+    return conn
+
+
+# --- server-side prepared statements ---
+
+class PreparedStatement(NamedTuple):
+    name: str
+    sql: str                  # psycopg2 形式（%s）。準備しない接続ではこのまま実行する
+    types: Tuple[str, ...]    # 引数の型（空: サーバーの推論に任せる）
+
+    def prepare_sql(self) -> str:
+        """PREPARE 文（%s → $n, %% → %）"""
+        n = 0
+
+        def positional(m: "re.Match[str]") -> str:
+            nonlocal n
+            if m.group(0) == "%%":
+                return "%"
+            n += 1
+            return f"${n}"
+
+        body = _PLACEHOLDER_RE.sub(positional, self.sql)
+        types = f" ({', '.join(self.types)})" if self.types else ""
+        return f"PREPARE {self.name}{types} AS {body}"
+
+    def execute_sql(self, nparams: int) -> str:
+        args = f" ({', '.join(['%s'] * nparams)})" if nparams else ""
+        return f"EXECUTE {self.name}{args}"
+
+
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
 
+# 書類ごと・ファクトごとに繰り返し実行する文（接続ごとに初回だけ PREPARE する）
+PREPARED_STATEMENTS: Dict[str, PreparedStatement] = {}
 
-def upsert_raw_edinet_documents(conn, rows: Iterable[Dict[str, Any]]) -> int:
+
+def prepared_statement(name: str, sql: str, types: Sequence[str] = ()) -> PreparedStatement:
+    """準備済み文を登録して返す（モジュール読み込み時に呼ぶ）"""
+    stmt = PreparedStatement(name, sql, tuple(types))
+    PREPARED_STATEMENTS[name] = stmt
+    return stmt
+
+
+def execute_prepared(cur, stmt: PreparedStatement, params: Sequence[Any] = ()) -> None:
+    """
+    接続ごとに初回だけ PREPARE し、以降は EXECUTE で実行する（サーバー側の解析・計画を省く）
+
+    PooledConnection 以外の接続、または db.prepare: false の接続では stmt.sql をそのまま実行する。
+    """
+    conn = getattr(cur, "connection", None)
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None:
+        cur.execute(stmt.sql, params)
+        return
+    if stmt.name not in prepared:
+        cur.execute(stmt.prepare_sql())
+        prepared.add(stmt.name)
+    cur.execute(stmt.execute_sql(len(params)), params)
+
+
+# --- connection pool ---
+
+class PoolError(psycopg2.Error):
+    pass
+
+
+class ConnectionPool:
+    """
+    スレッドセーフな DB 接続プール
+
+    - min_size 本を先に開き、max_size 本まで必要に応じて増やす。空きが無ければ acquire_timeout 秒待つ
+    - 貸し出し前に閉じた接続を捨て、health_check_sec 以上使われていない接続は SELECT 1 で確認する
+    - 返却時に未完了のトランザクションは rollback する（PREPARE した文は接続に残り再利用される）
+    - プロセスごとに1つ（get_pool）。fork 先では親の接続を閉じずに作り直す
+    """
+
+    def __init__(
+        self,
+        db_cfg: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 4,
+        health_check_sec: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ):
+        self.db_cfg = db_cfg
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.health_check_sec = health_check_sec
+        self.acquire_timeout = acquire_timeout
+        self.pid = os.getpid()
+        self._idle: List[Any] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        for _ in range(self.min_size):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    @classmethod
+    def from_config(cls, db_cfg: Dict[str, Any], **overrides: Any) -> "ConnectionPool":
+        pool_cfg = {**(db_cfg.get("pool") or {}), **overrides}
+        return cls(
+            db_cfg,
+            min_size=int(pool_cfg.get("min_size", 1)),
+            max_size=int(pool_cfg.get("max_size", 4)),
+            health_check_sec=float(pool_cfg.get("health_check_sec", 30.0)),
+            acquire_timeout=float(pool_cfg.get("acquire_timeout", 30.0)),
+        )
+
+    def _connect(self):
+        return get_conn(self.db_cfg)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - getattr(conn, "last_used", 0.0) < self.health_check_sec:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise PoolError(f"no connection available within {self.acquire_timeout}s")
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    conn = None
+                    self._size += 1
+            if conn is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    self._discard(None)
+                    raise
+            if self._healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn, discard: bool = False) -> None:
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            if self._closed:
+                conn.close()
+                self._size -= 1
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn) -> None:
+        if conn is not None and not conn.closed:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """with pool.connection() as conn: ...（例外時は rollback して返却、接続エラーなら破棄）"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        if os.getpid() != self.pid:
+            return
+        for conn in idle:
+            conn.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(db_cfg: Dict[str, Any]) -> ConnectionPool:
+    """
+    プロセス共通のプールを返す（初回呼び出し時に db セクションから生成）
+
+    プロセスプールのワーカーは spawn で起動するためそれぞれ自分のプールを持つ。
+    fork された子では親のプールを使わずに作り直す（親の接続は閉じない）。
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool.from_config(db_cfg)
+            atexit.register(_pool.close)
+        return _pool
+
+
+def upsert_raw_edinet_documents(conn, rows: Iterable[Dict[str, Any]], commit: bool = True) -> int:
     rows = list(rows)
     if not rows:
         return 0
@@ -72,10 +327,58 @@ def upsert_raw_edinet_documents(conn, rows: Iterable[Dict[str, Any]]) -> int:
 
     with conn.cursor() as cur:
         psycopg2.extras.execute_values(cur, sql, values, page_size=500)
-    conn.commit()
+    if commit:
+        conn.commit()
     return len(rows)
 
 
+# fetch_status の遷移に合わせて更新するタイムスタンプ列
+STATUS_TIMESTAMP_COLUMNS: Dict[str, str] = {
+    "parsed": "parsed_at",
+    "loaded": "loaded_at",
+}
+
+
+def _status_statement(ts_col: Optional[str]) -> PreparedStatement:
+    ts_set = f", {ts_col} = NOW()" if ts_col else ""
+    return prepared_statement(
+        f"update_document_status_{ts_col or 'only'}",
+        f"""
+        UPDATE raw.edinet_document
+        SET fetch_status = %s{ts_set}
+        WHERE doc_id = %s
+        """,
+    )
+
+
+_STATUS_STATEMENTS: Dict[Optional[str], PreparedStatement] = {
+    ts_col: _status_statement(ts_col) for ts_col in [None, *STATUS_TIMESTAMP_COLUMNS.values()]
+}
+
+
+# parse で取り込めなかった書類の終端状態。zip_downloaded に戻さないので --pending / --include-pending
+# （select_doc_ids_by_status(conn, "zip_downloaded")）では選ばれない。再解析は --doc-id で行う
+QC_FAILED = "qc_failed"
+PARSE_FAILED = "parse_failed"
+
+
+def status_statement(status: str) -> PreparedStatement:
+    """fetch_status を status にする文（引数は (status, doc_id)）"""
+    return _STATUS_STATEMENTS[STATUS_TIMESTAMP_COLUMNS.get(status)]
+
+
+def update_document_status(conn, doc_id: str, status: str, commit: bool = True) -> None:
+    """raw.edinet_document の fetch_status（と parsed_at / loaded_at）を更新"""
+    stmt = status_statement(status)
+    with conn.cursor() as cur:
+        execute_prepared(cur, stmt, (status, doc_id))
+    if commit:
+        conn.commit()
+
+
+RAW_FILE_COLUMNS: List[str] = ["doc_id", "file_type", "path", "size_bytes", "sha256"]
+
+
 def insert_raw_file(
     conn,
     doc_id: str,
@@ -83,36 +386,127 @@ def insert_raw_file(
     path: str,
     size_bytes: int | None = None,
     sha256: str | None = None,
+    commit: bool = True,
 ) -> None:
-    sql = """
-        INSERT INTO raw.edinet_file (doc_id, file_type, path, size_bytes, sha256)
-        VALUES (%s, %s, %s, %s, %s)
+    insert_raw_files(
+        conn,
+        [{"doc_id": doc_id, "file_type": file_type, "path": path, "size_bytes": size_bytes, "sha256": sha256}],
+        commit=commit,
+    )
+
+
+def insert_raw_files(conn, rows: Iterable[Dict[str, Any]], commit: bool = True) -> int:
+    """raw.edinet_file に複数ファイルを1文・1コミットで登録"""
+    rows = list(rows)
+    if not rows:
+        return 0
+    values = [[r.get(c) for c in RAW_FILE_COLUMNS] for r in rows]
+    insert_cols = ", ".join(RAW_FILE_COLUMNS)
+    sql = f"""
+        INSERT INTO raw.edinet_file ({insert_cols})
+        VALUES %s
         ON CONFLICT DO NOTHING
     """
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id, file_type, path, size_bytes, sha256))
-    conn.commit()
+        psycopg2.extras.execute_values(cur, sql, values, page_size=500)
+    if commit:
+        conn.commit()
+    return len(rows)
 
 
-def upsert_staging_contexts(conn, rows: Sequence[Dict[str, Any]]) -> None:
-    if not rows:
-        return
-    cols = [
-        "doc_id",
-        "context_ref",
-        "period_type",
-        "period_start",
-        "period_end",
-        "instant_date",
-        "entity_identifier",
-        "is_consolidated",
-        "dimensions",
-        "context_hash",
-    ]
-    values = []
+def register_doclist_file(
+    conn,
+    list_date: str,
+    path: str,
+    size_bytes: int | None = None,
+    sha256: str | None = None,
+    commit: bool = True,
+) -> int:
+    """
+    doclist.json をファイル単位で raw.edinet_doclist_file に登録し、id を返す
+
+    同じ日の docID はすべて raw.edinet_document.doclist_json_path で参照する。
+    """
+    sql = """
+        INSERT INTO raw.edinet_doclist_file (list_date, path, size_bytes, sha256)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (path) DO UPDATE
+        SET list_date = EXCLUDED.list_date,
+            size_bytes = EXCLUDED.size_bytes,
+            sha256 = EXCLUDED.sha256,
+            updated_at = NOW()
+        RETURNING id
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (list_date, path, size_bytes, sha256))
+        file_id = cur.fetchone()[0]
+    if commit:
+        conn.commit()
+    return file_id
+
+
+# core.context_signature の列（context_hash 以外）
+SIGNATURE_COLUMNS: List[str] = [
+    "period_type",
+    "period_start",
+    "period_end",
+    "instant_date",
+    "is_consolidated",
+    "dimensions",
+]
+
+# context_hash → signature_id（コミット済みの行のみ。プロセス内で共有）
+# 参照されない署名は sql/07 の掃除で消えうるため、外部キー違反で失敗したら clear_signature_memo() で捨てる
+_signature_ids: Dict[bytes, int] = {}
+
+SELECT_SIGNATURE_IDS = prepared_statement(
+    "select_signature_ids",
+    "SELECT context_hash, signature_id FROM core.context_signature WHERE context_hash = ANY(%s)",
+    ["bytea[]"],
+)
+
+
+def clear_signature_memo() -> None:
+    """context_hash → signature_id のメモを捨てる（次の登録で DB から引き直す）"""
+    _signature_ids.clear()
+
+
+def signature_rows(rows: Iterable[Dict[str, Any]]) -> Dict[bytes, Dict[str, Any]]:
+    """context 行を context_hash で重複排除する（先勝ち）"""
+    unique: Dict[bytes, Dict[str, Any]] = {}
     for r in rows:
-        row = []
-        for c in cols:
+        unique.setdefault(bytes(r["context_hash"]), r)
+    return unique
+
+
+def upsert_context_signatures(
+    conn,
+    rows: Sequence[Dict[str, Any]],
+    pending: Optional[Dict[bytes, int]] = None,
+) -> Dict[bytes, int]:
+    """
+    core.context_signature に未登録の context を登録し、context_hash → signature_id を返す
+
+    同じ構造の context は書類をまたいで共有する。既知のハッシュはプロセス内のメモから引き、
+    DB には未知のハッシュだけを問い合わせる。コミットはしない。
+    新たに得た id は pending に入れ、StagingTransaction がコミット後にメモへ反映する
+    （ロールバックされた行の id をメモに残さない）。
+    """
+    pending = {} if pending is None else pending
+    unique = signature_rows(rows)
+    ids = {h: _signature_ids.get(h) or pending.get(h) for h in unique}
+    ids = {h: i for h, i in ids.items() if i is not None}
+    # 一意インデックスのロック順を揃える（重なるハッシュを別順で登録するワーカー同士のデッドロック防止）
+    missing = sorted(h for h in unique if h not in ids)
+    if not missing:
+        return ids
+
+    cols = ["context_hash"] + SIGNATURE_COLUMNS
+    values = []
+    for h in missing:
+        r = unique[h]
+        row: List[Any] = [h]
+        for c in SIGNATURE_COLUMNS:
             val = r.get(c)
             if c == "dimensions" and val is not None:
                 val = psycopg2.extras.Json(val)
@@ -120,114 +514,242 @@ def upsert_staging_contexts(conn, rows: Sequence[Dict[str, Any]]) -> None:
         values.append(row)
     insert_cols = ", ".join(cols)
     sql = f"""
-        INSERT INTO staging.context ({insert_cols})
+        INSERT INTO core.context_signature ({insert_cols})
         VALUES %s
-        ON CONFLICT (doc_id, context_ref) DO UPDATE
-        SET period_type = EXCLUDED.period_type,
-            period_start = EXCLUDED.period_start,
-            period_end = EXCLUDED.period_end,
-            instant_date = EXCLUDED.instant_date,
-            entity_identifier = EXCLUDED.entity_identifier,
-            is_consolidated = EXCLUDED.is_consolidated,
-            dimensions = EXCLUDED.dimensions,
-            context_hash = EXCLUDED.context_hash
+        ON CONFLICT (context_hash) DO NOTHING
     """
     with conn.cursor() as cur:
         psycopg2.extras.execute_values(cur, sql, values, page_size=500)
-    conn.commit()
+        execute_prepared(cur, SELECT_SIGNATURE_IDS, (missing,))
+        found = {bytes(r[0]): r[1] for r in cur.fetchall()}
+    pending.update(found)
+    ids.update(found)
+    return ids
 
 
-def upsert_staging_units(conn, rows: Sequence[Dict[str, Any]]) -> None:
-    if not rows:
-        return
-    cols = ["doc_id", "unit_ref", "measures", "unit_hash"]
+# staging の upsert 句（execute_values 版と COPY 版で共有）
+# DO UPDATE なので既存行も RETURNING で返り、登録と同時に ref → id の対応が得られる
+CONTEXT_COLUMNS: List[str] = ["doc_id", "context_ref", "context_hash", "signature_id"]
+CONTEXT_CONFLICT = """
+        ON CONFLICT (doc_id, context_ref) DO UPDATE
+        SET context_hash = EXCLUDED.context_hash,
+            signature_id = EXCLUDED.signature_id
+        RETURNING context_ref, id
+"""
+
+UNIT_COLUMNS: List[str] = ["doc_id", "unit_ref", "measures", "unit_hash"]
+UNIT_CONFLICT = """
+        ON CONFLICT (doc_id, unit_ref) DO UPDATE
+        SET measures = EXCLUDED.measures,
+            unit_hash = EXCLUDED.unit_hash
+        RETURNING unit_ref, id
+"""
+
+FACT_CONFLICT = """
+        ON CONFLICT (doc_id, fact_hash) DO UPDATE
+        SET value_numeric = EXCLUDED.value_numeric,
+            value_text = EXCLUDED.value_text,
+            unit_ref_normalized = EXCLUDED.unit_ref_normalized,
+            value_normalized = EXCLUDED.value_normalized,
+            decimals = EXCLUDED.decimals,
+            is_nil = EXCLUDED.is_nil,
+            context_id = EXCLUDED.context_id,
+            unit_id = EXCLUDED.unit_id
+"""
+
+# staging への登録方式（db.staging_write）
+STAGING_WRITE_METHODS = ("values", "copy")
+
+
+def context_values(
+    conn,
+    rows: Sequence[Dict[str, Any]],
+    pending: Optional[Dict[bytes, int]] = None,
+) -> List[Tuple[Any, ...]]:
+    """context 行を署名に登録し、CONTEXT_COLUMNS 順のタプルにする"""
+    signature_ids = upsert_context_signatures(conn, rows, pending)
+    return [
+        (r["doc_id"], r["context_ref"], r["context_hash"], signature_ids[bytes(r["context_hash"])])
+        for r in rows
+    ]
+
+
+def unit_values(rows: Sequence[Dict[str, Any]]) -> List[List[Any]]:
     values = []
     for r in rows:
         row = []
-        for c in cols:
+        for c in UNIT_COLUMNS:
             val = r.get(c)
             if c == "measures" and val is not None:
                 val = psycopg2.extras.Json(val)
             row.append(val)
         values.append(row)
-    insert_cols = ", ".join(cols)
+    return values
+
+
+def upsert_staging_contexts(
+    conn,
+    rows: Sequence[Dict[str, Any]],
+    pending: Optional[Dict[bytes, int]] = None,
+) -> Dict[str, int]:
+    """
+    staging.context に登録し、context_ref → staging.context.id を返す
+
+    期間・次元などの属性は core.context_signature に1回だけ保持し、
+    staging.context は (doc_id, context_ref) → signature_id の参照だけを持つ。
+    id は RETURNING で受け取り、登録後に読み直さない。
+    """
+    if not rows:
+        return {}
+    values = context_values(conn, rows, pending)
+    insert_cols = ", ".join(CONTEXT_COLUMNS)
     sql = f"""
-        INSERT INTO staging.unit ({insert_cols})
+        INSERT INTO staging.context ({insert_cols})
         VALUES %s
-        ON CONFLICT (doc_id, unit_ref) DO UPDATE
-        SET measures = EXCLUDED.measures,
-            unit_hash = EXCLUDED.unit_hash
+        {CONTEXT_CONFLICT}
     """
     with conn.cursor() as cur:
-        psycopg2.extras.execute_values(cur, sql, values, page_size=500)
-    conn.commit()
+        return dict(psycopg2.extras.execute_values(cur, sql, values, page_size=500, fetch=True))
 
 
-def load_context_map(conn, doc_id: str, refs: Sequence[str]) -> Dict[str, int]:
-    if not refs:
+def upsert_staging_units(conn, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """staging.unit に登録し、unit_ref → staging.unit.id を返す（RETURNING）"""
+    if not rows:
         return {}
-    sql = """
-        SELECT context_ref, id
-        FROM staging.context
-        WHERE doc_id = %s AND context_ref = ANY(%s)
+    insert_cols = ", ".join(UNIT_COLUMNS)
+    sql = f"""
+        INSERT INTO staging.unit ({insert_cols})
+        VALUES %s
+        {UNIT_CONFLICT}
     """
+    values = unit_values(rows)
     with conn.cursor() as cur:
-        cur.execute(sql, (doc_id, list(refs)))
-        return {r[0]: r[1] for r in cur.fetchall()}
+        return dict(psycopg2.extras.execute_values(cur, sql, values, page_size=500, fetch=True))
 
 
-def load_unit_map(conn, doc_id: str, refs: Sequence[str]) -> Dict[str, int]:
-    if not refs:
-        return {}
-    sql = """
-        SELECT unit_ref, id
-        FROM staging.unit
-        WHERE doc_id = %s AND unit_ref = ANY(%s)
+def upsert_staging_facts(conn, rows: FactBatch | Sequence[Dict[str, Any]]) -> int:
     """
-    with conn.cursor() as cur:
-        cur.execute(sql, (doc_id, list(refs)))
-        return {r[0]: r[1] for r in cur.fetchall()}
+    staging.fact に登録する
 
-
-def upsert_staging_facts(conn, rows: Sequence[Dict[str, Any]]) -> int:
-    if not rows:
+    Args:
+        rows: FactBatch（列指向, parse_xbrl）または行 dict のリスト
+    """
+    if not len(rows):
         return 0
-    cols = [
-        "doc_id",
-        "concept_qname",
-        "concept_namespace",
-        "concept_name",
-        "context_id",
-        "unit_id",
-        "value_numeric",
-        "value_text",
-        "unit_ref_normalized",  # Issue #3: Unit正規化
-        "value_normalized",      # Issue #3: Unit正規化
-        "decimals",
-        "is_nil",
-        "fact_hash",
-    ]
-    values = [[r.get(c) for c in cols] for r in rows]
+    cols = list(FACT_COLUMNS)
+    values = fact_values(rows)
     insert_cols = ", ".join(cols)
     sql = f"""
         INSERT INTO staging.fact ({insert_cols})
         VALUES %s
-        ON CONFLICT (doc_id, fact_hash) DO UPDATE
-        SET value_numeric = EXCLUDED.value_numeric,
-            value_text = EXCLUDED.value_text,
-            unit_ref_normalized = EXCLUDED.unit_ref_normalized,
-            value_normalized = EXCLUDED.value_normalized,
-            decimals = EXCLUDED.decimals,
-            is_nil = EXCLUDED.is_nil,
-            context_id = EXCLUDED.context_id,
-            unit_id = EXCLUDED.unit_id
+        {FACT_CONFLICT}
     """
     with conn.cursor() as cur:
         psycopg2.extras.execute_values(cur, sql, values, page_size=500)
-    conn.commit()
     return len(rows)
 
 
+def fact_values(rows: FactBatch | Sequence[Dict[str, Any]]) -> Iterable[Sequence[Any]]:
+    if isinstance(rows, FactBatch):
+        return rows.rows()
+    return [[r.get(c) for c in FACT_COLUMNS] for r in rows]
+
+
+def copy_staging_contexts(
+    conn,
+    rows: Sequence[Dict[str, Any]],
+    pending: Optional[Dict[bytes, int]] = None,
+) -> Dict[str, int]:
+    """upsert_staging_contexts の COPY 版（署名の登録は共通）"""
+    if not rows:
+        return {}
+    values = context_values(conn, rows, pending)
+    return dict(copy_merge(conn, "staging.context", CONTEXT_COLUMNS, values, CONTEXT_CONFLICT))
+
+
+def copy_staging_units(conn, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """upsert_staging_units の COPY 版"""
+    if not rows:
+        return {}
+    return dict(copy_merge(conn, "staging.unit", UNIT_COLUMNS, unit_values(rows), UNIT_CONFLICT))
+
+
+def copy_staging_facts(conn, rows: FactBatch | Sequence[Dict[str, Any]]) -> int:
+    """upsert_staging_facts の COPY 版（一時テーブルへ COPY → 1文で upsert）"""
+    if not len(rows):
+        return 0
+    copy_merge(conn, "staging.fact", FACT_COLUMNS, fact_values(rows), FACT_CONFLICT)
+    return len(rows)
+
+
+def staging_writers(method: str = "values") -> Dict[str, Any]:
+    """
+    db.staging_write に応じた staging 登録関数を返す（いずれもコミットしない。StagingTransaction から使う）
+
+    - "values": execute_values + ON CONFLICT（従来。COPY が使えない環境のフォールバック）
+    - "copy": 一時テーブルへ COPY → 集合演算の upsert
+    """
+    if method not in STAGING_WRITE_METHODS:
+        raise ValueError(f"unknown staging write method: {method} (expected one of {STAGING_WRITE_METHODS})")
+    if method == "copy":
+        return {"contexts": copy_staging_contexts, "units": copy_staging_units, "facts": copy_staging_facts}
+    return {"contexts": upsert_staging_contexts, "units": upsert_staging_units, "facts": upsert_staging_facts}
+
+
+class StagingTransaction:
+    """
+    1書類分の staging 登録を1トランザクションで行う（unit of work）
+
+        with StagingTransaction(conn, "copy") as tx:
+            context_map = tx.contexts(parsed["contexts"])
+            unit_map = tx.units(parsed["units"])
+            tx.facts(build_fact_batch(doc_id, parsed["facts"], context_map, unit_map))
+            tx.set_status(doc_id, "parsed")
+
+    staging の upsert 関数はコミットしない。ブロックを抜けると commit、例外なら rollback し、
+    途中で落ちても書類が半端に登録された状態を残さない。接続は呼び出し側が再利用する。
+    """
+
+    def __init__(self, conn, method: str = "values"):
+        self.conn = conn
+        self.writers = staging_writers(method)
+        # このトランザクションで登録した context 署名（コミット後に _signature_ids へ反映）
+        self.signature_ids: Dict[bytes, int] = {}
+
+    def __enter__(self) -> "StagingTransaction":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.conn.commit()
+            _signature_ids.update(self.signature_ids)
+        else:
+            if not self.conn.closed:
+                self.conn.rollback()
+            if isinstance(exc, psycopg2.errors.ForeignKeyViolation):
+                # メモの signature_id が削除済み（署名の掃除と並行した）。次の書類は DB から引き直す
+                clear_signature_memo()
+        self.signature_ids = {}
+        return False
+
+    def contexts(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """context_ref → staging.context.id を返す"""
+        return self.writers["contexts"](self.conn, rows, self.signature_ids)
+
+    def units(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """unit_ref → staging.unit.id を返す"""
+        return self.writers["units"](self.conn, rows)
+
+    def concept_hierarchy(self, rows: Sequence[Dict[str, Any]]) -> int:
+        return upsert_staging_concept_hierarchy(self.conn, rows)
+
+    def facts(self, rows: FactBatch | Sequence[Dict[str, Any]]) -> int:
+        return self.writers["facts"](self.conn, rows)
+
+    def set_status(self, doc_id: str, status: str) -> None:
+        update_document_status(self.conn, doc_id, status, commit=False)
+
+
 def upsert_staging_concept_hierarchy(conn, rows: Sequence[Dict[str, Any]]) -> int:
     """
     Issue #2: Concept階層構造を staging.concept_hierarchy テーブルに保存
@@ -260,5 +782,152 @@ def upsert_staging_concept_hierarchy(conn, rows: Sequence[Dict[str, Any]]) -> in
     """
     with conn.cursor() as cur:
         psycopg2.extras.execute_values(cur, sql, values, page_size=500)
-    conn.commit()
     return len(rows)
+
+
+def load_doclist_checkpoints(conn, dates: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """raw.edinet_doclist_checkpoint から日付ごとのチェックポイントを取得"""
+    if not dates:
+        return {}
+    sql = """
+        SELECT list_date, sha256, result_count, doclist_path, fetched_at
+        FROM raw.edinet_doclist_checkpoint
+        WHERE list_date = ANY(%s::date[])
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (list(dates),))
+        return {
+            r[0].strftime("%Y-%m-%d"): {
+                "sha256": r[1],
+                "result_count": r[2],
+                "doclist_path": r[3],
+                "fetched_at": r[4],
+            }
+            for r in cur.fetchall()
+        }
+
+
+def upsert_doclist_checkpoint(
+    conn,
+    list_date: str,
+    sha256: str,
+    result_count: int,
+    doclist_path: str | None = None,
+    commit: bool = True,
+) -> None:
+    """チェックポイントを記録（内容が変わった場合のみ changed_at を更新）"""
+    sql = """
+        INSERT INTO raw.edinet_doclist_checkpoint (list_date, sha256, result_count, doclist_path)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (list_date) DO UPDATE
+        SET sha256 = EXCLUDED.sha256,
+            result_count = EXCLUDED.result_count,
+            doclist_path = EXCLUDED.doclist_path,
+            fetched_at = NOW(),
+            changed_at = CASE
+                WHEN raw.edinet_doclist_checkpoint.sha256 = EXCLUDED.sha256
+                THEN raw.edinet_doclist_checkpoint.changed_at
+                ELSE NOW()
+            END
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (list_date, sha256, result_count, doclist_path))
+    if commit:
+        conn.commit()
+
+
+def select_doc_ids_by_status(conn, status: str, limit: int | None = None) -> List[str]:
+    """
+    fetch_status が status の doc_id を提出日順に取得（parse/core の未処理分の再開用）
+
+    qc_failed / parse_failed の書類は失敗のたびに終端状態へ移すため、未処理分には含まれない。
+    """
+    sql = """
+        SELECT doc_id
+        FROM raw.edinet_document
+        WHERE fetch_status = %s
+        ORDER BY submission_date ASC, doc_id ASC
+        LIMIT %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (status, limit))
+        return [r[0] for r in cur.fetchall()]
+
+
+def relocate_doclist_file(
+    conn,
+    old_path: str,
+    new_path: str,
+    size_bytes: int,
+    sha256: str,
+    commit: bool = True,
+) -> int:
+    """
+    doclist ファイルの移動（形式変換）を DB に反映する
+
+    raw.edinet_doclist_file / raw.edinet_document.doclist_json_path /
+    raw.edinet_file（file_type = 'doclist_json'）/ raw.edinet_doclist_checkpoint の
+    パス・サイズ・ハッシュを1トランザクションで更新する。
+
+    Returns:
+        doclist_json_path を更新した書類数
+    """
+    params = {"old": old_path, "new": new_path, "size": size_bytes, "sha": sha256}
+    with conn.cursor() as cur:
+        # 途中で中断した再実行などで new_path が既に登録されている場合は old 側を正とする
+        cur.execute(
+            """
+            DELETE FROM raw.edinet_doclist_file
+            WHERE path = %(new)s
+              AND EXISTS (SELECT 1 FROM raw.edinet_doclist_file WHERE path = %(old)s)
+            """,
+            params,
+        )
+        cur.execute(
+            """
+            UPDATE raw.edinet_doclist_file
+            SET path = %(new)s, size_bytes = %(size)s, sha256 = %(sha)s, updated_at = NOW()
+            WHERE path = %(old)s
+            """,
+            params,
+        )
+        cur.execute(
+            """
+            DELETE FROM raw.edinet_file f
+            WHERE f.file_type = 'doclist_json'
+              AND f.path = %(new)s
+              AND EXISTS (
+                  SELECT 1 FROM raw.edinet_file o
+                  WHERE o.doc_id = f.doc_id AND o.file_type = 'doclist_json' AND o.path = %(old)s
+              )
+            """,
+            params,
+        )
+        cur.execute(
+            """
+            UPDATE raw.edinet_file
+            SET path = %(new)s, size_bytes = %(size)s, sha256 = %(sha)s
+            WHERE file_type = 'doclist_json' AND path = %(old)s
+            """,
+            params,
+        )
+        cur.execute(
+            """
+            UPDATE raw.edinet_doclist_checkpoint
+            SET doclist_path = %(new)s, sha256 = %(sha)s
+            WHERE doclist_path = %(old)s
+            """,
+            params,
+        )
+        cur.execute(
+            """
+            UPDATE raw.edinet_document
+            SET doclist_json_path = %(new)s
+            WHERE doclist_json_path = %(old)s
+            """,
+            params,
+        )
+        moved = cur.rowcount
+    if commit:
+        conn.commit()
+    return moved
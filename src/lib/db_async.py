@@ -0,0 +1,106 @@
+"""
+DB Async: psycopg 3 の非同期接続（パイプラインモード・バイナリ COPY）
+
+psycopg2 では1文ごとに結果を待つため、1書類の core 取込（company / document / concept /
+context / unit の upsert と読み出し）は文の数だけ往復する。db.backend: psycopg のとき、
+load_core はこのモジュールの接続を使い、互いの結果を待たない文をパイプラインで1回の往復にまとめる。
+
+- psycopg 3 は任意依存（pip install "psycopg[binary]"）。使うときに初めて import する
+- 接続は autocommit で開き、書類ごとに conn.transaction() で囲む
+- db.prepare: true なら初回の実行から準備済み文にする（prepare_threshold=0）
+- AsyncConnectionPool は asyncio のパイプライン実行（edinet.pipeline の core ステージ）用
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+
+BACKENDS = ("psycopg2", "psycopg")
+
+
+def check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown db.backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def _psycopg() -> Any:
+    try:
+        import psycopg  # type: ignore
+    except Exception as exc:
+        raise RuntimeError('psycopg 3 is not installed. Install "psycopg[binary]" or set db.backend: psycopg2.') from exc
+    return psycopg
+
+
+async def get_async_conn(db_cfg: Dict[str, Any]):
+    psycopg = _psycopg()
+    conn = await psycopg.AsyncConnection.connect(
+        host=db_cfg.get("host"),
+        port=db_cfg.get("port"),
+        dbname=db_cfg.get("name"),
+        user=db_cfg.get("user"),
+        password=db_cfg.get("password"),
+        autocommit=True,
+    )
+    conn.prepare_threshold = 0 if db_cfg.get("prepare", True) else None
+    return conn
+
+
+def is_broken(conn) -> bool:
+    return bool(conn.closed or getattr(conn, "broken", False))
+
+
+class AsyncConnectionPool:
+    """
+    asyncio 用の小さな接続プール（同時に max_size 本まで。接続は必要になってから開く）
+
+    返却時に閉じた・壊れた接続は捨て、トランザクションが残っていれば rollback する。
+    """
+
+    def __init__(self, db_cfg: Dict[str, Any], max_size: int = 4):
+        self.db_cfg = db_cfg
+        self.max_size = max(1, max_size)
+        self._idle: List[Any] = []
+        self._sem = asyncio.Semaphore(self.max_size)
+        self._closed = False
+
+    async def _connect(self):
+        return await get_async_conn(self.db_cfg)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """async with pool.connection() as conn: ..."""
+        async with self._sem:
+            if self._closed:
+                raise RuntimeError("connection pool is closed")
+            conn = None
+            while self._idle and conn is None:
+                idle = self._idle.pop()
+                if not is_broken(idle):
+                    conn = idle
+            if conn is None:
+                conn = await self._connect()
+            try:
+                yield conn
+            finally:
+                await self._release(conn)
+
+    async def _release(self, conn) -> None:
+        if not is_broken(conn) and conn.info.transaction_status != 0:  # 0: TransactionStatus.IDLE
+            try:
+                await conn.rollback()
+            except Exception:
+                await conn.close()
+        if is_broken(conn) or self._closed:
+            await conn.close()
+            return
+        self._idle.append(conn)
+
+    async def close(self) -> None:
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
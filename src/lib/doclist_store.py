@@ -0,0 +1,104 @@
+"""
+Doclist Store: 書類一覧（doclist）スナップショットの保存形式と読み込み
+
+raw_root/YYYY/MM/DD/ 配下に1日1ファイルで保存する。形式は paths.doclist_format で選択する。
+
+- "json"     : doclist.json（indent=2, 非圧縮）… 従来形式
+- "json.gz"  : doclist.json.gz（インデントなし + gzip）
+- "json.zst" : doclist.json.zst（インデントなし + zstd, zstandard パッケージが必要）
+
+圧縮形式はヘッダのタイムスタンプを固定しているため、同じ内容なら同じバイト列（= 同じ SHA-256）になる。
+読み込み側は read_doclist() / find_doclist() を使えば形式を意識しなくてよい。
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+DOCLIST_FORMATS: Dict[str, str] = {
+    "json": "doclist.json",
+    "json.gz": "doclist.json.gz",
+    "json.zst": "doclist.json.zst",
+}
+DEFAULT_FORMAT = "json"
+
+
+def _zstd():
+    try:
+        import zstandard  # type: ignore
+    except Exception as exc:
+        raise RuntimeError("zstandard is not installed. Install zstandard to use doclist_format=json.zst.") from exc
+    return zstandard
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in DOCLIST_FORMATS:
+        raise ValueError(f"unknown doclist format: {fmt} (expected one of {sorted(DOCLIST_FORMATS)})")
+    if fmt == "json.zst":
+        _zstd()
+    return fmt
+
+
+def format_of(path: Path) -> str:
+    for fmt, name in DOCLIST_FORMATS.items():
+        if path.name == name:
+            return fmt
+    raise ValueError(f"not a doclist file: {path}")
+
+
+def doclist_path(raw_root: Path, date_str: str, fmt: str = DEFAULT_FORMAT) -> Path:
+    date = datetime.strptime(date_str, "%Y-%m-%d")
+    return raw_root / f"{date:%Y/%m/%d}" / DOCLIST_FORMATS[fmt]
+
+
+def render_doclist(doclist: Dict[str, Any], fmt: str = DEFAULT_FORMAT) -> bytes:
+    """保存するバイト列を生成（このバイト列の SHA-256 が保存ファイルのハッシュになる）"""
+    if fmt == "json":
+        return json.dumps(doclist, ensure_ascii=False, indent=2).encode("utf-8")
+    compact = json.dumps(doclist, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "json.gz":
+        return gzip.compress(compact, compresslevel=6, mtime=0)
+    if fmt == "json.zst":
+        return _zstd().ZstdCompressor(level=10).compress(compact)
+    raise ValueError(f"unknown doclist format: {fmt}")
+
+
+def decode_doclist(data: bytes, fmt: str) -> Dict[str, Any]:
+    if fmt == "json.gz":
+        data = gzip.decompress(data)
+    elif fmt == "json.zst":
+        data = _zstd().ZstdDecompressor().decompress(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def write_doclist(path: Path, data: bytes) -> Path:
+    """一時ファイル経由で atomic に書き込む"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".part")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return path
+
+
+def read_doclist(path: Path) -> Dict[str, Any]:
+    """保存形式（拡張子）を判別して doclist を読み込む"""
+    path = Path(path)
+    return decode_doclist(path.read_bytes(), format_of(path))
+
+
+def find_doclist(raw_root: Path, date_str: str, prefer: Optional[str] = None) -> Optional[Path]:
+    """指定日の doclist ファイルを形式を問わず探す（prefer の形式を優先）"""
+    order = list(DOCLIST_FORMATS)
+    if prefer in DOCLIST_FORMATS:
+        order.remove(prefer)
+        order.insert(0, prefer)
+    for fmt in order:
+        path = doclist_path(raw_root, date_str, fmt)
+        if path.exists():
+            return path
+    return None
@@ -1,28 +1,255 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import hashlib
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from lib.rate_limiter import TokenBucket
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 接続・応答待ちのエラーに加え、本文の受信中に切れた場合（ストリーミング中の ChunkedEncodingError /
+# ConnectionError）も再試行する。ダウンロードは .part を最初から書き直す
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+@dataclass
+class RequestStat:
+    """1リクエスト（1試行）の計測結果"""
+    endpoint: str
+    status: Optional[int]
+    latency_sec: float
+    attempt: int
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Retry-After ヘッダ（秒数 or HTTP-date）を待ち秒数に変換"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class EdinetClient:
+    """
+    EDINET API クライアント
+
+    - keep-alive の Session をワーカー間で共有し、TCP/TLS 接続を再利用する
+    - 429/5xx と接続エラー（本文の受信中の切断を含む）は指数バックオフ + ジッターで再試行する（Retry-After を優先）
+    - limiter を渡すと、再試行も含めた全リクエストがレート制限に従う
+    - 試行ごとのレイテンシを記録し、latency_summary() で集計できる
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        limiter: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_base_sec: float = 1.0,
+        backoff_max_sec: float = 60.0,
+        timeout_sec: float = 120.0,
+        pool_size: int = 4,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base_sec = backoff_base_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.timeout_sec = timeout_sec
+        self._sleep = sleep
+        self.stats: List[RequestStat] = []
+        self._stats_lock = threading.Lock()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    @classmethod
+    def from_config(
+        cls, edinet_cfg: Dict[str, Any], limiter: Optional[TokenBucket] = None, pool_size: int = 4
+    ) -> "EdinetClient":
+        return cls(
+            base_url=edinet_cfg["base_url"],
+            api_key=edinet_cfg["api_key"],
+            limiter=limiter,
+            max_retries=int(edinet_cfg.get("max_retries", 3)),
+            backoff_base_sec=float(edinet_cfg.get("backoff_base_sec", 1.0)),
+            backoff_max_sec=float(edinet_cfg.get("backoff_max_sec", 60.0)),
+            timeout_sec=float(edinet_cfg.get("timeout_sec", 120.0)),
+            pool_size=pool_size,
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "EdinetClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max_sec)
+        # full jitter: [0, base * 2^attempt]
+        cap = min(self.backoff_max_sec, self.backoff_base_sec * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _record(self, stat: RequestStat) -> None:
+        with self._stats_lock:
+            self.stats.append(stat)
+
+    def _request(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        handle: Callable[[requests.Response], Any],
+        stream: bool = False,
+    ) -> Any:
+        url = f"{self.base_url}{endpoint}"
+        params = dict(params, **{"Subscription-Key": self.api_key})
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            started = time.monotonic()
+            retry_after = None
+            try:
+                with self.session.get(url, params=params, timeout=self.timeout_sec, stream=stream) as resp:
+                    status = resp.status_code
+                    if status in RETRY_STATUS and attempt < self.max_retries:
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                        self._record(RequestStat(endpoint, status, time.monotonic() - started, attempt))
+                    else:
+                        resp.raise_for_status()
+                        result = handle(resp)
+                        self._record(RequestStat(endpoint, status, time.monotonic() - started, attempt))
+                        return result
+            except RETRY_EXCEPTIONS:
+                self._record(RequestStat(endpoint, None, time.monotonic() - started, attempt))
+                if attempt >= self.max_retries:
+                    raise
+            self._sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def fetch_doclist(self, date_str: str, doc_type: int = 2) -> Dict[str, Any]:
+        return self._request(
+            "/documents.json",
+            {"date": date_str, "type": doc_type},
+            lambda resp: resp.json(),
+        )
+
+    def fetch_document_zip(self, doc_id: str, doc_type: int = 1) -> bytes:
+        return self._request(
+            f"/documents/{doc_id}",
+            {"type": doc_type},
+            lambda resp: resp.content,
+        )
+
+    def download_document_zip(
+        self, doc_id: str, dest: Path, doc_type: int = 1, chunk_size: int = 1 << 16
+    ) -> Tuple[int, str]:
+        """
+        書類 ZIP をストリーミングで dest に保存する
+
+        レスポンス全体をメモリに載せず、チャンク単位で一時ファイルに書き込みながら
+        サイズと SHA-256 を計算する。完了後に一時ファイルを dest へ atomic に rename するため、
+        途中で失敗しても dest に壊れたファイルは残らない。
+        本文の受信中に接続が切れた場合は、リクエストからやり直し .part を最初から書き直す
+        （再試行の回数・バックオフは他のリクエストと同じ）。
+
+        Returns:
+            (size_bytes, sha256)
+        """
+        dest = Path(dest)
+        tmp_path = dest.with_name(dest.name + ".part")
+
+        def stream_to_file(resp: requests.Response) -> Tuple[int, str]:
+            h = hashlib.sha256()
+            size = 0
+            try:
+                with tmp_path.open("wb") as f:
+                    for chunk in resp.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        h.update(chunk)
+                        size += len(chunk)
+                os.replace(tmp_path, dest)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            return size, h.hexdigest()
+
+        return self._request(f"/documents/{doc_id}", {"type": doc_type}, stream_to_file, stream=True)
+
+    def latency_summary(self) -> Dict[str, Any]:
+        """試行ごとのレイテンシ集計（レート制限のチューニング用）"""
+        with self._stats_lock:
+            stats = list(self.stats)
+        if not stats:
+            return {"requests": 0}
+        latencies = sorted(s.latency_sec for s in stats)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "requests": len(stats),
+            "retries": sum(1 for s in stats if s.attempt > 0),
+            "errors": sum(1 for s in stats if s.status is None or s.status >= 400),
+            "latency_mean_sec": round(sum(latencies) / len(latencies), 3),
+            "latency_p50_sec": pct(0.5),
+            "latency_p95_sec": pct(0.95),
+            "latency_max_sec": round(latencies[-1], 3),
+        }
 
 
 def fetch_doclist(base_url: str, api_key: str, date_str: str, doc_type: int = 2) -> Dict[str, Any]:
-    url = f"{base_url}/documents.json"
-    params = {
-        "date": date_str,
-        "type": doc_type,
-        "Subscription-Key": api_key,
-    }
-    resp = requests.get(url, params=params, timeout=60)
-    resp.raise_for_status()
-    return resp.json()
+    with EdinetClient(base_url, api_key) as client:
+        return client.fetch_doclist(date_str, doc_type=doc_type)
 
 
 def fetch_document_zip(base_url: str, api_key: str, doc_id: str, doc_type: int = 1) -> bytes:
-    url = f"{base_url}/documents/{doc_id}"
-    params = {
-        "type": doc_type,
-        "Subscription-Key": api_key,
-    }
-    resp = requests.get(url, params=params, timeout=120)
-    resp.raise_for_status()
-    return resp.content
+    with EdinetClient(base_url, api_key) as client:
+        return client.fetch_document_zip(doc_id, doc_type=doc_type)
+
+
+def download_document_zip(
+    base_url: str,
+    api_key: str,
+    doc_id: str,
+    dest: Path,
+    doc_type: int = 1,
+    chunk_size: int = 1 << 16,
+) -> Tuple[int, str]:
+    with EdinetClient(base_url, api_key) as client:
+        return client.download_document_zip(doc_id, dest, doc_type=doc_type, chunk_size=chunk_size)
@@ -0,0 +1,128 @@
+"""
+Fact Batch: staging.fact に登録するファクトの列指向バッチ
+
+1ファクト = 1 dict（13キー）で保持すると、数万ファクトの書類では dict の生成と
+DB 登録時のリスト変換がパース後の CPU・メモリの大半を占める。
+FactBatch は列ごとのリストで保持し、重複排除（concept, context, unit）もインデックスで行う。
+
+- パーサーの出力は RawFact（NamedTuple）で、dict は作らない
+- DB 登録は rows() のタプルをそのまま execute_values に渡す
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# staging.fact の列順（upsert_staging_facts と共有）
+FACT_COLUMNS: Tuple[str, ...] = (
+    "doc_id",
+    "concept_qname",
+    "concept_namespace",
+    "concept_name",
+    "context_id",
+    "unit_id",
+    "value_numeric",
+    "value_text",
+    "unit_ref_normalized",  # Issue #3: Unit正規化
+    "value_normalized",      # Issue #3: Unit正規化
+    "decimals",
+    "is_nil",
+    "fact_hash",
+)
+
+
+class RawFact(NamedTuple):
+    """パーサー（Arelle / iterparse）が出力する1ファクト"""
+    concept_qname: str
+    concept_namespace: Optional[str]
+    concept_name: str
+    context_ref: Optional[str]
+    unit_ref: str
+    is_nil: bool
+    is_numeric: bool
+    x_value: Any
+    value: Optional[str]
+    decimals: Optional[str]
+
+
+FactKey = Tuple[str, str, str]
+
+
+class FactBatch:
+    """1書類分の staging.fact 行（列指向）"""
+
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        # doc_id 以外の列
+        self.columns: Dict[str, List[Any]] = {c: [] for c in FACT_COLUMNS[1:]}
+        self._index: Dict[FactKey, int] = {}
+        self.dup_count = 0
+        self.conflict_count = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def find(self, key: FactKey) -> Optional[int]:
+        """(concept_qname, context_ref, unit_ref) が登録済みなら行番号を返す"""
+        return self._index.get(key)
+
+    def append(
+        self,
+        key: FactKey,
+        concept_qname: str,
+        concept_namespace: Optional[str],
+        concept_name: str,
+        context_id: int,
+        unit_id: Optional[int],
+        value_numeric: Optional[Decimal],
+        value_text: Optional[str],
+        unit_ref_normalized: Optional[str],
+        value_normalized: Optional[Decimal],
+        decimals: Optional[str],
+        is_nil: bool,
+        fact_hash: bytes,
+    ) -> int:
+        """新しい行を追加して行番号を返す（重複チェックは find で呼び出し側が行う）"""
+        cols = self.columns
+        cols["concept_qname"].append(concept_qname)
+        cols["concept_namespace"].append(concept_namespace)
+        cols["concept_name"].append(concept_name)
+        cols["context_id"].append(context_id)
+        cols["unit_id"].append(unit_id)
+        cols["value_numeric"].append(value_numeric)
+        cols["value_text"].append(value_text)
+        cols["unit_ref_normalized"].append(unit_ref_normalized)
+        cols["value_normalized"].append(value_normalized)
+        cols["decimals"].append(decimals)
+        cols["is_nil"].append(is_nil)
+        cols["fact_hash"].append(fact_hash)
+        i = len(self._index)
+        self._index[key] = i
+        return i
+
+    def record_duplicate(
+        self,
+        i: int,
+        value_numeric: Optional[Decimal],
+        value_text: Optional[str],
+        decimals: Optional[str],
+        is_nil: bool,
+    ) -> None:
+        """重複ファクトを数える（先勝ち。値が食い違えば conflict として数える）"""
+        self.dup_count += 1
+        cols = self.columns
+        if (
+            cols["value_numeric"][i] != value_numeric
+            or cols["value_text"][i] != value_text
+            or cols["decimals"][i] != decimals
+            or cols["is_nil"][i] != is_nil
+        ):
+            self.conflict_count += 1
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """FACT_COLUMNS 順のタプルを返す（DB 登録用）"""
+        cols = self.columns
+        return zip(repeat(self.doc_id, len(self)), *(cols[c] for c in FACT_COLUMNS[1:]))
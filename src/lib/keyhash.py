@@ -0,0 +1,34 @@
+"""
+Key Hash: fact_hash / context_hash / unit_hash のバージョン付きバイナリキー
+
+従来は SHA-256 の16進文字列（CHAR(64)）だったが、一意インデックスが大きくなるため
+先頭1バイトにバージョンを持つ BYTEA に変更した。
+
+- v1: 0x01 + SHA-256（32バイト）… 移行前の16進値をそのまま変換したもの（再計算不要）
+- v2: 0x02 + MD5（16バイト）    … 現行。PostgreSQL の md5() でも同じ値を計算できる
+
+キーの元になる文字列（例: "doc_id|concept_qname|context_ref|unit_ref"）は従来と同じ。
+暗号学的な強度は不要で、衝突しにくい短いキーであればよい。MD5 はキーが短く（17バイト）、
+移行 SQL でも md5() で同じ値を計算できるため選んだ（ハッシュ計算の速度は比較していない）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+
+V2 = b"\x02"
+
+
+def key_hash(text: str) -> bytes:
+    """現行バージョン（v2）のキー"""
+    return V2 + hashlib.md5(text.encode("utf-8"), usedforsecurity=False).digest()
+
+
+def join_key(*parts: str) -> str:
+    """キーの元文字列（parse / staging / core で共通の形式）"""
+    return "|".join(parts)
+
+
+def fact_key_hash(doc_id: str, concept_qname: str, context_ref: str, unit_ref: str) -> bytes:
+    return key_hash(join_key(doc_id, concept_qname, context_ref, unit_ref))
@@ -1,15 +1,127 @@
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, TextIO
 
 
 def ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
+class JsonlLogger:
+    """
+    バッファ付き JSONL ロガー
+
+    - レコードはメモリにバッファし、バックグラウンドスレッドがまとめて書き込む
+    - flush のきっかけ: バッファ件数が max_buffered に達した / flush_interval_sec 経過 / close()
+    - ファイルハンドルはパスごとに開いたまま再利用する（max_open_files を超えたら古いものから閉じる）
+    - レコードの形式は従来の log_jsonl と同じ（1行1JSON, ensure_ascii=True）
+    - fork した子プロセスでは同期書き込みに切り替える（子は os._exit で終わり atexit の flush が走らないため）
+    """
+
+    def __init__(
+        self,
+        flush_interval_sec: float = 1.0,
+        max_buffered: int = 1000,
+        max_open_files: int = 32,
+    ):
+        self.flush_interval_sec = flush_interval_sec
+        self.max_buffered = max_buffered
+        self.max_open_files = max_open_files
+        self._init_state()
+
+    def _init_state(self, sync: bool = False) -> None:
+        self._sync = sync
+        self._buffers: Dict[Path, List[str]] = {}
+        self._buffered = 0
+        self._handles: "OrderedDict[Path, TextIO]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _reset_after_fork(self) -> None:
+        # 子プロセスには親のバッファ・ハンドル・スレッドを引き継がない（二重書き込み防止）
+        # fork 子は os._exit で終わることがあり、バッファに残ったレコードが失われるため1件ずつ書く
+        self._init_state(sync=True)
+
+    def log(self, path: Path, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=True) + "\n"
+        if self._sync:
+            with self._flush_lock:
+                f = self._handle(Path(path))
+                f.write(line)
+                f.flush()
+            return
+        with self._lock:
+            self._buffers.setdefault(Path(path), []).append(line)
+            self._buffered += 1
+            full = self._buffered >= self.max_buffered
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="jsonl-logger", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            self.flush()
+
+    def _handle(self, path: Path) -> TextIO:
+        f = self._handles.get(path)
+        if f is not None:
+            self._handles.move_to_end(path)
+            return f
+        ensure_parent(path)
+        f = path.open("a", encoding="utf-8")
+        self._handles[path] = f
+        while len(self._handles) > self.max_open_files:
+            _, old = self._handles.popitem(last=False)
+            old.close()
+        return f
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers, self._buffered = self._buffers, {}, 0
+            for path, lines in buffers.items():
+                f = self._handle(path)
+                f.write("".join(lines))
+                f.flush()
+
+    def close(self) -> None:
+        """バックグラウンドスレッドを止め、残りを書き込んでハンドルを閉じる"""
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+        with self._flush_lock:
+            for f in self._handles.values():
+                f.close()
+            self._handles.clear()
+
+
+_default_logger = JsonlLogger()
+atexit.register(_default_logger.close)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default_logger._reset_after_fork)
+
+
 def log_jsonl(path: Path, record: Dict[str, Any]) -> None:
-    ensure_parent(path)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=True) + "\n")
+    _default_logger.log(path, record)
+
+
+def flush_logs() -> None:
+    """バッファ済みのログを即時に書き込む"""
+    _default_logger.flush()
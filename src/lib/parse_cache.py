@@ -0,0 +1,125 @@
+"""
+Parse Cache: document.zip の SHA-256 をキーにした解析結果のローカルキャッシュ
+
+マッパー・正規化の変更や staging の作り直しのたびに同じ ZIP を Arelle で再解析していた。
+解析結果（contexts / units / facts / concept_hierarchy）を ZIP の SHA-256 + エンジン + パーサーバージョンを
+キーにファイルへ保存し、再ステージング時は ZIP も Arelle も開かずに読み出す。
+
+- ファイル形式: 列ごとのリストにした dict を pickle（protocol 5）し zlib で圧縮したもの
+  （先頭にマジックとフォーマット番号を持つ）。ローカルで作成したファイルのみを読む前提
+- doc_id は保存せず、読み出し時に呼び出し側の doc_id を入れる
+- 解析結果の形式・内容が変わる修正をしたら parse_xbrl.PARSER_VERSION を上げる（古いキャッシュは使われなくなる）
+- 書き込みは一時ファイル → rename で行い、並列ワーカーが同じキーを書いても壊れない
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+MAGIC = b"EDPC"
+FORMAT_VERSION = 1
+SUFFIX = ".pcache"
+
+# 列指向で保存する行 dict のリスト（doc_id 列は保存しない）
+ROW_SECTIONS = ("contexts", "units", "concept_hierarchy")
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def to_columns(rows: Sequence[Dict[str, Any]], drop: Sequence[str] = ()) -> Dict[str, List[Any]]:
+    """行 dict のリストを列ごとのリストにする（全行が同じキーを持つ前提）"""
+    if not rows:
+        return {}
+    keys = [k for k in rows[0] if k not in drop]
+    return {k: [r.get(k) for r in rows] for k in keys}
+
+
+def from_columns(columns: Dict[str, List[Any]], **fixed: Any) -> List[Dict[str, Any]]:
+    """to_columns の逆。fixed の列（doc_id など）を全行に付ける"""
+    if not columns:
+        return []
+    keys = list(columns)
+    return [
+        {**fixed, **dict(zip(keys, values))}
+        for values in zip(*(columns[k] for k in keys))
+    ]
+
+
+def encode(parsed: Dict[str, Any], fact_fields: Sequence[str], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """parse_instance の戻り値をキャッシュファイルの内容にする"""
+    facts = parsed.get("facts") or []
+    body: Dict[str, Any] = {
+        "meta": meta or {},
+        "facts": {f: [getattr(x, f) for x in facts] for f in fact_fields},
+        "fact_count": len(facts),
+    }
+    for section in ROW_SECTIONS:
+        body[section] = to_columns(parsed.get(section) or [], drop=("doc_id",))
+    payload = zlib.compress(pickle.dumps(body, protocol=5), 6)
+    return MAGIC + bytes([FORMAT_VERSION]) + payload
+
+
+def decode(data: bytes, doc_id: str, fact_factory: Callable[..., Any]) -> Dict[str, Any]:
+    """encode の逆。facts は fact_factory（RawFact）で復元する"""
+    if data[:4] != MAGIC or data[4] != FORMAT_VERSION:
+        raise ValueError("not a parse cache file (or unsupported format)")
+    body = pickle.loads(zlib.decompress(data[5:]))
+    columns = body["facts"]
+    fields = list(columns)
+    facts = [fact_factory(*values) for values in zip(*(columns[f] for f in fields))]
+    if len(facts) != body["fact_count"]:
+        raise ValueError("parse cache file is truncated")
+    parsed: Dict[str, Any] = {"facts": facts, "meta": body.get("meta", {})}
+    for section in ROW_SECTIONS:
+        parsed[section] = from_columns(body.get(section) or {}, doc_id=doc_id)
+    return parsed
+
+
+class ParseCache:
+    """<cache_dir>/<sha256 先頭2文字>/<sha256>.<engine>.v<parser_version>.pcache"""
+
+    def __init__(self, cache_dir: Path, parser_version: int):
+        self.cache_dir = Path(cache_dir)
+        self.parser_version = parser_version
+
+    @classmethod
+    def from_config(cls, parse_cfg: Optional[Dict[str, Any]], parser_version: int) -> Optional["ParseCache"]:
+        """parse.cache_dir が未設定なら None（キャッシュを使わない）"""
+        cache_dir = (parse_cfg or {}).get("cache_dir")
+        return cls(Path(cache_dir), parser_version) if cache_dir else None
+
+    def path_for(self, zip_sha256: str, engine: str) -> Path:
+        name = f"{zip_sha256}.{engine}.v{self.parser_version}{SUFFIX}"
+        return self.cache_dir / zip_sha256[:2] / name
+
+    def get(self, zip_sha256: str, engine: str) -> Optional[bytes]:
+        try:
+            return self.path_for(zip_sha256, engine).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, zip_sha256: str, engine: str, data: bytes) -> Path:
+        path = self.path_for(zip_sha256, engine)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return path
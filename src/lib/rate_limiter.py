@@ -0,0 +1,99 @@
+"""
+Rate Limiter: EDINET API 呼び出し用の共有トークンバケット
+
+複数ワーカー（スレッド）から同時に EDINET API を呼び出す場合でも、
+設定された rate_limit_sec を全体で守るためのリミッターです。
+
+- トークンは rate_per_sec の速度で補充され、capacity を上限に蓄積される
+- acquire() はトークンを「予約」してから待機するため、待ち順は概ね FIFO になる
+- capacity=1 の場合、従来の「呼び出し間隔 rate_limit_sec」と同じ挙動になる
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(
+        self,
+        rate_per_sec: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            rate_per_sec: 1秒あたりのトークン補充量
+            capacity: バースト上限（初期状態は満タン）
+            clock: 単調増加する時計（テスト用に差し替え可能）
+            sleep: 待機関数（テスト用に差し替え可能）
+        """
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.rate_per_sec = float(rate_per_sec)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_interval(cls, interval_sec: float, burst: float = 1.0, **kwargs) -> "TokenBucket":
+        """rate_limit_sec（呼び出し間隔）からリミッターを生成"""
+        if interval_sec <= 0:
+            # 間隔 0 は実質無制限として扱う
+            return cls(rate_per_sec=1e9, capacity=max(burst, 1.0), **kwargs)
+        return cls(rate_per_sec=1.0 / interval_sec, capacity=burst, **kwargs)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_sec)
+            self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        トークンを予約し、実行可能になるまでの待ち時間（秒）を返す
+
+        残高が負になることを許容し、後続の呼び出しはその分だけ長く待つ。
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_sec
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        待機せずにトークンの取得を試みる
+
+        Returns:
+            0.0 なら取得成功。正の値なら取得できず、その秒数後に再試行可能（トークンは消費しない）
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate_per_sec
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        トークンを取得する（必要なら待機する）
+
+        Returns:
+            実際に待機した秒数
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
@@ -0,0 +1,134 @@
+"""
+Unit Tests for ArelleSession (lib.arelle_session)
+
+常駐コントローラの使い回しと作り直しを、疑似コントローラで検証します：
+  1. 複数書類でコントローラは1回だけ生成される
+  2. 書類ごとに ModelXbrl が close される（例外時も）
+  3. max_documents 件ごとにコントローラを作り直す
+  4. taxonomy_cache_dir / offline が webCache に設定される（空のキャッシュで offline ならエラー）
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lib.arelle_session import ArelleSession
+
+
+class FakeModel:
+    def __init__(self, path):
+        self.path = path
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeManager:
+    def __init__(self):
+        self.loaded = []
+
+    def load(self, path):
+        model = FakeModel(path)
+        self.loaded.append(model)
+        return model
+
+
+class FakeWebCache:
+    cacheDir = "/default/cache"
+    workOffline = False
+
+
+class FakeController:
+    created = 0
+
+    def __init__(self):
+        FakeController.created += 1
+        self.modelManager = FakeManager()
+        self.webCache = FakeWebCache()
+        self.closed = False
+
+    def close(self, saveConfig=False):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    FakeController.created = 0
+
+
+class TestControllerReuse:
+    """コントローラの使い回し"""
+
+    def test_controller_is_created_once(self):
+        session = ArelleSession(max_documents=0, controller_factory=FakeController)
+        for i in range(5):
+            with session.open(Path(f"doc{i}.xbrl")) as model:
+                assert not model.closed
+        assert FakeController.created == 1
+        assert all(m.closed for m in session.controller.modelManager.loaded)
+
+    def test_model_is_closed_on_error(self):
+        session = ArelleSession(controller_factory=FakeController)
+        with pytest.raises(ValueError):
+            with session.open(Path("doc.xbrl")):
+                raise ValueError("boom")
+        assert session.controller.modelManager.loaded[0].closed
+
+
+class TestRecycle:
+    """max_documents ごとの作り直し"""
+
+    def test_controller_is_recycled(self):
+        session = ArelleSession(max_documents=2, controller_factory=FakeController)
+        controllers = []
+        for i in range(5):
+            with session.open(Path(f"doc{i}.xbrl")):
+                controllers.append(session.controller)
+
+        assert FakeController.created == 3
+        assert session.recycles == 2
+        assert controllers[0] is controllers[1] is not controllers[2]
+        assert controllers[0].closed
+
+    def test_close_releases_controller(self):
+        session = ArelleSession(controller_factory=FakeController)
+        first = session.controller
+        session.close()
+        assert first.closed
+        assert session.controller is not first
+
+
+class TestOfflineCache:
+    """ローカルタクソノミキャッシュの設定"""
+
+    def test_config_sets_web_cache(self, tmp_path):
+        (tmp_path / "cache" / "http").mkdir(parents=True)
+        parse_cfg = {"taxonomy_cache_dir": str(tmp_path / "cache"), "offline": True, "worker_max_documents": 5}
+        session = ArelleSession.from_config(parse_cfg, controller_factory=FakeController)
+        web_cache = session.controller.webCache
+        assert web_cache.cacheDir == str(tmp_path / "cache")
+        assert web_cache.workOffline is True
+        assert session.max_documents == 5
+
+    def test_offline_with_empty_cache_fails_clearly(self, tmp_path):
+        (tmp_path / "cache").mkdir()
+        for cache_dir in (tmp_path / "cache", tmp_path / "missing"):
+            parse_cfg = {"taxonomy_cache_dir": str(cache_dir), "offline": True}
+            with pytest.raises(RuntimeError, match="prewarm_taxonomy"):
+                ArelleSession.from_config(parse_cfg, controller_factory=FakeController)
+
+    def test_online_with_empty_cache_is_allowed(self, tmp_path):
+        parse_cfg = {"taxonomy_cache_dir": str(tmp_path / "cache"), "offline": False}
+        session = ArelleSession.from_config(parse_cfg, controller_factory=FakeController)
+        assert session.controller.webCache.workOffline is False
+        assert (tmp_path / "cache").is_dir()
+
+    def test_default_leaves_web_cache_untouched(self):
+        session = ArelleSession.from_config(None, controller_factory=FakeController)
+        assert session.controller.webCache.cacheDir == "/default/cache"
+        assert session.controller.webCache.workOffline is False
@@ -0,0 +1,150 @@
+"""
+Unit Tests for the COPY-based staging loader (lib.bulk_copy / lib.db.copy_staging_*)
+
+execute_values の代わりに COPY + 集合演算の upsert で staging に登録する処理を検証します：
+  1. Python の値が COPY テキスト形式（NULL / bool / bytea / JSON / エスケープ）に変換される
+  2. CopyReader が任意の read サイズで同じ内容を返す
+  3. 一時テーブル作成 → COPY → INSERT ... SELECT ... ON CONFLICT の順に発行される
+  4. ON CONFLICT 句は execute_values 版と共有し、db.staging_write で方式を選べる
+"""
+
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import psycopg2.extras
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import lib.db as db
+from lib.bulk_copy import CopyReader, copy_merge, copy_text
+from lib.fact_batch import FACT_COLUMNS, FactBatch
+
+
+class TestCopyText:
+    @pytest.mark.parametrize("value,expected", [
+        (None, "\\N"),
+        (True, "t"),
+        (False, "f"),
+        (0, "0"),
+        (Decimal("-56000"), "-56000"),
+        (date(2024, 3, 31), "2024-03-31"),
+        (b"\x02\xab", "\\\\x02ab"),
+        ("a\tb\nc\\d\re", "a\\tb\\nc\\\\d\\re"),
+        ("売上高", "売上高"),
+        ({"numerator": ["iso4217:JPY"], "denominator": []},
+         '{"denominator": [], "numerator": ["iso4217:JPY"]}'),
+    ])
+    def test_values(self, value, expected):
+        assert copy_text(value) == expected
+
+    def test_json_adapter(self):
+        assert copy_text(psycopg2.extras.Json({"a": "\n"})) == '{"a": "\\\\n"}'
+
+
+class TestCopyReader:
+    ROWS = [("S100TEST", i, "x" * i, None) for i in range(50)]
+
+    def test_read_all(self):
+        reader = CopyReader(self.ROWS)
+        data = reader.read()
+        assert data.count("\n") == 50
+        assert data.splitlines()[3] == "S100TEST\t3\txxx\t\\N"
+        assert reader.rows == 50
+
+    @pytest.mark.parametrize("size", [1, 7, 64, 8192])
+    def test_chunked_read_is_identical(self, size):
+        expected = CopyReader(self.ROWS).read()
+        reader = CopyReader(self.ROWS)
+        chunks = []
+        while True:
+            chunk = reader.read(size)
+            if not chunk:
+                break
+            assert len(chunk) <= size
+            chunks.append(chunk)
+        assert "".join(chunks) == expected
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(" ".join(sql.split()))
+
+    def fetchall(self):
+        return [("JPY", 20)]
+
+    def copy_expert(self, sql, file):
+        self.conn.statements.append(sql)
+        self.conn.copied.append(file.read())
+
+
+class FakeConn:
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestCopyMerge:
+    def test_statements(self):
+        conn = FakeConn()
+        ids = copy_merge(conn, "staging.unit", db.UNIT_COLUMNS, [("S100TEST", "JPY", None, b"\x02")], db.UNIT_CONFLICT)
+        assert ids == [("JPY", 20)]  # RETURNING unit_ref, id
+        drop, create, copy, insert = conn.statements
+        assert drop == "DROP TABLE IF EXISTS pg_temp._copy_staging_unit"
+        assert create.startswith("CREATE TEMP TABLE _copy_staging_unit ON COMMIT DROP AS SELECT doc_id,")
+        assert copy == "COPY _copy_staging_unit (doc_id, unit_ref, measures, unit_hash) FROM STDIN"
+        assert insert.startswith("INSERT INTO staging.unit (doc_id, unit_ref, measures, unit_hash) SELECT")
+        assert insert.endswith(" ".join(db.UNIT_CONFLICT.split()))
+        assert conn.copied == ["S100TEST\tJPY\t\\N\t\\\\x02\n"]
+
+    def test_copy_staging_facts(self):
+        batch = FactBatch("S100TEST")
+        for i, name in enumerate(["NetSales", "Assets"]):
+            batch.append(
+                (f"jppfs_cor:{name}", "CurrentYearDuration", "JPY"),
+                f"jppfs_cor:{name}", "jppfs_cor", name, 10, 20,
+                Decimal(100 + i), None, "JPY", Decimal(100 + i), "0", False, bytes([2, i]),
+            )
+        conn = FakeConn()
+        assert db.copy_staging_facts(conn, batch) == 2
+        assert "RETURNING" not in conn.statements[-1]
+        assert conn.commits == 0  # コミットは StagingTransaction
+        lines = conn.copied[0].splitlines()
+        assert [line.split("\t") for line in lines][1] == [
+            "S100TEST", "jppfs_cor:Assets", "jppfs_cor", "Assets", "10", "20",
+            "101", "\\N", "JPY", "101", "0", "f", "\\\\x0201",
+        ]
+        assert len(lines[0].split("\t")) == len(FACT_COLUMNS)
+
+    def test_empty_rows_issue_nothing(self):
+        conn = FakeConn()
+        assert db.copy_staging_facts(conn, FactBatch("S100TEST")) == 0
+        db.copy_staging_units(conn, [])
+        assert conn.statements == [] and conn.commits == 0
+
+
+class TestStagingWriters:
+    def test_methods(self):
+        assert db.staging_writers()["facts"] is db.upsert_staging_facts
+        assert db.staging_writers("copy")["facts"] is db.copy_staging_facts
+        with pytest.raises(ValueError):
+            db.staging_writers("binary")
@@ -0,0 +1,214 @@
+"""
+Unit Tests for shared context signatures (edinet.parse_xbrl.build_context_hash / lib.db)
+
+書類をまたいで context 属性を共有する処理を検証します：
+  1. context_hash は doc_id / context_ref に依存せず、属性だけで決まる
+  2. 同じ属性の context はメモ化され、JSON 化は1回だけ
+  3. ハッシュ値は属性の JSON ペイロード（entity_identifier を含まない）から計算される
+  4. upsert_context_signatures は既知のハッシュを DB に問い合わせない
+  5. ロールバックされたトランザクションの署名 id はメモに残らない
+  6. 未登録の署名はハッシュ順に登録する（ワーカー間のロック順を揃える）
+  7. 外部キー違反（掃除で消えた署名をメモが引いた）で失敗したらメモを捨てる
+"""
+
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import psycopg2.errors
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import lib.db as db
+from edinet.parse_xbrl import _signature_hash, build_context_hash, context_signature
+from lib.keyhash import key_hash
+
+
+def context(doc_id="S100TEST", context_ref="CurrentYearDuration", dims=None, **kw):
+    rec = {
+        "doc_id": doc_id,
+        "context_ref": context_ref,
+        "period_type": "duration",
+        "period_start": date(2023, 4, 1),
+        "period_end": date(2024, 3, 31),
+        "instant_date": None,
+        "entity_identifier": "http://disclosure.edinet-fsa.go.jp|E00001-000",
+        "is_consolidated": None,
+        "dimensions": dims,
+    }
+    rec.update(kw)
+    return rec
+
+
+class TestContextHash:
+    def test_independent_of_doc_and_ref(self):
+        a = context(doc_id="S100AAAA", context_ref="CurrentYearDuration")
+        b = context(doc_id="S100BBBB", context_ref="CurrentYearDuration_Copy")
+        assert build_context_hash(a) == build_context_hash(b)
+
+    def test_independent_of_entity(self):
+        a = context(doc_id="S100AAAA", entity_identifier="http://disclosure.edinet-fsa.go.jp|E00001-000")
+        b = context(doc_id="S100BBBB", entity_identifier="http://disclosure.edinet-fsa.go.jp|E99999-000")
+        assert build_context_hash(a) == build_context_hash(b)
+
+    def test_attributes_change_hash(self):
+        base = build_context_hash(context())
+        assert build_context_hash(context(period_end=date(2024, 3, 30))) != base
+        dims = {"jppfs_cor:ConsolidatedOrNonConsolidatedAxis": "jppfs_cor:NonConsolidatedMember"}
+        assert build_context_hash(context(dims=dims, is_consolidated=False)) != base
+
+    def test_memoized(self):
+        _signature_hash.cache_clear()
+        for i in range(5):
+            build_context_hash(context(doc_id=f"S100{i:04d}"))
+        info = _signature_hash.cache_info()
+        assert info.misses == 1
+        assert info.hits == 4
+
+    def test_payload(self):
+        dims = {"b:Axis": "b:Member", "a:Axis": "a:Member"}
+        rec = context(dims=dims, is_consolidated=True)
+        payload = json.dumps(
+            {
+                "period_type": "duration",
+                "period_start": "2023-04-01",
+                "period_end": "2024-03-31",
+                "instant_date": "",
+                "is_consolidated": True,
+                "dimensions": dims,
+            },
+            ensure_ascii=True,
+            sort_keys=True,
+        )
+        assert build_context_hash(rec) == key_hash(payload)
+
+    def test_signature_is_hashable(self):
+        sig = context_signature(context(dims={"a:Axis": "a:Member"}))
+        assert hash(sig) == hash(context_signature(context(dims={"a:Axis": "a:Member"})))
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        hashes = params[0]
+        self.conn.queried.append(list(hashes))
+        self._rows = [(h, self.conn.ids.setdefault(h, len(self.conn.ids) + 1)) for h in hashes]
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConn:
+    closed = 0
+
+    def __init__(self):
+        self.ids = {}
+        self.queried = []
+        self.inserted = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestUpsertContextSignatures:
+    @pytest.fixture(autouse=True)
+    def fake_db(self, monkeypatch):
+        monkeypatch.setattr(db, "_signature_ids", {})
+        monkeypatch.setattr(
+            db.psycopg2.extras, "execute_values",
+            lambda cur, sql, values, page_size=100, fetch=False: cur.conn.inserted.extend(values),
+        )
+
+    def test_dedup_and_memo(self):
+        conn = FakeConn()
+        doc1 = [
+            dict(context(context_ref="A"), context_hash=build_context_hash(context())),
+            dict(context(context_ref="B"), context_hash=build_context_hash(context())),
+        ]
+        with db.StagingTransaction(conn) as tx:
+            ids = db.upsert_context_signatures(conn, doc1, tx.signature_ids)
+        assert len(conn.inserted) == 1
+        assert list(ids.values()) == [1]
+
+        # 2書類目: 既知のハッシュは DB に問い合わせない
+        prior = context(period_end=date(2023, 3, 31), period_start=date(2022, 4, 1))
+        doc2 = [
+            dict(context(doc_id="S100OTHR"), context_hash=build_context_hash(context())),
+            dict(prior, context_hash=build_context_hash(prior)),
+        ]
+        with db.StagingTransaction(conn) as tx:
+            ids = db.upsert_context_signatures(conn, doc2, tx.signature_ids)
+        assert len(conn.inserted) == 2
+        assert conn.queried[-1] == [build_context_hash(prior)]
+        assert ids[build_context_hash(context())] == 1
+        assert ids[build_context_hash(prior)] == 2
+
+        conn.queried.clear()
+        db.upsert_context_signatures(conn, doc1 + doc2)
+        assert conn.queried == []
+        assert conn.commits == 2
+
+    def test_rolled_back_ids_are_not_memoized(self):
+        conn = FakeConn()
+        rows = [dict(context(), context_hash=build_context_hash(context()))]
+        with pytest.raises(RuntimeError):
+            with db.StagingTransaction(conn) as tx:
+                db.upsert_context_signatures(conn, rows, tx.signature_ids)
+                # 同じトランザクション内では pending から引く
+                conn.queried.clear()
+                db.upsert_context_signatures(conn, rows, tx.signature_ids)
+                assert conn.queried == []
+                raise RuntimeError("staging failed")
+        assert conn.rollbacks == 1 and conn.commits == 0
+        assert db._signature_ids == {}
+
+    def test_foreign_key_violation_clears_memo(self):
+        conn = FakeConn()
+        rows = [dict(context(), context_hash=build_context_hash(context()))]
+        with db.StagingTransaction(conn) as tx:
+            db.upsert_context_signatures(conn, rows, tx.signature_ids)
+        assert db._signature_ids
+
+        with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+            with db.StagingTransaction(conn) as tx:
+                db.upsert_context_signatures(conn, rows, tx.signature_ids)
+                raise psycopg2.errors.ForeignKeyViolation("signature_id not present")
+        assert db._signature_ids == {}
+
+        # 次の書類は DB から引き直す
+        conn.queried.clear()
+        db.upsert_context_signatures(conn, rows)
+        assert conn.queried == [[build_context_hash(context())]]
+
+    def test_missing_hashes_inserted_in_sorted_order(self):
+        conn = FakeConn()
+        rows = [
+            dict(context(context_ref=f"C{i}", period_end=date(2024, 3, i + 1)),
+                 context_hash=build_context_hash(context(period_end=date(2024, 3, i + 1))))
+            for i in range(10)
+        ]
+        db.upsert_context_signatures(conn, rows)
+        inserted = [v[0] for v in conn.inserted]
+        assert len(inserted) == 10
+        assert inserted == sorted(inserted)
+        assert conn.queried[-1] == inserted
@@ -0,0 +1,197 @@
+"""
+Unit Tests for the shared connection pool and prepared statements (lib.db.ConnectionPool / execute_prepared)
+
+接続の使い回しと準備済み文の実行を検証します（DB 不要。接続は偽物に差し替える）：
+  1. 返却した接続は次の acquire で再利用され、max_size を超えると acquire_timeout で PoolError
+  2. 閉じた接続・SELECT 1 に失敗した接続は捨てて開き直す
+  3. 返却時に未完了のトランザクションを rollback し、接続エラーなら破棄する
+  4. %s → $n の変換、接続ごとに1回だけ PREPARE、prepared=None なら通常の SQL
+  5. get_pool はプロセスごとに1つ（pid が変われば作り直す）
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import lib.db as db
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.connection.statements.append((" ".join(sql.split()), params))
+        self.connection.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.prepared = set()
+        self.last_used = time.monotonic()
+        self.info = FakeInfo()
+        self.statements = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    conns = []
+
+    def fake_get_conn(db_cfg):
+        conn = FakeConn()
+        conns.append(conn)
+        return conn
+
+    monkeypatch.setattr(db, "get_conn", fake_get_conn)
+    return conns
+
+
+class TestConnectionPool:
+    def test_reuse(self, opened):
+        pool = db.ConnectionPool({}, min_size=1, max_size=2)
+        assert len(opened) == 1
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            assert second is first
+        assert len(opened) == 1 and pool.size == 1
+
+    def test_grows_to_max_then_times_out(self, opened):
+        pool = db.ConnectionPool({}, min_size=0, max_size=2, acquire_timeout=0.05)
+        a = pool.acquire()
+        b = pool.acquire()
+        assert a is not b and pool.size == 2
+        with pytest.raises(db.PoolError):
+            pool.acquire()
+        pool.release(a)
+        assert pool.acquire() is a
+
+    def test_closed_connection_is_replaced(self, opened):
+        pool = db.ConnectionPool({}, min_size=1, max_size=1)
+        opened[0].close()
+        conn = pool.acquire()
+        assert conn is opened[1]
+        assert pool.size == 1
+
+    def test_health_check_after_idle(self, opened):
+        pool = db.ConnectionPool({}, min_size=1, max_size=1, health_check_sec=0)
+        opened[0].broken = True
+        conn = pool.acquire()
+        assert conn is opened[1]
+        assert opened[0].closed
+        # 確認した接続はトランザクションを残さない
+        pool.release(conn)
+        assert pool.acquire().info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def test_release_rolls_back(self, opened):
+        pool = db.ConnectionPool({}, min_size=1, max_size=1)
+        with pytest.raises(RuntimeError):
+            with pool.connection() as conn:
+                conn.cursor().execute("SELECT 1")
+                raise RuntimeError("boom")
+        assert conn.rollbacks == 1 and not conn.closed
+        assert pool.acquire() is conn
+
+    def test_operational_error_discards(self, opened):
+        pool = db.ConnectionPool({}, min_size=1, max_size=1)
+        with pytest.raises(psycopg2.OperationalError):
+            with pool.connection() as conn:
+                raise psycopg2.OperationalError("terminating connection")
+        assert conn.closed and pool.size == 0
+        assert pool.acquire() is opened[1]
+
+    def test_close(self, opened):
+        pool = db.ConnectionPool({}, min_size=2, max_size=2)
+        pool.close()
+        assert all(c.closed for c in opened)
+        with pytest.raises(db.PoolError):
+            pool.acquire()
+
+    def test_from_config(self, opened):
+        pool = db.ConnectionPool.from_config({"pool": {"min_size": 0, "max_size": 3}}, max_size=5)
+        assert (pool.min_size, pool.max_size, pool.acquire_timeout) == (0, 5, 30.0)
+        assert opened == []
+
+
+class TestGetPool:
+    def test_one_pool_per_process(self, opened, monkeypatch):
+        monkeypatch.setattr(db, "_pool", None)
+        pool = db.get_pool({"pool": {"min_size": 0}})
+        assert db.get_pool({}) is pool
+        # fork 先（pid が違う）では作り直し、親の接続は閉じない
+        monkeypatch.setattr(pool, "pid", -1)
+        assert db.get_pool({}) is not pool
+        db._pool.close()
+
+
+STMT = db.PreparedStatement(
+    "test_stmt",
+    "SELECT id FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s",
+    ("bigint", "text"),
+)
+
+
+class TestPreparedStatement:
+    def test_prepare_sql(self):
+        assert STMT.prepare_sql() == (
+            "PREPARE test_stmt (bigint, text) AS SELECT id FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2"
+        )
+        assert STMT.execute_sql(2) == "EXECUTE test_stmt (%s, %s)"
+        assert db.PreparedStatement("p", "SELECT 1", ()).prepare_sql() == "PREPARE p AS SELECT 1"
+        assert db.PreparedStatement("p", "SELECT 1", ()).execute_sql(0) == "EXECUTE p"
+
+    def test_prepared_once_per_connection(self):
+        conn = FakeConn()
+        for i in range(3):
+            db.execute_prepared(conn.cursor(), STMT, (i, "y"))
+        sqls = [s for s, _ in conn.statements]
+        assert sum(s.startswith("PREPARE") for s in sqls) == 1
+        assert sqls[1:] == ["EXECUTE test_stmt (%s, %s)"] * 3
+        assert conn.statements[-1][1] == (2, "y")
+        assert conn.prepared == {"test_stmt"}
+
+    def test_fallback_without_prepare(self):
+        conn = FakeConn()
+        conn.prepared = None  # db.prepare: false（トランザクションモードの pgbouncer 等）
+        db.execute_prepared(conn.cursor(), STMT, (1, "y"))
+        assert conn.statements == [(" ".join(STMT.sql.split()), (1, "y"))]
+
+    def test_registered_statements(self):
+        import edinet.load_core  # noqa: F401 - 登録のため読み込む
+
+        assert "update_document_status_parsed_at" in db.PREPARED_STATEMENTS
+        fact = db.PREPARED_STATEMENTS["core_upsert_financial_fact"]
+        assert len(fact.types) == fact.sql.count("%s")
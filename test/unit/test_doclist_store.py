@@ -0,0 +1,66 @@
+"""
+Unit Tests for doclist storage formats (lib.doclist_store)
+
+doclist スナップショットの保存形式を検証します：
+  1. json / json.gz の書き込み → 読み込みで内容が一致する
+  2. 圧縮形式は同じ内容なら同じバイト列（= 同じ SHA-256）になる
+  3. find_doclist が形式を問わずファイルを見つける
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lib.doclist_store import (
+    check_format,
+    doclist_path,
+    find_doclist,
+    read_doclist,
+    render_doclist,
+    write_doclist,
+)
+
+
+DOCLIST = {
+    "metadata": {"resultset": {"count": 1}, "status": "200"},
+    "results": [{"docID": "S100LUF2", "filerName": "テスト株式会社"}],
+}
+
+
+class TestRoundTrip:
+    """保存と読み込み"""
+
+    @pytest.mark.parametrize("fmt", ["json", "json.gz"])
+    def test_write_then_read(self, tmp_path, fmt):
+        path = write_doclist(doclist_path(tmp_path, "2024-06-20", fmt), render_doclist(DOCLIST, fmt))
+        assert read_doclist(path) == DOCLIST
+        assert not path.with_name(path.name + ".part").exists()
+
+    def test_gzip_is_deterministic_and_smaller(self):
+        first = render_doclist(DOCLIST, "json.gz")
+        second = render_doclist(DOCLIST, "json.gz")
+        assert hashlib.sha256(first).hexdigest() == hashlib.sha256(second).hexdigest()
+
+        large = {"results": [dict(DOCLIST["results"][0], seqNumber=i) for i in range(200)]}
+        assert len(render_doclist(large, "json.gz")) < len(render_doclist(large, "json")) / 5
+
+
+class TestLookup:
+    """形式の判別と検索"""
+
+    def test_find_doclist_prefers_requested_format(self, tmp_path):
+        assert find_doclist(tmp_path, "2024-06-20") is None
+        write_doclist(doclist_path(tmp_path, "2024-06-20", "json"), render_doclist(DOCLIST, "json"))
+        gz = write_doclist(doclist_path(tmp_path, "2024-06-20", "json.gz"), render_doclist(DOCLIST, "json.gz"))
+
+        assert find_doclist(tmp_path, "2024-06-20").name == "doclist.json"
+        assert find_doclist(tmp_path, "2024-06-20", prefer="json.gz") == gz
+
+    def test_unknown_format_rejected(self):
+        with pytest.raises(ValueError):
+            check_format("xml")
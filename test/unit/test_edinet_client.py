@@ -0,0 +1,185 @@
+"""
+Unit Tests for EDINET API client (lib.edinet_client)
+
+ネットワークを使わずに、EdinetClient の挙動を検証します：
+  1. ストリーミング保存でサイズと SHA-256 が正しく計算される
+  2. 失敗時に一時ファイル・保存先ファイルが残らない
+  3. 429/5xx の再試行と Retry-After の優先（本文の受信中の切断はダウンロードごとやり直す）
+  4. レイテンシ集計
+"""
+
+import hashlib
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lib.edinet_client import EdinetClient, parse_retry_after
+
+
+def fake_response(status=200, chunks=(), error=None, headers=None, json_body=None):
+    resp = MagicMock()
+    resp.__enter__.return_value = resp
+    resp.__exit__.return_value = False
+    resp.status_code = status
+    resp.headers = headers or {}
+    resp.json.return_value = json_body
+
+    def iter_content(chunk_size=None):
+        for c in chunks:
+            yield c
+        if error:
+            raise error
+
+    def raise_for_status():
+        if status >= 400:
+            raise requests.HTTPError(f"{status}")
+
+    resp.iter_content.side_effect = iter_content
+    resp.raise_for_status.side_effect = raise_for_status
+    return resp
+
+
+def make_client(*responses, **kwargs):
+    session = MagicMock()
+    session.get.side_effect = list(responses)
+    sleeps = []
+    client = EdinetClient("http://x", "k", session=session, sleep=sleeps.append, **kwargs)
+    return client, session, sleeps
+
+
+class TestDownloadDocumentZip:
+    """download_document_zip のテスト"""
+
+    def test_streams_to_file_and_hashes(self, tmp_path):
+        chunks = [b"PK\x03\x04", b"a" * 1000, b"", b"tail"]
+        dest = tmp_path / "document.zip"
+        client, _, _ = make_client(fake_response(chunks=chunks))
+        size, sha = client.download_document_zip("S100TEST", dest)
+
+        body = b"".join(chunks)
+        assert dest.read_bytes() == body
+        assert size == len(body)
+        assert sha == hashlib.sha256(body).hexdigest()
+        assert not (tmp_path / "document.zip.part").exists()
+
+    def test_failure_leaves_no_partial_file(self, tmp_path):
+        dest = tmp_path / "document.zip"
+        client, _, _ = make_client(fake_response(chunks=[b"PK\x03\x04"], error=IOError("connection reset")))
+        with pytest.raises(IOError):
+            client.download_document_zip("S100TEST", dest)
+
+        assert not dest.exists()
+        assert not (tmp_path / "document.zip.part").exists()
+
+
+    @pytest.mark.parametrize("error", [
+        requests.exceptions.ChunkedEncodingError("incomplete chunk"),
+        requests.ConnectionError("connection reset"),
+    ])
+    def test_body_error_restarts_download(self, tmp_path, error):
+        dest = tmp_path / "document.zip"
+        body = [b"PK\x03\x04", b"complete"]
+        client, session, sleeps = make_client(
+            fake_response(chunks=[b"PK\x03\x04", b"trunc"], error=error),
+            fake_response(chunks=body),
+        )
+        size, sha = client.download_document_zip("S100TEST", dest)
+
+        # 途中までの内容を引き継がず、最初から書き直す
+        assert dest.read_bytes() == b"".join(body)
+        assert size == len(b"".join(body))
+        assert sha == hashlib.sha256(b"".join(body)).hexdigest()
+        assert session.get.call_count == 2
+        assert len(sleeps) == 1
+        assert not (tmp_path / "document.zip.part").exists()
+
+    def test_body_error_gives_up_after_max_retries(self, tmp_path):
+        dest = tmp_path / "document.zip"
+        error = requests.exceptions.ChunkedEncodingError("incomplete chunk")
+        client, session, _ = make_client(
+            *[fake_response(chunks=[b"PK"], error=error) for _ in range(2)], max_retries=1
+        )
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            client.download_document_zip("S100TEST", dest)
+        assert session.get.call_count == 2
+        assert not dest.exists()
+        assert not (tmp_path / "document.zip.part").exists()
+
+
+class TestRetry:
+    """再試行とバックオフのテスト"""
+
+    def test_retries_on_5xx_then_succeeds(self):
+        client, session, sleeps = make_client(
+            fake_response(status=503),
+            fake_response(status=200, json_body={"results": []}),
+        )
+        assert client.fetch_doclist("2024-06-20") == {"results": []}
+        assert session.get.call_count == 2
+        assert len(sleeps) == 1
+
+    def test_retry_after_is_honoured(self):
+        client, _, sleeps = make_client(
+            fake_response(status=429, headers={"Retry-After": "7"}),
+            fake_response(status=200, json_body={}),
+        )
+        client.fetch_doclist("2024-06-20")
+        assert sleeps == [7.0]
+
+    def test_gives_up_after_max_retries(self):
+        client, session, _ = make_client(*[fake_response(status=500) for _ in range(3)], max_retries=2)
+        with pytest.raises(requests.HTTPError):
+            client.fetch_doclist("2024-06-20")
+        assert session.get.call_count == 3
+
+    def test_client_error_is_not_retried(self):
+        client, session, _ = make_client(fake_response(status=404))
+        with pytest.raises(requests.HTTPError):
+            client.fetch_doclist("2024-06-20")
+        assert session.get.call_count == 1
+
+    def test_connection_error_is_retried(self):
+        client, session, _ = make_client(
+            requests.ConnectionError("reset"),
+            fake_response(status=200, json_body={}),
+        )
+        client.fetch_doclist("2024-06-20")
+        assert session.get.call_count == 2
+
+    def test_backoff_is_bounded(self):
+        client, _, _ = make_client(backoff_base_sec=1.0, backoff_max_sec=5.0)
+        for attempt in range(10):
+            assert 0 <= client._backoff(attempt, None) <= 5.0
+
+
+class TestRetryAfterParsing:
+    def test_seconds(self):
+        assert parse_retry_after("12") == 12.0
+
+    def test_http_date(self):
+        now = datetime(2024, 6, 20, 0, 0, 0, tzinfo=timezone.utc)
+        assert parse_retry_after("Thu, 20 Jun 2024 00:00:30 GMT", now=now) == 30.0
+
+    def test_invalid(self):
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+class TestLatencySummary:
+    def test_summary_counts_retries(self):
+        client, _, _ = make_client(
+            fake_response(status=503),
+            fake_response(status=200, json_body={}),
+        )
+        client.fetch_doclist("2024-06-20")
+        summary = client.latency_summary()
+        assert summary["requests"] == 2
+        assert summary["retries"] == 1
+        assert summary["errors"] == 1
@@ -0,0 +1,89 @@
+"""
+Unit Tests for the columnar fact batch (lib.fact_batch / edinet.parse_xbrl.build_fact_batch)
+
+dict を作らずに staging.fact 行を組み立てる処理を検証します：
+  1. context 未登録のファクトは除外される
+  2. (concept, context, unit) の重複は先勝ちで除外し、食い違いを conflict として数える
+  3. Unit 正規化・nil の扱いが従来の行 dict と同じ
+  4. rows() が FACT_COLUMNS 順のタプルを返す
+"""
+
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.parse_xbrl import build_fact_batch
+from lib.fact_batch import FACT_COLUMNS, RawFact
+from lib.keyhash import key_hash
+from lib.unit_normalizer import normalizer as unit_normalizer
+
+
+def fact(name, context_ref="CurrentYearDuration", unit_ref="JPY", x_value="100", is_nil=False, decimals="0"):
+    is_numeric = bool(unit_ref)
+    return RawFact(
+        concept_qname=f"jppfs_cor:{name}",
+        concept_namespace="jppfs_cor",
+        concept_name=name,
+        context_ref=context_ref,
+        unit_ref=unit_ref,
+        is_nil=is_nil,
+        is_numeric=is_numeric,
+        x_value=Decimal(x_value) if is_numeric and not is_nil else None,
+        value=None if is_numeric else x_value,
+        decimals=decimals if is_numeric else None,
+    )
+
+
+CONTEXT_MAP = {"CurrentYearDuration": 10}
+UNIT_MAP = {"JPY": 20}
+
+
+class TestBuildFactBatch:
+    """パーサー出力 → FactBatch"""
+
+    def test_filters_and_dedups(self):
+        facts = [
+            fact("NetSales"),
+            fact("NetSales"),                      # 完全一致の重複
+            fact("NetSales", x_value="200"),       # 値が食い違う重複
+            fact("Assets", context_ref="Unknown"),  # context 未登録
+            fact("Tuple", context_ref=None),       # タプル
+        ]
+        batch = build_fact_batch("S100TEST", facts, CONTEXT_MAP, UNIT_MAP)
+        assert len(batch) == 1
+        assert batch.dup_count == 2
+        assert batch.conflict_count == 1
+        assert batch.columns["value_numeric"] == [Decimal("100")]
+
+    def test_row_matches_previous_dict_layout(self):
+        batch = build_fact_batch(
+            "S100TEST",
+            [fact("NetSales"), fact("CompanyName", unit_ref="", x_value="テスト"), fact("Assets", is_nil=True)],
+            CONTEXT_MAP,
+            UNIT_MAP,
+        )
+        rows = [dict(zip(FACT_COLUMNS, r)) for r in batch.rows()]
+        unit_ref_normalized, value_normalized = unit_normalizer.normalize("JPY", Decimal("100"))
+        assert rows[0] == {
+            "doc_id": "S100TEST",
+            "concept_qname": "jppfs_cor:NetSales",
+            "concept_namespace": "jppfs_cor",
+            "concept_name": "NetSales",
+            "context_id": 10,
+            "unit_id": 20,
+            "value_numeric": Decimal("100"),
+            "value_text": None,
+            "unit_ref_normalized": unit_ref_normalized,
+            "value_normalized": value_normalized,
+            "decimals": "0",
+            "is_nil": False,
+            "fact_hash": key_hash("S100TEST|jppfs_cor:NetSales|CurrentYearDuration|JPY"),
+        }
+        assert rows[1]["unit_id"] is None
+        assert rows[1]["value_text"] == "テスト"
+        assert rows[1]["unit_ref_normalized"] == unit_normalizer.normalize("", None)[0]
+        assert rows[2]["value_numeric"] is None and rows[2]["value_normalized"] is None
+        assert rows[2]["is_nil"] is True
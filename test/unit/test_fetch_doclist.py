@@ -0,0 +1,117 @@
+"""
+Unit Tests for fetch_doclist (incremental sync helpers)
+
+DB・ネットワークを使わずに、差分同期の判定ロジックを検証します：
+  1. settle_days より古いチェックポイント済みの日付だけが除外される
+  2. render_doclist_json のハッシュが保存ファイルの sha256_file と一致する
+  3. --days-back は 1 以上だけを受け付ける
+  4. 並行取得で失敗した日付の接続は rollback し、未着手の日付は取り消す
+"""
+
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import pytest
+
+import edinet.fetch_doclist as fetch_doclist
+from edinet.fetch_doclist import (
+    build_date_list,
+    positive_int,
+    render_doclist_json,
+    save_doclist_json,
+    settled_dates,
+    sha256_file,
+)
+
+
+class TestSettledDates:
+    """settled_dates のテスト"""
+
+    def test_only_old_checkpointed_dates_are_settled(self):
+        dates = build_date_list("2024-06-01", "2024-06-10")
+        checkpoints = {"2024-06-01": {}, "2024-06-02": {}, "2024-06-09": {}}
+        result = settled_dates(dates, checkpoints, settle_days=7, today=date(2024, 6, 10))
+        assert result == ["2024-06-01", "2024-06-02"]
+
+    def test_dates_without_checkpoint_are_never_settled(self):
+        dates = build_date_list("2024-01-01", "2024-01-03")
+        assert settled_dates(dates, {}, settle_days=0, today=date(2024, 6, 10)) == []
+
+
+class TestDoclistHash:
+    """保存前ハッシュと保存後ハッシュの一致"""
+
+    def test_render_hash_matches_saved_file(self, tmp_path):
+        doclist = {"metadata": {"status": "200"}, "results": [{"docID": "S100TEST", "filerName": "テスト株式会社"}]}
+        data = render_doclist_json(doclist)
+        path = save_doclist_json(doclist, tmp_path, "2024-06-20", data)
+        assert path == tmp_path / "2024" / "06" / "20" / "doclist.json"
+        assert sha256_file(path) == hashlib.sha256(data).hexdigest()
+
+
+class TestDaysBack:
+    """--days-back の値チェック"""
+
+    def test_accepts_positive(self):
+        assert positive_int("7") == 7
+
+    @pytest.mark.parametrize("val", ["0", "-1"])
+    def test_rejects_below_one(self, val):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_int(val)
+
+
+class FakeConn:
+    closed = 0
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class TestRunDates:
+    """workers > 1 での失敗時の扱い"""
+
+    def test_failure_rolls_back_and_cancels_pending(self, monkeypatch, tmp_path):
+        conns = []
+        processed = []
+        lock = threading.Lock()
+
+        def get_conn(db_cfg):
+            conn = FakeConn()
+            with lock:
+                conns.append(conn)
+            return conn
+
+        def process_date(d, conn, *args):
+            if d == "2024-06-01":
+                raise RuntimeError("current transaction is aborted")
+            time.sleep(0.05)
+            with lock:
+                processed.append(d)
+            return 1
+
+        monkeypatch.setattr(fetch_doclist, "get_conn", get_conn)
+        monkeypatch.setattr(fetch_doclist, "process_date", process_date)
+        dates = [f"2024-06-{d:02d}" for d in range(1, 21)]
+
+        with pytest.raises(RuntimeError):
+            fetch_doclist.run_dates(dates, {}, None, 2, tmp_path, "run", tmp_path / "doc.jsonl", tmp_path / "qc.jsonl")
+
+        assert sum(c.rollbacks for c in conns) == 1
+        assert all(c.closed for c in conns)
+        # 取得中だった日付だけが終わり、残りは処理されない
+        assert len(processed) < len(dates) - 1
@@ -0,0 +1,305 @@
+"""
+Unit Tests for fetch_zip (parallel download work queue)
+
+DB・ネットワークを使わずに、疑似接続と疑似クライアントでワーカーの挙動を検証します：
+  1. WorkQueue.take_slot は並列に呼ばれても limit 件までしか許可しない
+  2. 失敗した書類は確保を戻し、skip list に入って同じ実行では再確保されない
+  3. zip_path 更新とファイル登録は1コミット（コミットまで確保した書類は未取得のまま）
+  4. 保存済みの document.zip（zipfile.is_zipfile）はダウンロードせずに登録する
+  5. 確保は zip_in_progress にしてダウンロード前にコミットする（行ロックを持ったまま HTTP を待たない）
+"""
+
+import hashlib
+import io
+import sys
+import threading
+import zipfile
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.fetch_zip as fetch_zip
+import lib.db as db
+from edinet.fetch_zip import WorkQueue, claim_target, download_one, run_worker, target_zip_path
+
+
+TARGET_COLUMNS = ("doc_id", "sec_code", "company_name", "submission_date")
+
+
+def zip_bytes(doc_id):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("XBRL/PublicDoc/a.xbrl", f"<xbrli:xbrl id='{doc_id}'/>")
+    return buf.getvalue()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.conn.statements.append((sql, params))
+        if "FOR UPDATE SKIP LOCKED" in sql:
+            skip = set(params[1])
+            only = params[2] if len(params) > 2 else None
+            self.description = [(c,) for c in TARGET_COLUMNS]
+            self._row = None
+            for doc in self.conn.db.docs:
+                if (doc["zip_path"] is None and not doc["claimed"]
+                        and doc["doc_id"] not in skip and only in (None, doc["doc_id"])):
+                    self._row = tuple(doc[c] for c in TARGET_COLUMNS)
+                    break
+        elif sql.startswith("UPDATE raw.edinet_document SET zip_path"):
+            zip_path, _, doc_id = params
+            self.conn.pending.append(("zip_path", doc_id, zip_path))
+        elif sql.startswith("UPDATE raw.edinet_document SET fetch_status = %s, zip_claimed_at = NOW()"):
+            status, doc_id = params
+            self.conn.pending.append(("claim", doc_id, status))
+        elif sql.startswith("UPDATE raw.edinet_document SET fetch_status = 'listed', zip_claimed_at = NULL"):
+            self.conn.pending.append(("release", params[0], None))
+
+    def fetchone(self):
+        return self._row
+
+
+class FakeDB:
+    def __init__(self, doc_ids):
+        self.docs = [
+            {
+                "doc_id": doc_id,
+                "sec_code": "12340",
+                "company_name": "Test Co",
+                "submission_date": date(2024, 6, 20),
+                "zip_path": None,
+                "fetch_status": "listed",
+                "claimed": False,
+            }
+            for doc_id in doc_ids
+        ]
+        self.files = []
+
+    def zip_path(self, doc_id):
+        return next(d["zip_path"] for d in self.docs if d["doc_id"] == doc_id)
+
+    def doc(self, doc_id):
+        return next(d for d in self.docs if d["doc_id"] == doc_id)
+
+
+class FakeConn:
+    """コミットまで更新を保留し、rollback で捨てる疑似接続"""
+
+    def __init__(self, fake_db):
+        self.db = fake_db
+        self.statements = []
+        self.pending = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        for kind, doc_id, value in self.pending:
+            if kind == "zip_path":
+                self.db.doc(doc_id).update(zip_path=value, fetch_status="zip_downloaded")
+            elif kind == "claim":
+                self.db.doc(doc_id).update(fetch_status=value, claimed=True)
+            elif kind == "release":
+                self.db.doc(doc_id).update(fetch_status="listed", claimed=False)
+            else:
+                self.db.files.append(value)
+        self.pending = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def download_document_zip(self, doc_id, dest, doc_type=1):
+        self.calls.append(doc_id)
+        if doc_id in self.fail:
+            raise RuntimeError("HTTP 500")
+        data = zip_bytes(doc_id)
+        Path(dest).write_bytes(data)
+        return len(data), hashlib.sha256(data).hexdigest()
+
+
+def fake_execute_values(cur, sql, values, page_size=100, fetch=False):
+    for v in values:
+        cur.conn.pending.append(("file", v[0], dict(zip(db.RAW_FILE_COLUMNS, v))))
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    monkeypatch.setattr(db.psycopg2.extras, "execute_values", fake_execute_values)
+
+    def install(doc_ids):
+        fdb = FakeDB(doc_ids)
+        conns = []
+
+        def get_conn(db_cfg):
+            conn = FakeConn(fdb)
+            conns.append(conn)
+            return conn
+
+        monkeypatch.setattr(fetch_zip, "get_conn", get_conn)
+        return fdb, conns
+
+    return install
+
+
+class TestWorkQueue:
+    """件数上限と skip list"""
+
+    def test_take_slot_limit_under_contention(self):
+        queue = WorkQueue(50)
+        granted = []
+
+        def worker():
+            while queue.take_slot():
+                granted.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(granted) == 50
+        assert not queue.take_slot()
+
+    def test_skip_list_is_a_copy(self):
+        queue = WorkQueue(1)
+        queue.mark_failed("S100FAIL")
+        skip = queue.skip_list()
+        skip.append("S100OTHR")
+        assert queue.skip_list() == ["S100FAIL"]
+
+
+class TestRunWorker:
+    """疑似 DB でのワーカー"""
+
+    def test_limit_stops_claiming(self, fake_db, tmp_path):
+        fdb, conns = fake_db(["S100A001", "S100A002", "S100A003"])
+        client = FakeClient()
+        downloaded = run_worker({}, WorkQueue(2), client, tmp_path / "raw", "run", tmp_path / "doc.jsonl")
+
+        assert downloaded == 2
+        assert client.calls == ["S100A001", "S100A002"]
+        assert fdb.zip_path("S100A003") is None
+        assert conns[0].closed
+
+    def test_failed_download_rolls_back_and_is_skipped(self, fake_db, tmp_path):
+        fdb, conns = fake_db(["S100FAIL", "S100A002"])
+        client = FakeClient(fail={"S100FAIL"})
+        queue = WorkQueue(10)
+        downloaded = run_worker({}, queue, client, tmp_path / "raw", "run", tmp_path / "doc.jsonl")
+
+        assert downloaded == 1
+        assert queue.failed == ["S100FAIL"]
+        # 失敗した書類は未取得・未確保に戻り（次回実行で再開される）、同じ実行では2度確保しない
+        assert fdb.zip_path("S100FAIL") is None
+        assert fdb.doc("S100FAIL")["fetch_status"] == "listed" and not fdb.doc("S100FAIL")["claimed"]
+        assert fdb.zip_path("S100A002") is not None
+        assert client.calls == ["S100FAIL", "S100A002"]
+        claims = [p for s, p in conns[0].statements if "FOR UPDATE SKIP LOCKED" in s]
+        assert claims[0][1] == [] and claims[1][1] == ["S100FAIL"]
+        assert conns[0].rollbacks >= 1
+        assert [f["doc_id"] for f in fdb.files] == ["S100A002"]
+
+    def test_one_commit_per_document(self, fake_db, tmp_path):
+        fdb, conns = fake_db(["S100A001", "S100A002"])
+        run_worker({}, WorkQueue(10), FakeClient(), tmp_path / "raw", "run", tmp_path / "doc.jsonl")
+
+        # 確保で1回 + zip_path とファイル登録で1回
+        assert conns[0].commits == 4
+        assert [f["file_type"] for f in fdb.files] == ["zip", "zip"]
+        assert all(f["path"] == fdb.zip_path(f["doc_id"]) for f in fdb.files)
+
+    def test_claim_by_doc_id(self, fake_db):
+        fdb, _ = fake_db(["S100A001", "S100A002"])
+        conn = FakeConn(fdb)
+        assert claim_target(conn, doc_id="S100A002")["doc_id"] == "S100A002"
+        # 確保済みの書類は他のワーカーから選ばれない
+        assert claim_target(FakeConn(fdb), doc_id="S100A002") is None
+        fdb.docs[1].update(zip_path="done", claimed=False)
+        assert claim_target(conn, doc_id="S100A002") is None
+
+    def test_claim_is_committed_before_download(self, fake_db, tmp_path):
+        fdb, conns = fake_db(["S100A001"])
+        seen = []
+
+        class CheckingClient(FakeClient):
+            def download_document_zip(self, doc_id, dest, doc_type=1):
+                conn = conns[0]
+                # ダウンロード中は未コミットの更新（行ロック）を持たない
+                seen.append((fdb.doc(doc_id)["fetch_status"], list(conn.pending)))
+                return super().download_document_zip(doc_id, dest, doc_type)
+
+        run_worker({}, WorkQueue(10), CheckingClient(), tmp_path / "raw", "run", tmp_path / "doc.jsonl")
+
+        assert seen == [(fetch_zip.ZIP_IN_PROGRESS, [])]
+        assert fdb.doc("S100A001")["fetch_status"] == "zip_downloaded"
+
+
+class TestResume:
+    """保存済み ZIP からの再開"""
+
+    def _target(self, fdb):
+        doc = fdb.docs[0]
+        return {c: doc[c] for c in TARGET_COLUMNS}
+
+    def test_existing_zip_is_registered_without_download(self, fake_db, tmp_path):
+        fdb, _ = fake_db(["S100A001"])
+        target = self._target(fdb)
+        raw_root = tmp_path / "raw"
+        zip_path = target_zip_path(raw_root, target)
+        zip_path.parent.mkdir(parents=True)
+        data = zip_bytes("S100A001")
+        zip_path.write_bytes(data)
+
+        client = FakeClient()
+        conn = FakeConn(fdb)
+        download_one(conn, target, client, raw_root, "run", tmp_path / "doc.jsonl")
+
+        assert client.calls == []
+        assert fdb.zip_path("S100A001") == str(zip_path)
+        assert fdb.files[0]["sha256"] == hashlib.sha256(data).hexdigest()
+        assert fdb.files[0]["size_bytes"] == len(data)
+
+    def test_broken_file_is_downloaded_again(self, fake_db, tmp_path):
+        fdb, _ = fake_db(["S100A001"])
+        target = self._target(fdb)
+        raw_root = tmp_path / "raw"
+        zip_path = target_zip_path(raw_root, target)
+        zip_path.parent.mkdir(parents=True)
+        zip_path.write_bytes(b"<html>error page</html>")
+
+        client = FakeClient()
+        download_one(FakeConn(fdb), target, client, raw_root, "run", tmp_path / "doc.jsonl")
+
+        assert client.calls == ["S100A001"]
+        assert zipfile.is_zipfile(zip_path)
+        assert fdb.zip_path("S100A001") == str(zip_path)
@@ -0,0 +1,36 @@
+"""
+Unit Tests for versioned hash keys (lib.keyhash)
+
+fact_hash / context_hash / unit_hash のバイナリキーを検証します：
+  1. v2 キーは 17 バイトで先頭がバージョン
+  2. fact_key_hash は parse / load_core 共通の連結文字列から計算される
+  3. PostgreSQL の md5() と同じ値になる（sql/06 の移行と一致）
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lib.keyhash import fact_key_hash, join_key, key_hash
+
+
+class TestKeyHash:
+    def test_v2_layout(self):
+        h = key_hash("S100TEST|jppfs_cor:NetSales|CurrentYearDuration|JPY")
+        assert isinstance(h, bytes)
+        assert len(h) == 17
+        assert h[0] == 2
+
+    def test_matches_postgres_md5(self):
+        # PostgreSQL: '\x02'::bytea || decode(md5(text), 'hex')
+        text = "S100TEST|jppfs_cor:売上高|Prior1YearInstant|"
+        assert key_hash(text)[1:].hex() == hashlib.md5(text.encode("utf-8")).hexdigest()
+
+    def test_fact_key_hash(self):
+        parts = ("S100TEST", "jppfs_cor:NetSales", "CurrentYearDuration", "")
+        assert join_key(*parts) == "S100TEST|jppfs_cor:NetSales|CurrentYearDuration|"
+        assert fact_key_hash(*parts) == key_hash(join_key(*parts))
+        assert fact_key_hash(*parts) != fact_key_hash("S100TEST", "jppfs_cor:NetSales", "CurrentYearDuration", "JPY")
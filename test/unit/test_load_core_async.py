@@ -0,0 +1,310 @@
+"""
+Unit Tests for the pipelined core loader (edinet.load_core.load_document_async / lib.db_async)
+
+db.backend: psycopg（psycopg 3 のパイプラインモード・バイナリ COPY）での core 取込を検証します
+（DB・psycopg 不要。非同期接続は偽物に差し替える）：
+  1. staging の行 → core.financial_fact の upsert 引数の変換は psycopg2 版と共通（fact_rows）
+  2. company〜unit の upsert と fact の材料の読み出しが1つのパイプラインで送られる
+  3. fact はバイナリ COPY（同じ fact_hash は後勝ち）+ 1文の upsert、fetch_status は loaded
+  4. company の upsert は doc_id だけを引数にした文で行う
+  5. AsyncConnectionPool の再利用・壊れた接続の破棄・返却時の rollback、db.backend の検証
+  6. fact の取込前に書類の v1 キー（sql/06 で再計算できなかった行）を削除する（同期版・非同期版）
+"""
+
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.load_core as load_core
+import lib.db_async as db_async
+from lib.keyhash import fact_key_hash
+
+
+DOC_ID = "S100TEST"
+
+CONTEXT_ROWS = [("CurrentYearDuration", 11, date(2024, 3, 31), True)]
+UNIT_ROWS = [("JPY", 21), ("pure", 22)]
+JPY = {"numerator": ["iso4217:JPY"], "denominator": []}
+
+
+def staging_row(name, value, context_ref="CurrentYearDuration", measures=JPY):
+    return (f"jppfs_cor:{name}", "jppfs_cor", name, value, None, -6, False,
+            context_ref, measures, 100, 200, "JP GAAP")
+
+
+STAGING_ROWS = [
+    staging_row("NetSales", Decimal("1000")),
+    staging_row("NetSales", Decimal("1001")),  # 同じ fact_hash（後勝ち）
+    staging_row("Assets", Decimal("5000")),
+    staging_row("SalesUSD", Decimal("7"), measures={"numerator": ["iso4217:USD"], "denominator": []}),
+    staging_row("Ratio", Decimal("0.5"), measures={"numerator": ["xbrli:pure"], "denominator": []}),
+    staging_row("Description", None, measures=None),
+    staging_row("Unknown", Decimal("1"), context_ref="OtherContext"),
+]
+
+
+class TestFactRows:
+    def test_conversion(self):
+        rows = load_core.fact_rows(DOC_ID, CONTEXT_ROWS, UNIT_ROWS, STAGING_ROWS)
+        # 外貨と context の無い行は除外
+        assert [r[-1] for r in rows] == ["NetSales", "NetSales", "Assets", "Ratio", "Description"]
+        first = dict(zip(load_core.FACT_ROW_COLUMNS, rows[0]))
+        assert first == {
+            "document_id": 100, "company_id": 200, "context_id": 11, "unit_id": 21,
+            "value_numeric": Decimal("1000"), "value_text": None, "decimals": -6, "is_nil": False,
+            "fact_hash": fact_key_hash(DOC_ID, "jppfs_cor:NetSales", "CurrentYearDuration", "JPY"),
+            "period_end": date(2024, 3, 31), "is_consolidated": True, "accounting_standard": "JP GAAP",
+            "namespace": "jppfs_cor", "element_name": "NetSales",
+        }
+        # 単位なし（非数値）は unit_id NULL、未登録の単位キーも NULL
+        assert rows[3][3] is None and rows[4][3] is None
+
+    def test_matches_prepared_statement(self):
+        stmt = load_core.UPSERT_FINANCIAL_FACT
+        assert len(load_core.FACT_ROW_COLUMNS) == len(stmt.types) == stmt.sql.count("%s")
+
+
+def norm(sql):
+    return " ".join(sql.split())
+
+
+class FakeAsyncCursor:
+    def __init__(self, conn, rows=()):
+        self.conn = conn
+        self._rows = list(rows)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetchall(self):
+        assert not self.conn.in_pipeline, "results are read after the pipeline is synced"
+        return self._rows
+
+    @asynccontextmanager
+    async def copy(self, sql):
+        copy = FakeCopy()
+        self.conn.log.append(("COPY", norm(sql)))
+        yield copy
+        self.conn.copied.append(copy)
+
+
+class FakeCopy:
+    def __init__(self):
+        self.types = None
+        self.rows = []
+
+    def set_types(self, types):
+        self.types = types
+
+    async def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakeInfo:
+    transaction_status = 0
+
+
+class FakeAsyncConn:
+    def __init__(self):
+        self.log = []
+        self.copied = []
+        self.in_pipeline = False
+        self.closed = False
+        self.broken = False
+        self.info = FakeInfo()
+        self.rollbacks = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.log.append(("BEGIN", None))
+        yield
+        self.log.append(("COMMIT", None))
+
+    @asynccontextmanager
+    async def pipeline(self):
+        self.in_pipeline = True
+        self.log.append(("PIPELINE", None))
+        yield
+        self.log.append(("SYNC", None))
+        self.in_pipeline = False
+
+    async def execute(self, sql, params=None, prepare=None):
+        sql = norm(sql)
+        self.log.append((sql, params))
+        if "FROM core.context cx" in sql:
+            return FakeAsyncCursor(self, CONTEXT_ROWS)
+        if "FROM core.unit" in sql:
+            return FakeAsyncCursor(self, UNIT_ROWS)
+        if "FROM staging.fact f" in sql:
+            return FakeAsyncCursor(self, STAGING_ROWS)
+        return FakeAsyncCursor(self)
+
+    def cursor(self):
+        return FakeAsyncCursor(self)
+
+    async def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = 0
+
+    async def close(self):
+        self.closed = True
+
+
+class TestLoadDocumentAsync:
+    def test_one_flight_for_document_statements(self):
+        conn = FakeAsyncConn()
+        assert asyncio.run(load_core.load_document_async(conn, DOC_ID)) == 5
+
+        markers = [i for i, (sql, _) in enumerate(conn.log) if sql in ("PIPELINE", "SYNC", "COPY")]
+        first = conn.log[markers[0] + 1:markers[1]]
+        # company 3文 + document / concept / context / unit + v1 fact の削除 + 読み出し3文 + 一時テーブル2文
+        assert [sql for sql, _ in first[:8]] == [norm(s.sql) for s in load_core.DOCUMENT_STATEMENTS]
+        assert all(params == (DOC_ID,) for _, params in first[:8])
+        assert len(first) == 13
+        assert conn.log[0] == ("BEGIN", None) and conn.log[-1] == ("COMMIT", None)
+
+    def test_binary_copy_and_merge(self):
+        conn = FakeAsyncConn()
+        asyncio.run(load_core.load_document_async(conn, DOC_ID))
+        copies = [sql for kind, sql in conn.log if kind == "COPY"]
+        assert copies == [
+            f"COPY {load_core.FACT_COPY_TABLE} ({', '.join(load_core.FACT_ROW_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+        ]
+        copy = conn.copied[0]
+        assert copy.types == list(load_core.UPSERT_FINANCIAL_FACT.types)
+        # 同じ fact_hash は後勝ち
+        assert [(r[-1], r[4]) for r in copy.rows][:2] == [("NetSales", Decimal("1001")), ("Assets", Decimal("5000"))]
+        assert len(copy.rows) == 4
+
+        sqls = [sql for sql, _ in conn.log]
+        last = sqls.index("COPY")
+        assert sqls[last + 1:] == [
+            "PIPELINE", norm(load_core.MERGE_COPIED_FACTS),
+            norm(load_core.status_statement("loaded").sql), "SYNC", "COMMIT",
+        ]
+        assert conn.log[-3][1] == ("loaded", DOC_ID)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append((norm(sql), params))
+
+
+class FakeConn:
+    prepared = None
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class TestUpsertCompany:
+    def test_statements_take_doc_id_only(self):
+        conn = FakeConn()
+        load_core.upsert_company(conn, DOC_ID)
+        assert [p for _, p in conn.statements] == [(DOC_ID,)] * 3
+        update, upsert, insert = [s for s, _ in conn.statements]
+        assert update.startswith("UPDATE core.company c")
+        assert "ON CONFLICT (edinet_code) DO UPDATE" in upsert
+        assert "c.sec_code = r.sec_code" in insert
+
+
+class TestLegacyFacts:
+    def test_delete_statement(self):
+        sql = norm(load_core.DELETE_LEGACY_FACTS.sql)
+        assert sql.startswith("DELETE FROM core.financial_fact f")
+        assert "get_byte(f.fact_hash, 0) = 1" in sql
+        assert load_core.DELETE_LEGACY_FACTS in load_core.DOCUMENT_STATEMENTS
+
+    def test_sync_load_deletes_before_facts(self, monkeypatch):
+        calls = []
+        for name in ("upsert_company", "upsert_document", "upsert_concepts", "upsert_contexts",
+                     "upsert_units", "delete_legacy_facts", "load_facts"):
+            monkeypatch.setattr(load_core, name, lambda conn, doc_id, name=name: calls.append(name) or 0)
+        monkeypatch.setattr(load_core, "update_document_status", lambda *a, **kw: calls.append("status"))
+
+        class Conn:
+            def commit(self):
+                calls.append("commit")
+
+        load_core.load_document(Conn(), DOC_ID)
+        assert calls[-4:] == ["delete_legacy_facts", "load_facts", "status", "commit"]
+
+
+class TestAsyncConnectionPool:
+    def _pool(self, monkeypatch):
+        opened = []
+
+        async def fake_connect(db_cfg):
+            conn = FakeAsyncConn()
+            opened.append(conn)
+            return conn
+
+        monkeypatch.setattr(db_async, "get_async_conn", fake_connect)
+        return db_async.AsyncConnectionPool({}, max_size=2), opened
+
+    def test_reuse_and_discard(self, monkeypatch):
+        pool, opened = self._pool(monkeypatch)
+
+        async def scenario():
+            async with pool.connection() as a:
+                pass
+            async with pool.connection() as b:
+                assert b is a
+                b.broken = True
+            async with pool.connection() as c:
+                assert c is not a
+            await pool.close()
+
+        asyncio.run(scenario())
+        assert len(opened) == 2
+        assert all(c.closed for c in opened)
+
+    def test_rollback_on_release(self, monkeypatch):
+        pool, opened = self._pool(monkeypatch)
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                async with pool.connection() as conn:
+                    conn.info.transaction_status = 2  # INTRANS
+                    raise RuntimeError("boom")
+            async with pool.connection() as again:
+                assert again is conn
+
+        asyncio.run(scenario())
+        assert opened[0].rollbacks == 1 and not opened[0].closed
+
+
+class TestBackend:
+    def test_check_backend(self):
+        assert db_async.check_backend("psycopg2") == "psycopg2"
+        assert db_async.check_backend("psycopg") == "psycopg"
+        with pytest.raises(ValueError):
+            db_async.check_backend("asyncpg")
+
+    def test_missing_driver(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "psycopg", None)
+        with pytest.raises(RuntimeError, match="psycopg"):
+            asyncio.run(db_async.get_async_conn({}))
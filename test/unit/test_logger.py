@@ -0,0 +1,124 @@
+"""
+Unit Tests for JsonlLogger (lib.logger)
+
+バッファ付き JSONL ロガーの挙動を検証します：
+  1. レコード形式が従来の log_jsonl と同じ（1行1JSON）
+  2. flush / close でバッファが書き込まれる
+  3. 件数しきい値でバックグラウンド flush される
+  4. 複数スレッドからの書き込みで行が壊れない
+  5. fork した子プロセスのレコードは os._exit で終わっても失われない
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import pytest
+
+from lib.logger import JsonlLogger
+
+
+def read_records(path: Path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestJsonlLoggerBuffering:
+    """バッファと flush のテスト"""
+
+    def test_records_are_buffered_until_flush(self, tmp_path):
+        logger = JsonlLogger(flush_interval_sec=60, max_buffered=1000)
+        path = tmp_path / "2024" / "06" / "20" / "doc.jsonl"
+        logger.log(path, {"event": "doc_listed", "doc_id": "S100TEST"})
+        assert not path.exists()
+
+        logger.flush()
+        assert read_records(path) == [{"event": "doc_listed", "doc_id": "S100TEST"}]
+        logger.close()
+
+    def test_close_writes_remaining_records(self, tmp_path):
+        logger = JsonlLogger(flush_interval_sec=60)
+        a, b = tmp_path / "run.jsonl", tmp_path / "qc.jsonl"
+        logger.log(a, {"event": "run_start"})
+        logger.log(b, {"event": "qc_fail", "qc_reason": ["xbrl_missing"]})
+        logger.log(a, {"event": "run_end"})
+        logger.close()
+
+        assert [r["event"] for r in read_records(a)] == ["run_start", "run_end"]
+        assert read_records(b)[0]["qc_reason"] == ["xbrl_missing"]
+
+    def test_size_threshold_triggers_background_flush(self, tmp_path):
+        logger = JsonlLogger(flush_interval_sec=60, max_buffered=3)
+        path = tmp_path / "doc.jsonl"
+        for i in range(3):
+            logger.log(path, {"i": i})
+
+        deadline = time.time() + 5
+        while time.time() < deadline and not (path.exists() and path.read_text()):
+            time.sleep(0.01)
+        assert [r["i"] for r in read_records(path)] == [0, 1, 2]
+        logger.close()
+
+    def test_non_ascii_is_escaped(self, tmp_path):
+        logger = JsonlLogger()
+        path = tmp_path / "doc.jsonl"
+        logger.log(path, {"company": "テスト"})
+        logger.close()
+        assert "\\u30c6" in path.read_text(encoding="utf-8")
+
+
+class TestJsonlLoggerConcurrency:
+    """複数スレッドからの書き込み"""
+
+    def test_concurrent_writers_produce_whole_lines(self, tmp_path):
+        logger = JsonlLogger(flush_interval_sec=0.01, max_buffered=50)
+        path = tmp_path / "doc.jsonl"
+
+        def worker(n):
+            for i in range(200):
+                logger.log(path, {"worker": n, "i": i})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.close()
+
+        records = read_records(path)
+        assert len(records) == 800
+        for n in range(4):
+            assert [r["i"] for r in records if r["worker"] == n] == list(range(200))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+class TestJsonlLoggerFork:
+    """fork した子プロセスからの書き込み"""
+
+    def test_fork_child_records_survive_os_exit(self, tmp_path):
+        logger = JsonlLogger(flush_interval_sec=60, max_buffered=1000)
+        os.register_at_fork(after_in_child=logger._reset_after_fork)
+        parent_path, child_path = tmp_path / "parent.jsonl", tmp_path / "child.jsonl"
+        logger.log(parent_path, {"event": "parent"})
+
+        pid = os.fork()
+        if pid == 0:
+            # ProcessPoolExecutor(fork) のワーカーと同じく atexit を通らずに終了する
+            try:
+                for i in range(20):
+                    logger.log(child_path, {"i": i})
+            finally:
+                os._exit(0)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+        assert [r["i"] for r in read_records(child_path)] == list(range(20))
+        # 親のバッファは子で二重に書かれず、親の flush で1回だけ書かれる
+        assert not parent_path.exists()
+        logger.close()
+        assert read_records(parent_path) == [{"event": "parent"}]
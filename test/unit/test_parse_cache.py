@@ -0,0 +1,208 @@
+"""
+Unit Tests for the parse result cache (lib.parse_cache / edinet.parse_xbrl.load_or_parse)
+
+ZIP の SHA-256 をキーにした解析結果キャッシュを検証します：
+  1. encode / decode で contexts / units / facts / concept_hierarchy が復元される
+  2. doc_id は保存せず、読み出し時の doc_id が入る
+  3. 2回目の解析はキャッシュから読み、parse_zip を呼ばない
+  4. パーサーバージョン・エンジンが違えば別キー、壊れたファイルは解析し直す
+  5. 空の結果・Arelle の読み込みエラーがある結果は保存しない
+  6. キャッシュの読み書き失敗は doc ログに WARN で残す
+"""
+
+import json
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.parse_xbrl as parse_xbrl
+from lib import parse_cache
+from lib.fact_batch import RawFact
+from lib.logger import flush_logs
+from lib.parse_cache import ParseCache
+
+
+DATA_ZIP = (
+    Path(__file__).parent.parent.parent
+    / "data/raw/edinet/2021/06/30/S100LUF2_59730_unknown/document.zip"
+)
+
+
+def sample_parsed(doc_id="S100TEST"):
+    return {
+        "contexts": [
+            {
+                "doc_id": doc_id,
+                "context_ref": "CurrentYearDuration",
+                "period_type": "duration",
+                "period_start": date(2023, 4, 1),
+                "period_end": date(2024, 3, 31),
+                "instant_date": None,
+                "entity_identifier": "http://disclosure.edinet-fsa.go.jp|E00001-000",
+                "is_consolidated": None,
+                "dimensions": None,
+                "context_hash": b"\x02" + b"\x00" * 16,
+            },
+        ],
+        "units": [
+            {
+                "doc_id": doc_id,
+                "unit_ref": "JPY",
+                "measures": {"numerator": ["iso4217:JPY"], "denominator": []},
+                "unit_hash": b"\x02" + b"\x01" * 16,
+            },
+        ],
+        "facts": [
+            RawFact("jppfs_cor:NetSales", "jppfs_cor", "NetSales", "CurrentYearDuration", "JPY",
+                    False, True, Decimal("1000000"), None, "-6"),
+            RawFact("jpcrp_cor:CompanyName", "jpcrp_cor", "CompanyName", "FilingDateInstant", "",
+                    False, False, None, "テスト株式会社", None),
+        ],
+        "concept_hierarchy": [],
+    }
+
+
+class TestEncoding:
+    def test_round_trip(self):
+        parsed = sample_parsed("S100TEST")
+        data = parse_cache.encode(parsed, RawFact._fields, {"xbrl_path": "x.zip!a.xbrl"})
+        restored = parse_cache.decode(data, "S100TEST", RawFact)
+        assert restored["facts"] == parsed["facts"]
+        assert restored["contexts"] == parsed["contexts"]
+        assert restored["units"] == parsed["units"]
+        assert restored["concept_hierarchy"] == []
+        assert restored["meta"] == {"xbrl_path": "x.zip!a.xbrl"}
+
+    def test_doc_id_comes_from_caller(self):
+        data = parse_cache.encode(sample_parsed("S100AAAA"), RawFact._fields)
+        restored = parse_cache.decode(data, "S100BBBB", RawFact)
+        assert {c["doc_id"] for c in restored["contexts"] + restored["units"]} == {"S100BBBB"}
+
+    def test_rejects_foreign_data(self):
+        with pytest.raises(ValueError):
+            parse_cache.decode(b"not a cache file", "S100TEST", RawFact)
+
+    @pytest.mark.skipif(not DATA_ZIP.exists(), reason="sample document.zip not available")
+    def test_real_document_round_trip(self):
+        parsed, _ = parse_xbrl.parse_zip(DATA_ZIP, "S100LUF2", {"engine": "stream"})
+        data = parse_cache.encode(parsed, RawFact._fields)
+        restored = parse_cache.decode(data, "S100LUF2", RawFact)
+        assert restored["facts"] == parsed["facts"]
+        assert restored["contexts"] == parsed["contexts"]
+        assert restored["units"] == parsed["units"]
+        # 列指向 + zlib で ZIP より十分小さい
+        assert len(data) < DATA_ZIP.stat().st_size
+
+
+class CallLog(list):
+    """parse_zip の呼び出し記録（result で返す解析結果を差し替えられる）"""
+
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+
+def read_log(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestLoadOrParse:
+    @pytest.fixture
+    def counting_parse(self, monkeypatch):
+        calls = CallLog(sample_parsed)
+
+        def fake_parse_zip(zip_path, doc_id, parse_cfg):
+            calls.append(doc_id)
+            return calls.result(doc_id), f"{zip_path}!XBRL/PublicDoc/a.xbrl"
+
+        monkeypatch.setattr(parse_xbrl, "parse_zip", fake_parse_zip)
+        return calls
+
+    def test_miss_then_hit(self, tmp_path, counting_parse):
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        zip_path = tmp_path / "document.zip"
+        parsed, xbrl_path, status = parse_xbrl.load_or_parse(zip_path, "ab" * 32, "S100TEST", cfg)
+        assert status == "miss"
+        parsed2, xbrl_path2, status2 = parse_xbrl.load_or_parse(zip_path, "ab" * 32, "S100TEST", cfg)
+        assert status2 == "hit"
+        assert counting_parse == ["S100TEST"]
+        assert parsed2["facts"] == parsed["facts"]
+        assert xbrl_path2 == xbrl_path
+
+    def test_disabled(self, tmp_path, counting_parse):
+        _, _, status = parse_xbrl.load_or_parse(tmp_path / "document.zip", None, "S100TEST", {})
+        assert status == "off"
+
+    def test_hash_computed_when_unregistered(self, tmp_path, counting_parse):
+        zip_path = tmp_path / "document.zip"
+        zip_path.write_bytes(b"PK\x05\x06" + b"\x00" * 18)
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        parse_xbrl.load_or_parse(zip_path, None, "S100TEST", cfg)
+        sha = parse_cache.file_sha256(zip_path)
+        cache = ParseCache(tmp_path / "cache", parse_xbrl.PARSER_VERSION)
+        assert cache.path_for(sha, "arelle").exists()
+
+    def test_refresh_and_version_and_engine(self, tmp_path, counting_parse):
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        zip_path = tmp_path / "document.zip"
+        parse_xbrl.load_or_parse(zip_path, "cd" * 32, "S100TEST", cfg)
+        _, _, status = parse_xbrl.load_or_parse(zip_path, "cd" * 32, "S100TEST", {**cfg, "cache_refresh": True})
+        assert status == "refresh"
+        _, _, status = parse_xbrl.load_or_parse(zip_path, "cd" * 32, "S100TEST", {**cfg, "engine": "stream"})
+        assert status == "miss"
+        cache = ParseCache(tmp_path / "cache", parse_xbrl.PARSER_VERSION)
+        assert cache.path_for("cd" * 32, "arelle") != ParseCache(tmp_path / "cache", 99).path_for("cd" * 32, "arelle")
+        assert len(counting_parse) == 3
+
+    def test_corrupt_file_is_reparsed(self, tmp_path, counting_parse):
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        cache = ParseCache(tmp_path / "cache", parse_xbrl.PARSER_VERSION)
+        cache.put("ef" * 32, "arelle", b"EDPC\x01garbage")
+        _, _, status = parse_xbrl.load_or_parse(tmp_path / "document.zip", "ef" * 32, "S100TEST", cfg)
+        assert status == "miss"
+        _, _, status = parse_xbrl.load_or_parse(tmp_path / "document.zip", "ef" * 32, "S100TEST", cfg)
+        assert status == "hit"
+
+    @pytest.mark.parametrize("broken", [
+        {"facts": []},
+        {"contexts": []},
+        {"load_errors": ["xbrl.5.1.1:taxonomyNotFound"]},
+    ])
+    def test_qc_failures_are_not_cached(self, tmp_path, counting_parse, broken):
+        counting_parse.result = lambda doc_id: {**sample_parsed(doc_id), **broken}
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        zip_path = tmp_path / "document.zip"
+        _, _, status = parse_xbrl.load_or_parse(zip_path, "ab" * 32, "S100TEST", cfg)
+        assert status == "skip"
+        assert not ParseCache(tmp_path / "cache", parse_xbrl.PARSER_VERSION).path_for("ab" * 32, "arelle").exists()
+
+        # 原因が直れば解析し直して保存する
+        counting_parse.result = sample_parsed
+        _, _, status = parse_xbrl.load_or_parse(zip_path, "ab" * 32, "S100TEST", cfg)
+        assert status == "miss"
+        assert len(counting_parse) == 2
+
+    def test_cache_errors_are_logged(self, tmp_path, counting_parse, monkeypatch):
+        cfg = {"cache_dir": str(tmp_path / "cache")}
+        log = tmp_path / "doc.jsonl"
+        cache = ParseCache(tmp_path / "cache", parse_xbrl.PARSER_VERSION)
+        cache.put("ef" * 32, "arelle", b"EDPC\x01garbage")
+
+        def fail_put(self, zip_sha256, engine, data):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(ParseCache, "put", fail_put)
+        _, _, status = parse_xbrl.load_or_parse(tmp_path / "document.zip", "ef" * 32, "S100TEST", cfg, log)
+        flush_logs()
+
+        assert status == "miss"
+        events = read_log(log)
+        assert [e["event"] for e in events] == ["parse_cache_decode_error", "parse_cache_write_error"]
+        assert all(e["level"] == "WARN" and e["doc_id"] == "S100TEST" for e in events)
+        assert events[1]["error"] == "OSError: disk full"
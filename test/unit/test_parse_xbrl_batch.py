@@ -0,0 +1,65 @@
+"""
+Unit Tests for parse_xbrl batch mode helpers (edinet.parse_xbrl)
+
+バッチモードの結果集計の前提となる処理を検証します（DB・Arelle 不要）：
+  1. 成功 / QC fail / ParseError / その他の例外が結果 dict に変換される
+  2. --from-file の docID ファイルの読み込み
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.parse_xbrl as parse_xbrl
+from edinet.parse_xbrl import ParseError, QCFailedError, parse_batch_item, read_doc_ids
+
+
+class FakePool:
+    @contextmanager
+    def connection(self):
+        yield "worker-conn"
+
+
+class TestBatchItem:
+    """ワーカー結果の分類"""
+
+    def _run(self, monkeypatch, outcome):
+        def fake_stage_document(cfg, doc_id, run_id=None, conn=None):
+            assert conn == "worker-conn"
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        monkeypatch.setattr(parse_xbrl, "stage_document", fake_stage_document)
+        monkeypatch.setattr(parse_xbrl, "get_pool", lambda db_cfg: FakePool())
+        return parse_batch_item({}, "S100TEST", "run")
+
+    def test_parsed(self, monkeypatch):
+        result = self._run(monkeypatch, {"facts": 12, "qc_warn": ["duration_out_of_range"]})
+        assert result["status"] == "parsed"
+        assert result["facts"] == 12
+        assert result["qc_warn"] == ["duration_out_of_range"]
+        assert result["elapsed_sec"] >= 0
+
+    def test_qc_fail(self, monkeypatch):
+        result = self._run(monkeypatch, QCFailedError(["no_facts"]))
+        assert result["status"] == "qc_fail"
+        assert result["qc_reason"] == ["no_facts"]
+
+    def test_parse_error_and_unexpected_error(self, monkeypatch):
+        assert self._run(monkeypatch, ParseError("XBRL/PublicDoc not found"))["status"] == "error"
+        result = self._run(monkeypatch, KeyError("x"))
+        assert result["status"] == "error"
+        assert result["error"].startswith("KeyError")
+
+
+class TestReadDocIds:
+    """docID ファイルの読み込み"""
+
+    def test_skips_blank_lines_and_comments(self, tmp_path):
+        path = tmp_path / "doc_ids.txt"
+        path.write_text("S100AAAA\n\n# comment\nS100BBBB  # trailing\n", encoding="utf-8")
+        assert read_doc_ids(path) == ["S100AAAA", "S100BBBB"]
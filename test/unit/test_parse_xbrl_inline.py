@@ -0,0 +1,161 @@
+"""
+Unit Tests for multi-file inline XBRL parsing (edinet.parse_xbrl.parse_with_inline)
+
+複数の iXBRL（.htm）を1書類として解析する処理を検証します：
+  1. ix:resources の context / unit と ix:nonFraction / ix:nonNumeric の抽出
+  2. format / scale / sign / nil / ix:exclude / escape の扱い
+  3. ファイルをまたぐ continuedAt の結合、context の先勝ち
+  4. manifest 順のファイル選択と engine=stream / inline の切り替え
+"""
+
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.parse_xbrl import (
+    inline_files,
+    inline_member_names,
+    ix_transform,
+    parse_instance,
+    parse_with_inline,
+)
+
+
+HEAD = """<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2008/inlineXBRL"
+ xmlns:ixt="http://www.xbrl.org/inlineXBRL/transformation/2011-07-31"
+ xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+ xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:iso4217="http://www.xbrl.org/2003/iso4217"
+ xmlns:jppfs_cor="http://disclosure.edinet-fsa.go.jp/taxonomy/jppfs/2020-11-01/jppfs_cor"
+ xmlns:jpcrp_cor="http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2020-11-01/jpcrp_cor"><body>
+"""
+
+HEADER = HEAD + """<ix:header><ix:hidden>
+<ix:nonNumeric name="jpcrp_cor:CompanyNameCoverPage" contextRef="FilingDateInstant">テスト<ix:exclude>（注）</ix:exclude>株式会社</ix:nonNumeric>
+</ix:hidden><ix:resources>
+<xbrli:context id="CurrentYearDuration"><xbrli:entity><xbrli:identifier scheme="http://disclosure.edinet-fsa.go.jp">E00001-000</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="FilingDateInstant"><xbrli:entity><xbrli:identifier scheme="http://disclosure.edinet-fsa.go.jp">E00001-000</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:instant>2024-06-28</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:unit id="JPY"><xbrli:measure>iso4217:JPY</xbrli:measure></xbrli:unit>
+</ix:resources></ix:header>
+<p><ix:nonNumeric name="jpcrp_cor:FilingDateCoverPage" contextRef="FilingDateInstant" format="ixt:dateyearmonthdaycjk">2024年６月28日</ix:nonNumeric></p>
+<p><ix:nonNumeric name="jpcrp_cor:DescriptionOfBusinessTextBlock" contextRef="CurrentYearDuration" continuedAt="c1">前半</ix:nonNumeric></p>
+<ix:nonNumeric name="jpcrp_cor:BusinessRisksTextBlock" contextRef="CurrentYearDuration" escape="true" continuedAt="c2"><p>リスク<b>1</b></p></ix:nonNumeric>
+</body></html>
+"""
+
+BODY = HEAD + """<ix:header><ix:resources>
+<xbrli:context id="CurrentYearDuration"><xbrli:entity><xbrli:identifier scheme="http://disclosure.edinet-fsa.go.jp">E99999-000</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period></xbrli:context>
+</ix:resources></ix:header>
+<table><tr><td><ix:nonFraction name="jppfs_cor:NetSales" contextRef="CurrentYearDuration" unitRef="JPY" decimals="-6" scale="6" format="ixt:numdotdecimal">1,234</ix:nonFraction></td>
+<td><ix:nonFraction name="jppfs_cor:OperatingIncome" contextRef="CurrentYearDuration" unitRef="JPY" decimals="-3" scale="3" sign="-" format="ixt:numdotdecimal">56</ix:nonFraction></td>
+<td><ix:nonFraction name="jppfs_cor:ShortTermLoansPayable" contextRef="CurrentYearDuration" unitRef="JPY" xsi:nil="true" /></td></tr></table>
+<ix:continuation id="c1">後半</ix:continuation>
+<ix:continuation id="c2"><p>リスク<b>2</b></p></ix:continuation>
+<ix:nonNumeric name="jpcrp_cor:BusinessResultsOfGroupTextBlock" contextRef="CurrentYearDuration" escape="true"><p style="font-family: 'MS Mincho'">売上高 <ix:nonFraction name="jppfs_cor:NetSales" contextRef="CurrentYearDuration" unitRef="JPY" decimals="-6" scale="6" format="ixt:numdotdecimal">1,234</ix:nonFraction></p></ix:nonNumeric>
+</body></html>
+"""
+
+MANIFEST = """<?xml version="1.0" encoding="utf-8"?>
+<manifest xmlns="http://disclosure.edinet-fsa.go.jp/2013/manifest"><list><instance id="x">
+<ixbrl>0000000_header_ixbrl.htm</ixbrl>
+<ixbrl>0101010_honbun_ixbrl.htm</ixbrl>
+</instance></list></manifest>
+"""
+
+
+@pytest.fixture
+def public_dir(tmp_path):
+    d = tmp_path / "XBRL" / "PublicDoc"
+    d.mkdir(parents=True)
+    (d / "0000000_header_ixbrl.htm").write_text(HEADER, encoding="utf-8")
+    (d / "0101010_honbun_ixbrl.htm").write_text(BODY, encoding="utf-8")
+    (d / "manifest_PublicDoc.xml").write_text(MANIFEST, encoding="utf-8")
+    return d
+
+
+@pytest.fixture
+def parsed(public_dir):
+    return parse_with_inline(inline_files(public_dir), "S100TEST")
+
+
+def by_name(parsed, name):
+    return [f for f in parsed["facts"] if f.concept_name == name]
+
+
+class TestInlineFacts:
+    def test_contexts_and_units_merged(self, parsed):
+        refs = {c["context_ref"]: c for c in parsed["contexts"]}
+        assert sorted(refs) == ["CurrentYearDuration", "FilingDateInstant"]
+        # 同じ id はファイル順の先勝ち
+        assert refs["CurrentYearDuration"]["entity_identifier"].endswith("E00001-000")
+        assert [u["unit_ref"] for u in parsed["units"]] == ["JPY"]
+
+    def test_numeric_scale_and_sign(self, parsed):
+        sales = by_name(parsed, "NetSales")
+        assert len(sales) == 2  # 本文と TextBlock 内の同じファクト（重複排除は build_fact_batch）
+        assert sales[0].x_value == Decimal("1234000000")
+        assert sales[0].is_numeric and sales[0].decimals == "-6"
+        assert by_name(parsed, "OperatingIncome")[0].x_value == Decimal("-56000")
+
+    def test_nil(self, parsed):
+        loans = by_name(parsed, "ShortTermLoansPayable")[0]
+        assert loans.is_nil and loans.x_value is None
+
+    def test_non_numeric(self, parsed):
+        assert by_name(parsed, "CompanyNameCoverPage")[0].value == "テスト株式会社"
+        assert by_name(parsed, "FilingDateCoverPage")[0].value == "2024-06-28"
+        assert by_name(parsed, "CompanyNameCoverPage")[0].concept_namespace == "jpcrp_cor"
+
+    def test_continuation_across_files(self, parsed):
+        assert by_name(parsed, "DescriptionOfBusinessTextBlock")[0].value == "前半後半"
+
+    def test_continued_escaped_text_block(self, parsed):
+        # 続きも XHTML のまま結合する（タグを外したテキストと混ぜない）
+        value = by_name(parsed, "BusinessRisksTextBlock")[0].value
+        assert value == "<p>リスク<b>1</b></p><p>リスク<b>2</b></p>"
+
+    def test_escaped_text_block(self, parsed):
+        value = by_name(parsed, "BusinessResultsOfGroupTextBlock")[0].value
+        assert value == '<p style="font-family: &apos;MS Mincho&apos;">売上高 1,234</p>'
+
+    def test_no_concept_hierarchy(self, parsed):
+        assert parsed["concept_hierarchy"] == []
+
+
+class TestInlineFiles:
+    def test_manifest_order(self):
+        manifest = b"<ixbrl>b_ixbrl.htm</ixbrl><ixbrl>a_ixbrl.htm</ixbrl>"
+        names = ["a_ixbrl.htm", "b_ixbrl.htm", "x.xsd", "manifest_PublicDoc.xml"]
+        assert inline_member_names(names, manifest) == ["b_ixbrl.htm", "a_ixbrl.htm"]
+
+    def test_without_manifest(self):
+        assert inline_member_names(["b.htm", "a.htm", "x.xsd"]) == ["a.htm", "b.htm"]
+
+    def test_engines(self, public_dir):
+        header = public_dir / "0000000_header_ixbrl.htm"
+        assert len(parse_instance(header, "S100TEST", engine="stream")["facts"]) == 9
+        assert len(parse_instance(public_dir / "manifest_PublicDoc.xml", "S100TEST", engine="inline")["facts"]) == 9
+
+
+class TestTransform:
+    @pytest.mark.parametrize("fmt,text,expected", [
+        ("ixt:numdotdecimal", "1,234.5", "1234.5"),
+        ("ixt:numdotdecimal", "１，２３４", "1234"),
+        ("ixt:numcommadecimal", "1.234,5", "1234.5"),
+        ("ixt:zerodash", "－", "0"),
+        ("ixt:dateyearmonthdaycjk", "2021年６月30日", "2021-06-30"),
+        ("ixt:dateerayearmonthdayjp", "令和3年6月30日", "2021-06-30"),
+        ("ixt:dateerayearmonthdayjp", "平成元年1月8日", "1989-01-08"),
+        ("ixt:booleantrue", "はい", "true"),
+        (None, " text ", "text"),
+    ])
+    def test_formats(self, fmt, text, expected):
+        assert ix_transform(fmt, text) == expected
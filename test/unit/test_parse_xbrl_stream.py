@@ -0,0 +1,135 @@
+"""
+Unit Tests for the lxml iterparse fast path (edinet.parse_xbrl.parse_with_iterparse)
+
+小さな .xbrl インスタンスで、Arelle と同じ形式・意味の出力になることを検証します：
+  1. context: 期間（日付のみの instant / endDate は翌日扱い）・ディメンション・連結フラグ
+  2. unit: 単純単位と divide（prefix 付き名でソート）
+  3. fact: 数値 / 文字列 / nil、タプル内のファクトは対象外
+  4. engine の選択
+"""
+
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.parse_xbrl import build_context_hash, parse_instance, parse_with_iterparse
+
+
+INSTANCE = """<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+    xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+    xmlns:link="http://www.xbrl.org/2003/linkbase"
+    xmlns:xlink="http://www.w3.org/1999/xlink"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xmlns:iso4217="http://www.xbrl.org/2003/iso4217"
+    xmlns:jppfs_cor="http://example.com/jppfs_cor"
+    xmlns:jpcrp_cor="http://example.com/jpcrp_cor">
+  <link:schemaRef xlink:type="simple" xlink:href="test.xsd"/>
+  <xbrli:context id="CurrentYearDuration">
+    <xbrli:entity><xbrli:identifier scheme="http://disclosure.edinet-fsa.go.jp">E00001-000</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2020-04-01</xbrli:startDate><xbrli:endDate>2021-03-31</xbrli:endDate></xbrli:period>
+  </xbrli:context>
+  <xbrli:context id="CurrentYearInstant_NonConsolidatedMember">
+    <xbrli:entity><xbrli:identifier scheme="http://disclosure.edinet-fsa.go.jp">E00001-000</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:instant>2021-03-31</xbrli:instant></xbrli:period>
+    <xbrli:scenario>
+      <xbrldi:explicitMember dimension="jppfs_cor:ConsolidatedOrNonConsolidatedAxis">jppfs_cor:NonConsolidatedMember</xbrldi:explicitMember>
+    </xbrli:scenario>
+  </xbrli:context>
+  <xbrli:unit id="JPY"><xbrli:measure>iso4217:JPY</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="JPYPerShares">
+    <xbrli:divide>
+      <xbrli:unitNumerator><xbrli:measure>iso4217:JPY</xbrli:measure></xbrli:unitNumerator>
+      <xbrli:unitDenominator><xbrli:measure>xbrli:shares</xbrli:measure></xbrli:unitDenominator>
+    </xbrli:divide>
+  </xbrli:unit>
+  <jppfs_cor:NetSales contextRef="CurrentYearDuration" unitRef="JPY" decimals="-6">46640000000</jppfs_cor:NetSales>
+  <jppfs_cor:Assets contextRef="CurrentYearInstant_NonConsolidatedMember" unitRef="JPY" decimals="-6" xsi:nil="true"/>
+  <jpcrp_cor:CompanyName contextRef="CurrentYearDuration">テスト株式会社</jpcrp_cor:CompanyName>
+  <jpcrp_cor:SomeTuple>
+    <jpcrp_cor:Inner contextRef="CurrentYearDuration">nested</jpcrp_cor:Inner>
+  </jpcrp_cor:SomeTuple>
+</xbrli:xbrl>
+"""
+
+
+@pytest.fixture
+def parsed(tmp_path):
+    path = tmp_path / "instance.xbrl"
+    path.write_text(INSTANCE, encoding="utf-8")
+    return parse_with_iterparse(path, "S100TEST")
+
+
+class TestContexts:
+    """context の抽出"""
+
+    def test_duration_period(self, parsed):
+        ctx = parsed["contexts"][0]
+        assert ctx["context_ref"] == "CurrentYearDuration"
+        assert ctx["period_type"] == "duration"
+        assert ctx["period_start"] == date(2020, 4, 1)
+        # Arelle と同じく日付のみの endDate は翌日 0 時
+        assert ctx["period_end"] == date(2021, 4, 1)
+        assert ctx["entity_identifier"] == "http://disclosure.edinet-fsa.go.jp|E00001-000"
+        assert ctx["dimensions"] is None
+        assert ctx["context_hash"] == build_context_hash(ctx)
+
+    def test_instant_with_dimension(self, parsed):
+        ctx = parsed["contexts"][1]
+        assert ctx["period_type"] == "instant"
+        assert ctx["instant_date"] == ctx["period_end"] == date(2021, 4, 1)
+        assert ctx["dimensions"] == {"jppfs_cor:ConsolidatedOrNonConsolidatedAxis": "jppfs_cor:NonConsolidatedMember"}
+        assert ctx["is_consolidated"] is False
+
+
+class TestUnits:
+    """unit の抽出"""
+
+    def test_simple_and_divide(self, parsed):
+        units = {u["unit_ref"]: u["measures"] for u in parsed["units"]}
+        assert units["JPY"] == {"numerator": ["iso4217:JPY"], "denominator": []}
+        assert units["JPYPerShares"] == {"numerator": ["iso4217:JPY"], "denominator": ["xbrli:shares"]}
+
+
+class TestFacts:
+    """fact の抽出"""
+
+    def test_numeric_text_and_nil(self, parsed):
+        facts = {f.concept_name: f for f in parsed["facts"]}
+        assert set(facts) == {"NetSales", "Assets", "CompanyName"}
+
+        assert facts["NetSales"].concept_qname == "jppfs_cor:NetSales"
+        assert facts["NetSales"].concept_namespace == "jppfs_cor"
+        assert facts["NetSales"].is_numeric is True
+        assert facts["NetSales"].x_value == Decimal("46640000000")
+        assert facts["NetSales"].decimals == "-6"
+
+        assert facts["Assets"].is_nil is True
+        assert facts["Assets"].x_value is None
+
+        assert facts["CompanyName"].is_numeric is False
+        assert facts["CompanyName"].value == "テスト株式会社"
+        assert facts["CompanyName"].unit_ref == ""
+        assert facts["CompanyName"].decimals is None
+
+    def test_no_concept_hierarchy(self, parsed):
+        assert parsed["concept_hierarchy"] == []
+
+
+class TestEngine:
+    """engine の選択"""
+
+    def test_unknown_engine_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            parse_instance(tmp_path / "instance.xbrl", "S100TEST", engine="fast")
+
+    def test_stream_engine_uses_iterparse_for_xbrl(self, tmp_path):
+        path = tmp_path / "instance.xbrl"
+        path.write_text(INSTANCE, encoding="utf-8")
+        assert len(parse_instance(path, "S100TEST", engine="stream")["facts"]) == 3
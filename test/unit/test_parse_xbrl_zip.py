@@ -0,0 +1,73 @@
+"""
+Unit Tests for reading XBRL directly from document.zip (edinet.parse_xbrl)
+
+ZIP 全体を展開せずに解析対象を取り出す処理を検証します：
+  1. PublicDoc の XBRL 関連ファイルだけが一時ディレクトリに書き出される
+  2. 一時ディレクトリは with を抜けると削除される
+  3. extract_dir 指定時は従来どおり ZIP 全体を展開して残す
+  4. エントリポイントの選択順（.xbrl > manifest > header .htm）
+"""
+
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.parse_xbrl import open_xbrl_entry, pick_xbrl_name
+
+
+def make_zip(path: Path) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("XBRL/PublicDoc/jpcrp030000-asr-001_E00001.xbrl", "<xbrli:xbrl/>")
+        zf.writestr("XBRL/PublicDoc/jpcrp030000-asr-001_E00001.xsd", "<xsd:schema/>")
+        zf.writestr("XBRL/PublicDoc/image.png", b"\x89PNG")
+        zf.writestr("XBRL/AuditDoc/jpaud-aar.xbrl", "<xbrli:xbrl/>")
+        zf.writestr("S100TEST.pdf", b"%PDF")
+    return path
+
+
+class TestPublicDocOnly:
+    """PublicDoc のみの一時展開"""
+
+    def test_only_public_doc_members_are_written(self, tmp_path):
+        zip_path = make_zip(tmp_path / "document.zip")
+        with open_xbrl_entry(zip_path, work_dir=tmp_path / "work") as xbrl_file:
+            assert xbrl_file.name == "jpcrp030000-asr-001_E00001.xbrl"
+            assert xbrl_file.read_text() == "<xbrli:xbrl/>"
+            written = sorted(p.name for p in xbrl_file.parents[2].rglob("*") if p.is_file())
+            assert written == ["jpcrp030000-asr-001_E00001.xbrl", "jpcrp030000-asr-001_E00001.xsd"]
+
+        assert not xbrl_file.exists()
+        assert list((tmp_path / "work").iterdir()) == []
+        assert not (tmp_path / "extracted").exists()
+
+    def test_missing_public_doc_yields_none(self, tmp_path):
+        zip_path = tmp_path / "document.zip"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("S100TEST.pdf", b"%PDF")
+        with open_xbrl_entry(zip_path) as xbrl_file:
+            assert xbrl_file is None
+
+
+class TestFullExtract:
+    """extract_dir 指定時（keep_extracted）"""
+
+    def test_whole_zip_is_extracted_and_kept(self, tmp_path):
+        zip_path = make_zip(tmp_path / "document.zip")
+        extract_dir = tmp_path / "extracted"
+        with open_xbrl_entry(zip_path, extract_dir) as xbrl_file:
+            assert xbrl_file == extract_dir / "XBRL" / "PublicDoc" / "jpcrp030000-asr-001_E00001.xbrl"
+        assert (extract_dir / "S100TEST.pdf").exists()
+        assert xbrl_file.exists()
+
+
+class TestPickEntry:
+    """エントリポイントの選択"""
+
+    def test_preference_order(self):
+        assert pick_xbrl_name(["b.htm", "a.xbrl", "manifest_PublicDoc.xml"]) == "a.xbrl"
+        assert pick_xbrl_name(["0101010_honbun.htm", "manifest_PublicDoc.xml"]) == "manifest_PublicDoc.xml"
+        assert pick_xbrl_name(["0101010_honbun.htm", "0000000_header.htm"]) == "0000000_header.htm"
+        assert pick_xbrl_name(["a.xsd"]) is None
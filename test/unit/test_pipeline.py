@@ -0,0 +1,129 @@
+"""
+Unit Tests for the pipelined runner (edinet.pipeline.Pipeline)
+
+ステージ関数を偽物に差し替えて、キューの配線を検証します（DB・ネットワーク・Arelle 不要）：
+  1. 下流が遅いとき、上流は上限付きキューで待たされる（バックプレッシャー）
+  2. stop() 後は新しい日付を投入せず、キューに入った書類は core まで処理しきる
+  3. parse ワーカーは SIGINT を無視する（Ctrl-C は親の stop() だけが受ける）
+"""
+
+import asyncio
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.pipeline import STAGES, Pipeline, StageSettings
+
+
+DOCS_PER_DATE = 3
+
+
+def make_pipeline(tmp_path, queue_size=1, core_delay=0.0, on_core=None):
+    cfg = {
+        "edinet": {"base_url": "http://127.0.0.1:9", "api_key": "test"},
+        # min_size: 0 なので偽ステージが接続を借りない限り DB には接続しない
+        "db": {"pool": {"min_size": 0}},
+        "paths": {"raw_root": str(tmp_path / "raw"), "log_root": str(tmp_path / "logs")},
+    }
+    settings = {name: StageSettings(workers=1, queue_size=queue_size) for name in STAGES}
+    pipeline = Pipeline(cfg, settings, "test")
+
+    lock = threading.Lock()
+    seen = {name: [] for name in STAGES}
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    def fake_doclist(d):
+        with lock:
+            seen["doclist"].append(d)
+        return [f"{d}-{i}" for i in range(DOCS_PER_DATE)]
+
+    def fake_zip(doc_id):
+        with lock:
+            seen["zip"].append(doc_id)
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        return [doc_id]
+
+    def fake_parse(doc_id):
+        with lock:
+            seen["parse"].append(doc_id)
+        return {"doc_id": doc_id}
+
+    def fake_core(doc_id):
+        time.sleep(core_delay)
+        with lock:
+            seen["core"].append(doc_id)
+            state["in_flight"] -= 1
+        if on_core is not None:
+            on_core(pipeline, seen["core"])
+        return []
+
+    pipeline._doclist = fake_doclist
+    pipeline._zip = fake_zip
+    pipeline._core = fake_core
+    pipeline.parse_fn = fake_parse
+    pipeline._parse_executor = lambda: ThreadPoolExecutor(max_workers=1)
+    return pipeline, seen, state
+
+
+class TestBackpressure:
+    """上限付きキューでのバックプレッシャー"""
+
+    def test_upstream_waits_for_slow_core(self, tmp_path):
+        pipeline, seen, state = make_pipeline(tmp_path, queue_size=1, core_delay=0.01)
+        dates = [f"2024-06-{d:02d}" for d in range(1, 11)]
+
+        counts = asyncio.run(pipeline.run(dates, {}))
+
+        assert len(seen["core"]) == len(dates) * DOCS_PER_DATE
+        assert counts["core"] == {"ok": len(dates) * DOCS_PER_DATE, "failed": 0}
+        # zip 済み・core 未完了の書類は、キュー2つ分 + 各ワーカーが抱える分を超えない
+        assert state["max_in_flight"] <= 6
+
+
+class TestDrainAfterStop:
+    """stop() 後の drain"""
+
+    def test_stop_drains_queued_documents(self, tmp_path):
+        def stop_on_first(pipeline, done):
+            if len(done) == 1:
+                pipeline.stop()
+
+        pipeline, seen, _ = make_pipeline(tmp_path, queue_size=2, core_delay=0.01, on_core=stop_on_first)
+        dates = [f"2024-06-{d:02d}" for d in range(1, 31)]
+
+        asyncio.run(pipeline.run(dates, {}))
+
+        assert len(seen["doclist"]) < len(dates)
+        # 取得した書類は1件も落とさずに core まで流れる
+        assert sorted(seen["core"]) == sorted(seen["zip"])
+        assert sorted(seen["parse"]) == sorted(seen["zip"])
+
+    def test_stop_skips_pending_seed(self, tmp_path):
+        pipeline, seen, _ = make_pipeline(tmp_path)
+        pipeline.stop()
+
+        asyncio.run(pipeline.run(["2024-06-01"], {"parse": ["S100A", "S100B"]}))
+
+        assert seen["doclist"] == []
+        assert seen["core"] == []
+
+
+class TestParseExecutor:
+    """parse ワーカーのシグナル設定"""
+
+    def test_workers_ignore_sigint(self, tmp_path):
+        pipeline, _, _ = make_pipeline(tmp_path)
+        del pipeline._parse_executor
+        executor = pipeline._parse_executor()
+        try:
+            handler = executor.submit(signal.getsignal, signal.SIGINT).result(timeout=60)
+        finally:
+            executor.shutdown(wait=True)
+        assert handler == signal.SIG_IGN
@@ -0,0 +1,72 @@
+"""
+Unit Tests for taxonomy cache prewarm helpers (edinet.prewarm_taxonomy)
+
+保存済み ZIP から参照タクソノミを集める処理を検証します（Arelle・ネットワーク不要）：
+  1. 参照 URL からバージョンキーを得る
+  2. PublicDoc の .xsd / .xbrl から外部参照を集める（AuditDoc は対象外）
+  3. バージョンの組み合わせごとに書類をまとめる
+  4. webCache 上のパス
+"""
+
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.prewarm_taxonomy import (
+    cache_file_path,
+    collect_taxonomy_refs,
+    group_by_versions,
+    taxonomy_version,
+)
+
+
+JPCRP = "http://disclosure.edinet-fsa.go.jp/taxonomy/jpcrp/2023-12-01/jpcrp_cor_2023-12-01.xsd"
+JPPFS = "http://disclosure.edinet-fsa.go.jp/taxonomy/jppfs/2023-12-01/jppfs_cor_2023-12-01.xsd"
+IFRS = "http://xbrl.ifrs.org/taxonomy/2023-03-23/full_ifrs/full_ifrs-cor_2023-03-23.xsd"
+
+
+def make_zip(path: Path, refs) -> Path:
+    imports = "".join(f'<xsd:import namespace="x" schemaLocation="{u}"/>' for u in refs)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("XBRL/PublicDoc/jpcrp030000-asr-001_E00001.xsd", f"<xsd:schema>{imports}</xsd:schema>")
+        zf.writestr(
+            "XBRL/PublicDoc/jpcrp030000-asr-001_E00001.xbrl",
+            '<xbrli:xbrl><link:schemaRef xlink:href="jpcrp030000-asr-001_E00001.xsd"/></xbrli:xbrl>',
+        )
+        zf.writestr("XBRL/AuditDoc/jpaud.xsd", '<xsd:import schemaLocation="http://example.com/taxonomy/aud/2020-01-01/a.xsd"/>')
+    return path
+
+
+class TestVersions:
+    """バージョンキーと参照の収集"""
+
+    def test_taxonomy_version(self):
+        assert taxonomy_version(JPCRP) == "jpcrp/2023-12-01"
+        assert taxonomy_version(IFRS) == "xbrl.ifrs.org/2023-03-23"
+        assert taxonomy_version("http://www.xbrl.org/2003/xbrl-instance-2003-12-31.xsd") is None
+
+    def test_collect_refs_from_public_doc_only(self, tmp_path):
+        zip_path = make_zip(tmp_path / "document.zip", [JPCRP, JPPFS])
+        assert collect_taxonomy_refs(zip_path) == {JPCRP, JPPFS}
+
+    def test_group_by_versions(self, tmp_path):
+        a = make_zip(tmp_path / "a.zip", [JPCRP, JPPFS])
+        b = make_zip(tmp_path / "b.zip", [JPPFS, JPCRP])
+        c = make_zip(tmp_path / "c.zip", [IFRS])
+        groups = group_by_versions([a, b, c])
+
+        assert groups[("jpcrp/2023-12-01", "jppfs/2023-12-01")]["zip_paths"] == [a, b]
+        assert groups[("xbrl.ifrs.org/2023-03-23",)]["refs"] == {IFRS}
+
+
+class TestCachePath:
+    """webCache 上のパス"""
+
+    def test_cache_file_path(self, tmp_path):
+        assert cache_file_path(tmp_path, JPCRP) == (
+            tmp_path / "http" / "disclosure.edinet-fsa.go.jp"
+            / "taxonomy" / "jpcrp" / "2023-12-01" / "jpcrp_cor_2023-12-01.xsd"
+        )
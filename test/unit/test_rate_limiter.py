@@ -0,0 +1,103 @@
+"""
+Unit Tests for TokenBucket (lib.rate_limiter)
+
+複数ワーカーで共有するトークンバケットの挙動を検証します：
+  1. 初回呼び出しは待機しない（バケットは満タンで開始）
+  2. capacity=1 では rate_limit_sec 間隔が守られる
+  3. 複数スレッドから呼び出しても全体のレートが守られる
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lib.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """sleep で時間が進む疑似時計"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def time(self) -> float:
+        with self.lock:
+            return self.now
+
+    def sleep(self, sec: float) -> None:
+        with self.lock:
+            self.now += sec
+
+
+class TestTokenBucketBasics:
+    """基本動作のテスト"""
+
+    def test_first_acquire_does_not_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(2.0, clock=clock.time, sleep=clock.sleep)
+        assert bucket.acquire() == 0.0
+
+    def test_interval_is_respected(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(2.0, clock=clock.time, sleep=clock.sleep)
+        bucket.acquire()
+        waited = bucket.acquire()
+        assert waited == pytest.approx(2.0)
+
+    def test_elapsed_time_refills_tokens(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(2.0, clock=clock.time, sleep=clock.sleep)
+        bucket.acquire()
+        clock.now += 5.0
+        assert bucket.acquire() == 0.0
+
+    def test_burst_allows_immediate_calls(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(1.0, burst=3, clock=clock.time, sleep=clock.sleep)
+        assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.acquire() == pytest.approx(1.0)
+
+    def test_invalid_rate_rejected(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate_per_sec=0)
+
+
+class TestTokenBucketConcurrency:
+    """複数スレッドからの共有利用"""
+
+    def test_reservations_are_spaced_across_threads(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(2.0, clock=clock.time, sleep=lambda s: None)
+        waits = []
+        lock = threading.Lock()
+
+        def worker():
+            w = bucket.reserve()
+            with lock:
+                waits.append(w)
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(waits) == pytest.approx([0.0, 2.0, 4.0, 6.0, 8.0])
+
+
+class TestTryAcquire:
+    """待機しない取得（スタブサーバーのスロットリング用）"""
+
+    def test_try_acquire_rejects_without_consuming(self):
+        clock = FakeClock()
+        bucket = TokenBucket.from_interval(2.0, clock=clock.time, sleep=clock.sleep)
+        assert bucket.try_acquire() == 0.0
+        assert bucket.try_acquire() == pytest.approx(2.0)
+        clock.now += 2.0
+        assert bucket.try_acquire() == 0.0
@@ -0,0 +1,145 @@
+"""
+Unit Tests for raw file registration (lib.db.insert_raw_files / register_doclist_file / relocate_doclist_file)
+
+疑似接続で発行される文とコミットを検証します（DB 不要）：
+  1. insert_raw_files は複数ファイルを1文・1コミットで登録する
+  2. doclist は日付ごとに1ファイルとして raw.edinet_doclist_file に登録する（書類ごとには登録しない）
+  3. process_date_rows は書類の upsert と doclist 登録を1コミットで行う
+  4. relocate_doclist_file はパスの付け替えを1トランザクションで行う
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.fetch_doclist as fetch_doclist
+import lib.db as db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((" ".join(sql.split()), params))
+        self.rowcount = self.conn.rowcount
+
+    def fetchone(self):
+        return (7,)
+
+
+class FakeConn:
+    def __init__(self, rowcount=0):
+        self.statements = []
+        self.commits = 0
+        self.rowcount = rowcount
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def fake_execute_values(cur, sql, values, page_size=100, fetch=False):
+    cur.conn.statements.append((" ".join(sql.split()), list(values)))
+
+
+@pytest.fixture(autouse=True)
+def fake_execute(monkeypatch):
+    monkeypatch.setattr(db.psycopg2.extras, "execute_values", fake_execute_values)
+
+
+def statements_for(conn, table):
+    return [(s, p) for s, p in conn.statements if table in s]
+
+
+class TestInsertRawFiles:
+    """raw.edinet_file の一括登録"""
+
+    def test_single_statement_and_commit(self):
+        conn = FakeConn()
+        rows = [
+            {"doc_id": f"S100{i:04d}", "file_type": "zip", "path": f"/raw/{i}/document.zip",
+             "size_bytes": i, "sha256": "ab" * 32}
+            for i in range(3)
+        ]
+        assert db.insert_raw_files(conn, rows) == 3
+        assert len(conn.statements) == 1
+        sql, values = conn.statements[0]
+        assert sql.startswith("INSERT INTO raw.edinet_file")
+        assert values[1] == ["S1000001", "zip", "/raw/1/document.zip", 1, "ab" * 32]
+        assert conn.commits == 1
+
+    def test_empty_rows_do_nothing(self):
+        conn = FakeConn()
+        assert db.insert_raw_files(conn, []) == 0
+        assert conn.statements == [] and conn.commits == 0
+
+    def test_commit_false_leaves_transaction_open(self):
+        conn = FakeConn()
+        db.insert_raw_file(conn, "S100TEST", "zip", "/raw/document.zip", commit=False)
+        assert len(conn.statements) == 1
+        assert conn.commits == 0
+
+
+class TestDoclistFile:
+    """doclist ファイル単位の登録"""
+
+    def test_register_returns_file_id(self):
+        conn = FakeConn()
+        file_id = db.register_doclist_file(conn, "2024-06-20", "/raw/2024/06/20/doclist.json", 10, "cd" * 32)
+        assert file_id == 7
+        sql, params = conn.statements[0]
+        assert sql.startswith("INSERT INTO raw.edinet_doclist_file")
+        assert params == ("2024-06-20", "/raw/2024/06/20/doclist.json", 10, "cd" * 32)
+        assert conn.commits == 1
+
+    def test_process_date_registers_doclist_once(self, tmp_path):
+        class FakeClient:
+            def fetch_doclist(self, d, doc_type=2):
+                return {"metadata": {"status": "200"}, "results": [
+                    {"docID": f"S100{i:04d}", "docTypeCode": "120", "filerName": "テスト"} for i in range(5)
+                ]}
+
+        conn = FakeConn()
+        rows = fetch_doclist.process_date_rows(
+            "2024-06-20", conn, FakeClient(), tmp_path / "raw", "run",
+            tmp_path / "doc.jsonl", tmp_path / "qc.jsonl",
+        )
+
+        assert len(rows) == 5
+        # 書類は1文で upsert、doclist は書類数に関係なく1行
+        assert len(statements_for(conn, "INSERT INTO raw.edinet_document")) == 1
+        assert len(statements_for(conn, "INSERT INTO raw.edinet_doclist_file")) == 1
+        assert statements_for(conn, "INSERT INTO raw.edinet_file") == []
+        saved = str(tmp_path / "raw" / "2024" / "06" / "20" / "doclist.json")
+        assert all(r["doclist_json_path"] == saved for r in rows)
+        assert conn.commits == 1
+
+    def test_relocate_updates_all_references_in_one_commit(self):
+        conn = FakeConn(rowcount=5)
+        moved = db.relocate_doclist_file(conn, "/raw/doclist.json", "/raw/doclist.json.gz", 3, "ef" * 32)
+
+        assert moved == 5
+        # "UPDATE <table>" / "DELETE FROM <table>"
+        tables = [s.split()[1] if s.startswith("UPDATE") else s.split()[2] for s, _ in conn.statements]
+        assert tables.count("raw.edinet_doclist_file") == 2
+        assert tables.count("raw.edinet_file") == 2
+        assert "raw.edinet_document" in tables and "raw.edinet_doclist_checkpoint" in tables
+        assert all(p["old"] == "/raw/doclist.json" and p["new"] == "/raw/doclist.json.gz" for _, p in conn.statements)
+        assert conn.commits == 1
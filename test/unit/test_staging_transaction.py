@@ -0,0 +1,206 @@
+"""
+Unit Tests for the per-document staging unit of work (lib.db.StagingTransaction / parse_xbrl.stage_document)
+
+1書類の staging 登録を1接続・1トランザクションで行う処理を検証します（DB 不要）：
+  1. staging の upsert 関数はコミットせず、書類ごとに commit は1回だけ
+  2. 途中で失敗すると rollback し、fetch_status も更新されない
+  3. 渡した接続は閉じずに次の書類で使い回せる
+  4. context / unit の ref → id は upsert の RETURNING で得る（読み直しの SELECT なし）
+  5. QC fail / XBRL なしの書類は fetch_status を終端状態（qc_failed / parse_failed）にする
+"""
+
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import edinet.parse_xbrl as parse_xbrl
+import lib.db as db
+from lib.fact_batch import RawFact
+
+
+def sample_parsed(doc_id):
+    return {
+        "contexts": [
+            {
+                "doc_id": doc_id,
+                "context_ref": "CurrentYearDuration",
+                "period_type": "duration",
+                "period_start": date(2023, 4, 1),
+                "period_end": date(2024, 3, 31),
+                "instant_date": None,
+                "entity_identifier": "http://disclosure.edinet-fsa.go.jp|E00001-000",
+                "is_consolidated": None,
+                "dimensions": None,
+                "context_hash": b"\x02" + b"\x00" * 16,
+            },
+        ],
+        "units": [
+            {
+                "doc_id": doc_id,
+                "unit_ref": "JPY",
+                "measures": {"numerator": ["iso4217:JPY"], "denominator": []},
+                "unit_hash": b"\x02" + b"\x01" * 16,
+            },
+        ],
+        "facts": [
+            RawFact("jppfs_cor:NetSales", "jppfs_cor", "NetSales", "CurrentYearDuration", "JPY",
+                    False, True, Decimal("1000000"), None, "-6"),
+        ],
+        "concept_hierarchy": [],
+    }
+
+
+def returning(sql):
+    """staging.context / unit の upsert の RETURNING を模す"""
+    if "INSERT INTO staging.context" in sql:
+        return [("CurrentYearDuration", 10)]
+    if "INSERT INTO staging.unit" in sql:
+        return [("JPY", 20)]
+    return []
+
+
+def fake_execute_values(cur, sql, values, page_size=100, fetch=False):
+    sql = " ".join(sql.split())
+    cur.conn.statements.append(sql)
+    return returning(sql) if fetch else None
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.conn.statements.append(sql)
+        self.conn.params.append(params)
+        if "FROM core.context_signature" in sql:
+            self._rows = [(h, 1) for h in params[0]]
+        else:
+            self._rows = returning(sql)
+
+    def fetchall(self):
+        return self._rows
+
+    def copy_expert(self, sql, file):
+        self.conn.statements.append(sql)
+        file.read()
+
+
+class FakeConn:
+    closed = 0
+
+    def __init__(self):
+        self.statements = []
+        self.params = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        raise AssertionError("caller's connection must not be closed")
+
+
+@pytest.fixture
+def fake_env(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "_signature_ids", {})
+    monkeypatch.setattr(db.psycopg2.extras, "execute_values", fake_execute_values)
+    monkeypatch.setattr(parse_xbrl, "document_zip", lambda conn, doc_id: (tmp_path / "document.zip", None))
+    monkeypatch.setattr(
+        parse_xbrl, "load_or_parse",
+        lambda zip_path, sha, doc_id, parse_cfg, log_path=None: (sample_parsed(doc_id), "document.zip!a.xbrl", "off"),
+    )
+    return {"paths": {"log_root": str(tmp_path / "logs")}, "qc": {}, "db": {}}
+
+
+class TestStageDocument:
+    def test_one_commit_per_document(self, fake_env):
+        conn = FakeConn()
+        for doc_id in ("S100AAAA", "S100BBBB"):
+            summary = parse_xbrl.stage_document(fake_env, doc_id, "run", conn)
+            assert summary["facts"] == 1
+        assert conn.commits == 2
+        # 書類ごとに読み取り後の rollback（解析中に idle in transaction にしない）
+        assert conn.rollbacks == 2
+        assert sum("UPDATE raw.edinet_document" in s for s in conn.statements) == 2
+        assert db._signature_ids == {b"\x02" + b"\x00" * 16: 1}
+
+    def test_failure_rolls_back(self, fake_env, monkeypatch):
+        def broken_batch(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(parse_xbrl, "build_fact_batch", broken_batch)
+        conn = FakeConn()
+        with pytest.raises(RuntimeError):
+            parse_xbrl.stage_document(fake_env, "S100AAAA", "run", conn)
+        assert conn.commits == 0
+        assert conn.rollbacks == 2
+        assert not any("UPDATE raw.edinet_document" in s for s in conn.statements)
+        assert db._signature_ids == {}
+
+    def test_qc_fail_marks_terminal_status(self, fake_env, monkeypatch):
+        def empty_parse(zip_path, sha, doc_id, parse_cfg, log_path=None):
+            return dict(sample_parsed(doc_id), facts=[]), "document.zip!a.xbrl", "off"
+
+        monkeypatch.setattr(parse_xbrl, "load_or_parse", empty_parse)
+        conn = FakeConn()
+        with pytest.raises(parse_xbrl.QCFailedError):
+            parse_xbrl.stage_document(fake_env, "S100AAAA", "run", conn)
+        assert ("qc_failed", "S100AAAA") in conn.params
+        assert conn.commits == 1
+        # staging には何も書かない
+        assert not any("INSERT INTO staging." in s for s in conn.statements)
+
+    def test_parse_error_marks_terminal_status(self, fake_env, monkeypatch):
+        def missing_xbrl(zip_path, sha, doc_id, parse_cfg, log_path=None):
+            raise parse_xbrl.ParseError("XBRL/PublicDoc not found")
+
+        monkeypatch.setattr(parse_xbrl, "load_or_parse", missing_xbrl)
+        conn = FakeConn()
+        with pytest.raises(parse_xbrl.ParseError):
+            parse_xbrl.stage_document(fake_env, "S100AAAA", "run", conn)
+        assert ("parse_failed", "S100AAAA") in conn.params
+        assert conn.commits == 1
+
+    def test_missing_zip_keeps_status(self, fake_env, monkeypatch):
+        def no_zip(conn, doc_id):
+            raise parse_xbrl.ParseError(f"zip_path not found for doc_id={doc_id}")
+
+        monkeypatch.setattr(parse_xbrl, "document_zip", no_zip)
+        conn = FakeConn()
+        with pytest.raises(parse_xbrl.ParseError):
+            parse_xbrl.stage_document(fake_env, "S100AAAA", "run", conn)
+        # 未ダウンロードの書類は zip の取得対象に残す
+        assert conn.commits == 0
+        assert not any("UPDATE raw.edinet_document" in s for s in conn.statements)
+
+    @pytest.mark.parametrize("method", db.STAGING_WRITE_METHODS)
+    def test_writers_return_ids_without_commit(self, fake_env, method):
+        conn = FakeConn()
+        parsed = sample_parsed("S100AAAA")
+        writers = db.staging_writers(method)
+        assert writers["contexts"](conn, parsed["contexts"]) == {"CurrentYearDuration": 10}
+        assert writers["units"](conn, parsed["units"]) == {"JPY": 20}
+        assert conn.commits == 0
+        # id は RETURNING で受け取り、staging.context / unit を読み直さない
+        assert not any(s.startswith("SELECT") and "FROM staging." in s for s in conn.statements)
@@ -0,0 +1,100 @@
+"""
+Unit Tests for the local EDINET stand-in server (edinet.stub_server)
+
+ネットワークに出ずに、スタブサーバー + EdinetClient の組み合わせを検証します：
+  1. 合成 doclist が fetch_doclist の想定する形式で返る
+  2. fixture（raw_root 形式）の doclist.json / document.zip が再生される
+  3. ZIP のストリーミングダウンロードとハッシュ
+  4. エラー注入（503）とスロットリング（429 + Retry-After）
+"""
+
+import hashlib
+import json
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from edinet.fetch_doclist import qc_eval
+from edinet.stub_server import StubBehavior, StubEdinetServer
+from lib.edinet_client import EdinetClient
+
+
+class TestSyntheticData:
+    """合成データの応答"""
+
+    def test_doclist_is_deterministic_and_passes_qc(self):
+        with StubEdinetServer(StubBehavior(docs_per_day=5, seed=1)) as server:
+            with EdinetClient(server.base_url, "k") as client:
+                first = client.fetch_doclist("2024-06-20")
+                second = client.fetch_doclist("2024-06-20")
+
+        assert first["results"] == second["results"]
+        assert len(first["results"]) == 5
+        assert all(qc_eval(r) == [] for r in first["results"])
+
+    def test_zip_download_streams_and_hashes(self, tmp_path):
+        with StubEdinetServer(StubBehavior(zip_size_bytes=100_000)) as server:
+            with EdinetClient(server.base_url, "k") as client:
+                dest = tmp_path / "document.zip"
+                size, sha = client.download_document_zip("S1240620000", dest)
+
+        data = dest.read_bytes()
+        assert size == len(data) > 100_000
+        assert sha == hashlib.sha256(data).hexdigest()
+        with zipfile.ZipFile(dest) as zf:
+            assert any(n.startswith("XBRL/PublicDoc/") for n in zf.namelist())
+
+
+class TestFixtureReplay:
+    """raw_root 形式の fixture の再生"""
+
+    def test_replays_doclist_and_zip(self, tmp_path):
+        day = tmp_path / "2021" / "06" / "30"
+        (day / "S100LUF2_1234_test").mkdir(parents=True)
+        (day / "doclist.json").write_text(json.dumps({"results": [{"docID": "S100LUF2"}]}), encoding="utf-8")
+        (day / "S100LUF2_1234_test" / "document.zip").write_bytes(b"PK-fixture")
+
+        with StubEdinetServer(fixture_root=tmp_path) as server:
+            with EdinetClient(server.base_url, "k") as client:
+                assert client.fetch_doclist("2021-06-30") == {"results": [{"docID": "S100LUF2"}]}
+                assert client.fetch_document_zip("S100LUF2") == b"PK-fixture"
+
+
+class TestFaultInjection:
+    """エラー注入とスロットリング"""
+
+    def test_errors_are_retried_by_client(self):
+        behavior = StubBehavior(error_rate=0.5, seed=3)
+        with StubEdinetServer(behavior) as server:
+            with EdinetClient(server.base_url, "k", max_retries=20, sleep=lambda s: None) as client:
+                for day in range(1, 11):
+                    client.fetch_doclist(f"2024-06-{day:02d}")
+                summary = client.latency_summary()
+            stats = dict(server.stats)
+
+        assert stats.get("status_503", 0) > 0
+        assert summary["retries"] == stats["status_503"]
+
+    def test_throttle_returns_429_with_retry_after(self):
+        behavior = StubBehavior(throttle_per_sec=0.5, throttle_burst=2)
+        with StubEdinetServer(behavior) as server:
+            url = f"{server.base_url}/documents.json"
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                responses = list(pool.map(
+                    lambda _: requests.get(url, params={"date": "2024-06-20"}, timeout=10), range(4)
+                ))
+
+        statuses = sorted(r.status_code for r in responses)
+        assert statuses == [200, 200, 429, 429]
+        assert all(int(r.headers["Retry-After"]) >= 1 for r in responses if r.status_code == 429)
+
+    def test_api_key_is_checked_when_configured(self):
+        with StubEdinetServer(api_key="secret") as server:
+            resp = requests.get(f"{server.base_url}/documents.json", params={"date": "2024-06-20"}, timeout=10)
+        assert resp.status_code == 401